@@ -0,0 +1,462 @@
+import os
+import re
+import sys
+import json
+import math
+import random
+import datetime
+import argparse
+import subprocess
+
+# Python reference for the capacity logic of the "Check Capacity Master" and
+# "Generate Suggestions" nodes (patches/capacidad_fase2/*.js), plus a port of
+# the previous per-slot rescanning version. `--check` runs random booking days
+# through the naive port, the reference and the node JS under node, both the
+# row-fetching nodes and the ones fed by the ocupacion_slots RPC
+# (patches/ocupacion_rpc, given the per-minute counts `rpc_rows` computes),
+# and reports any disagreement. The schedule-driven "Generate Suggestions" of
+# patches/sugerencias_horario, which walks candidates nearest first and stops
+# at k, is checked against `nearest_suggestions`, which ranks them all.
+#
+#   python scripts/capacity_reference.py --check --cases 2000
+
+PATCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patches", "capacidad_fase2")
+CHECK_JS = os.path.join(PATCH_DIR, "check_capacity_master.js")
+SUGGEST_JS = os.path.join(PATCH_DIR, "generate_suggestions.js")
+RPC_DIR = os.path.join(os.path.dirname(PATCH_DIR), "ocupacion_rpc")
+CHECK_RPC_JS = os.path.join(RPC_DIR, "check_capacity_rpc.js")
+SUGGEST_RPC_JS = os.path.join(RPC_DIR, "generate_suggestions_rpc.js")
+SUGGEST_SCHEDULE_JS = os.path.join(os.path.dirname(PATCH_DIR), "sugerencias_horario", "generate_suggestions_horario.js")
+
+MAX_CAPACITY_PER_SLOT = 3
+SLOT_MINUTES = 30
+MAX_GROUP = 6
+MAX_HORIZON = 48 * 60
+FIRST_HOUR, LAST_HOUR, CLOSING_MINUTE = 10, 21, 1320
+DEFAULT_RANGES = [(FIRST_HOUR * 60, CLOSING_MINUTE)]
+DAY_KEYS = ["domingo", "lunes", "martes", "miércoles", "jueves", "viernes", "sábado"]
+
+NAN = float("nan")
+_PARSE_INT_RE = re.compile(r"\s*([+-]?)(0[xX][0-9a-fA-F]+|\d+)")
+_NUMBER_RE = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+
+def js_parse_int(value):
+    """JavaScript parseInt(value): leading integer or NaN."""
+    if value is None:
+        return NAN
+    m = _PARSE_INT_RE.match(str(value))
+    if not m:
+        return NAN
+    digits = m.group(2)
+    number = int(digits, 16) if digits[:2].lower() == "0x" else int(digits)
+    return -number if m.group(1) == "-" else number
+
+
+def js_number(text):
+    """JavaScript Number(text) for the strings a time splits into."""
+    text = text.strip()
+    if not text:
+        return 0
+    return float(text) if _NUMBER_RE.fullmatch(text) else NAN
+
+
+def booking_minutes(hora):
+    if not hora:
+        return -1
+    parts = hora.split(":")
+    return js_parse_int(parts[0]) * 60 + js_parse_int(parts[1] if len(parts) > 1 else None)
+
+
+def requested_minutes(hora_cita):
+    parts = [js_number(p) for p in hora_cita.split(":")]
+    return parts[0] * 60 + parts[1] if len(parts) > 1 else NAN
+
+
+def requested_persons(persona):
+    persons = js_parse_int(persona)
+    return persons if persons == persons and persons != 0 else 1  # parseInt(...) || 1
+
+
+class Occupancy:
+    """Bookings per start minute as prefix sums: any window is two lookups."""
+
+    def __init__(self, horas):
+        starts = [m for m in map(booking_minutes, horas) if m == m and 0 <= m < MAX_HORIZON]
+        self.horizon = max([24 * 60] + [m + 1 for m in starts])
+        self.prefix = [0] * (self.horizon + 1)
+        for m in starts:
+            self.prefix[m + 1] += 1
+        for i in range(self.horizon):
+            self.prefix[i + 1] += self.prefix[i]
+
+    @classmethod
+    def from_counts(cls, counts):
+        """From {start minute: bookings}, as the RPCs return them."""
+        return cls([f"{m // 60}:{m % 60}" for m, n in counts.items() if 0 <= m < MAX_HORIZON for _ in range(n)])
+
+    def between(self, first, last):
+        """Bookings starting within [first, last], minutes inclusive."""
+        if not (math.isfinite(first) and math.isfinite(last)):
+            return 0
+        a = min(max(math.ceil(first), 0), self.horizon)
+        b = min(max(math.floor(last) + 1, 0), self.horizon)
+        return self.prefix[b] - self.prefix[a] if b > a else 0
+
+    def slot(self, start):
+        return self.between(start, start + SLOT_MINUTES - 1)
+
+
+def check_capacity(persona, hora_cita, horas):
+    persons = requested_persons(persona)
+    if persons > MAX_GROUP:
+        return {"status": "OVER_LIMIT"}
+    start = requested_minutes(hora_cita)
+    occupancy = Occupancy(horas)
+    if persons <= 3:
+        available = occupancy.slot(start) + persons <= MAX_CAPACITY_PER_SLOT
+    else:
+        used = occupancy.slot(start) + occupancy.slot(start + SLOT_MINUTES)
+        available = used + persons <= MAX_CAPACITY_PER_SLOT * 2
+    return {"status": "OK" if available else "FULL", "requestedPersons": persons, "requestedTimeStr": hora_cita}
+
+
+def valid_slots(persona, horas):
+    persons = requested_persons(persona)
+    occupancy = Occupancy(horas)
+    slots = []
+    for h in range(FIRST_HOUR, LAST_HOUR + 1):
+        for m in (0, 30):
+            start = h * 60 + m
+            if persons <= 3:
+                ok = occupancy.slot(start) + persons <= MAX_CAPACITY_PER_SLOT
+            else:
+                ok = (start + SLOT_MINUTES < CLOSING_MINUTE and
+                      occupancy.slot(start) + occupancy.slot(start + SLOT_MINUTES) + persons <= MAX_CAPACITY_PER_SLOT * 2)
+            if ok:
+                slots.append(f"{h}:{m:02d}")
+    return slots
+
+
+def pick_suggestions(slots, rand, k=3):
+    """The node's Fisher-Yates shuffle, first k, in time order. `rand` stands
+    in for Math.random."""
+    slots = list(slots)
+    if len(slots) > k:
+        for i in range(len(slots) - 1, 0, -1):
+            j = math.floor(rand() * (i + 1))
+            slots[i], slots[j] = slots[j], slots[i]
+    selected = slots[:k]
+    selected.sort(key=lambda s: int(s.split(":")[0]) * 60 + int(s.split(":")[1]))
+    return ", ".join(selected)
+
+
+def rpc_rows(horas):
+    """What ocupacion_slots returns for these bookings: (minuto, citas) per
+    start minute, in order. No rows comes out of n8n as one empty item."""
+    counts = {}
+    for m in map(booking_minutes, horas):
+        if m == m and 0 <= m < MAX_HORIZON:
+            counts[m] = counts.get(m, 0) + 1
+    return [{"minuto": m, "citas": n} for m, n in sorted(counts.items())] or [{}]
+
+
+def time_minutes(time):
+    parts = [js_number(p) for p in str(time).split(":")]
+    minutes = parts[0] * 60 + parts[1] if len(parts) > 1 else NAN
+    return int(minutes) if math.isfinite(minutes) and minutes == int(minutes) else minutes
+
+
+def day_ranges(schedule, weekday):
+    """Shifts of a horario_semanal on that weekday (0 = Sunday) as
+    [(from, to)] minutes; [] when closed, None without a schedule."""
+    if not isinstance(schedule, (list, dict)):
+        return None
+    if isinstance(schedule, list):
+        day = next((d for d in schedule if isinstance(d, dict) and d.get("dia") == weekday), None)
+        is_open = day and (day["abierto"] if "abierto" in day else day.get("activo"))
+        # day.turnos || day.franjas || []: an empty list is truthy in JS
+        listed = next((v for v in (day.get("turnos"), day.get("franjas")) if v not in (None, False, 0, "")), []) if day else []
+        shifts = [(t.get("inicio"), t.get("fin")) for t in listed] if is_open else []
+    else:
+        shifts = [(t.get("desde"), t.get("hasta")) for t in schedule.get(DAY_KEYS[weekday]) or []]
+    ranges = [(time_minutes(a), time_minutes(b)) for a, b in shifts]
+    return [(a, b) for a, b in ranges if math.isfinite(a) and math.isfinite(b) and a < b]
+
+
+def _fits(ranges, start, length):
+    return any(a <= start and start + length <= b for a, b in ranges)
+
+
+def day_starts(agenda, dia, length):
+    """Candidate starts of a day: every SLOT_MINUTES from each shift start,
+    the whole service within the shop's hours and some barber's shift."""
+    if dia in (agenda.get("cierres") or []):
+        return []
+    weekday = (datetime.date.fromisoformat(dia).weekday() + 1) % 7
+    shop = day_ranges(agenda.get("horario"), weekday)
+    staff, scheduled = [], False
+    for barber in agenda.get("barberos") or []:
+        ranges = day_ranges(barber.get("horario_semanal"), weekday)
+        if ranges is None:
+            continue
+        scheduled = True
+        if dia not in (barber.get("fechas_cierre") or []):
+            staff.append(ranges)
+    grid = shop if shop is not None else ([r for ranges in staff for r in ranges] if scheduled else DEFAULT_RANGES)
+    starts = set()
+    for a, b in grid:
+        s = a
+        while s + length <= b:
+            starts.add(s)
+            s += SLOT_MINUTES
+    return [s for s in sorted(starts)
+            if (shop is None or _fits(shop, s, length)) and (not scheduled or any(_fits(r, s, length) for r in staff))]
+
+
+def nearest_suggestions(persona, dia_cita, hora_cita, agenda, k=3, extra_days=0):
+    """Every candidate of the requested and following days, ranked by
+    distance to the requested time; the first k with room, in time order."""
+    persons = requested_persons(persona)
+    length = SLOT_MINUTES if persons <= 3 else SLOT_MINUTES * 2
+    requested = requested_minutes(hora_cita)
+    target = requested if math.isfinite(requested) else 0
+    try:
+        base = datetime.date.fromisoformat(dia_cita)
+    except (TypeError, ValueError):
+        return {"horas_sugeridas": "", "sugerencias": []}
+    candidates = []
+    for d in range(extra_days + 1):
+        dia = (base + datetime.timedelta(days=d)).isoformat()
+        occupancy = Occupancy.from_counts({r["minuto"]: r["citas"] for r in agenda.get("ocupacion") or []
+                                           if r.get("dia") == dia})
+        for s in day_starts(agenda, dia, length):
+            if persons <= 3:
+                ok = occupancy.slot(s) + persons <= MAX_CAPACITY_PER_SLOT
+            else:
+                ok = occupancy.slot(s) + occupancy.slot(s + SLOT_MINUTES) + persons <= MAX_CAPACITY_PER_SLOT * 2
+            if ok:
+                at = d * 24 * 60 + s
+                candidates.append((abs(at - target), at, dia, s))
+    selected = sorted(sorted(candidates)[:k], key=lambda c: c[1])
+    labels = [(dia, f"{s // 60}:{s % 60:02d}") for _, _, dia, s in selected]
+    return {
+        "horas_sugeridas": ", ".join(hora if dia == dia_cita else f"{dia} {hora}" for dia, hora in labels),
+        "sugerencias": [{"dia": dia, "hora": hora} for dia, hora in labels],
+    }
+
+
+# Previous version: every slot rescans every booking.
+
+def _naive_count(horas, first, last):
+    count = 0
+    for hora in horas:
+        m = booking_minutes(hora)
+        if first <= m <= last:
+            count += 1
+    return count
+
+
+def naive_check_capacity(persona, hora_cita, horas):
+    persons = requested_persons(persona)
+    if persons > MAX_GROUP:
+        return {"status": "OVER_LIMIT"}
+    start = requested_minutes(hora_cita)
+    if persons <= 3:
+        available = _naive_count(horas, start, start + 29) + persons <= MAX_CAPACITY_PER_SLOT
+    else:
+        used = _naive_count(horas, start, start + 29) + _naive_count(horas, start + 30, start + 59)
+        available = used + persons <= MAX_CAPACITY_PER_SLOT * 2
+    return {"status": "OK" if available else "FULL", "requestedPersons": persons, "requestedTimeStr": hora_cita}
+
+
+def naive_valid_slots(persona, horas):
+    persons = requested_persons(persona)
+    slots = []
+    for h in range(FIRST_HOUR, LAST_HOUR + 1):
+        for m in (0, 30):
+            start = h * 60 + m
+            if persons <= 3:
+                ok = _naive_count(horas, start, start + 29) + persons <= MAX_CAPACITY_PER_SLOT
+            elif start + 30 >= CLOSING_MINUTE:
+                ok = False
+            else:
+                ok = (_naive_count(horas, start, start + 29) + _naive_count(horas, start + 30, start + 59)
+                      + persons <= MAX_CAPACITY_PER_SLOT * 2)
+            if ok:
+                slots.append(f"{h}:{m:02d}")
+    return slots
+
+
+# Differential check
+
+def lcg(seed):
+    """Deterministic Math.random replacement shared with the JS harness."""
+    state = seed % 2 ** 32
+
+    def rand():
+        nonlocal state
+        state = (1664525 * state + 1013904223) % 2 ** 32
+        return state / 2 ** 32
+    return rand
+
+
+_JS_HARNESS = r"""
+const fs = require('fs');
+const [checkPath, suggestPath, checkRpcPath, suggestRpcPath, scheduleSuggestPath] = process.argv.slice(1);
+const run = (path) => new Function('$', fs.readFileSync(path, 'utf8'));
+const checkNode = run(checkPath), suggestNode = run(suggestPath);
+const checkRpcNode = run(checkRpcPath), suggestRpcNode = run(suggestRpcPath);
+const scheduleSource = fs.readFileSync(scheduleSuggestPath, 'utf8');
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+const out = cases.map(c => {
+    const $ = (name) => {
+        if (name === 'AI Agent3')
+            return { first: () => ({ json: { output: { persona: c.persona, dia_cita: c.dia_cita, hora_cita: c.hora_cita } } }) };
+        if (name === 'Slot Occupancy') return { all: () => c.rows.map(json => ({ json })) };
+        if (name === 'Suggestion Agenda') return { first: () => ({ json: c.agenda }) };
+        return { all: () => c.horas.map(Hora => ({ json: { Hora } })) };
+    };
+    const suggest = (node) => {
+        let state = c.seed % 4294967296;
+        Math.random = () => { state = (1664525 * state + 1013904223) % 4294967296; return state / 4294967296; };
+        return node($).json.horas_sugeridas;
+    };
+    // The patch vars, as refactor_workflow.py fills them in
+    const scheduleNode = new Function('$', scheduleSource
+        .replace('${sugerencias}', c.k).replace('${dias_extra}', c.extra_days));
+    return {
+        check: checkNode($).json, suggest: suggest(suggestNode),
+        check_rpc: checkRpcNode($).json, suggest_rpc: suggest(suggestRpcNode),
+        suggest_schedule: scheduleNode($).json,
+    };
+});
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def random_hora(rng):
+    roll = rng.random()
+    if roll < 0.03:
+        return rng.choice([None, "", "abc", "9", "10:5", "25:10", "1030:00"])
+    h, m = rng.randint(8, 22), rng.randrange(0, 60, rng.choice([1, 5, 15, 30]))
+    return f"{h:02d}:{m:02d}" + (":00" if rng.random() < 0.5 else "")
+
+
+def random_shifts(rng):
+    shifts, start = [], rng.randint(7 * 60, 12 * 60) // 15 * 15
+    for _ in range(rng.choice([1, 1, 2, 3])):
+        end = start + rng.randint(1, 12) * 30 + rng.choice([0, 0, 15])
+        if end > 24 * 60:
+            break
+        shifts.append((f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"))
+        start = end + rng.randint(1, 6) * 30
+    return shifts
+
+
+def random_schedule(rng, shop):
+    """A horario_semanal in one of the formats the app stores."""
+    roll = rng.random()
+    if roll < 0.2:
+        return None
+    if roll < 0.35:
+        return {key: [{"desde": a, "hasta": b} for a, b in random_shifts(rng)]
+                for key in DAY_KEYS if rng.random() < 0.8}
+    flag, shifts = ("abierto", "franjas") if shop or rng.random() < 0.2 else ("activo", "turnos")
+    return [{"dia": d, flag: rng.random() < 0.85, shifts: [{"inicio": a, "fin": b} for a, b in random_shifts(rng)]}
+            for d in range(7) if rng.random() < 0.9]
+
+
+def random_agenda(rng, dia_cita, extra_days, busy):
+    base = datetime.date.fromisoformat(dia_cita)
+    dias = [(base + datetime.timedelta(days=d)).isoformat() for d in range(extra_days + 1)]
+    pick = lambda: [d for d in dias if rng.random() < 0.15]
+    ocupacion = []
+    for dia in dias:
+        for row in rpc_rows([random_hora(rng) for _ in range(rng.randint(0, busy))]):
+            if row:
+                ocupacion.append(dict(row, dia=dia))
+    return {
+        "horario": random_schedule(rng, shop=True),
+        "cierres": pick() if rng.random() < 0.5 else None,
+        "barberos": [{"horario_semanal": random_schedule(rng, shop=False), "fechas_cierre": pick()}
+                     for _ in range(rng.choice([0, 1, 2, 3]))],
+        "ocupacion": ocupacion,
+    }
+
+
+def random_case(rng, seed):
+    busy = rng.choice([0, 3, 20, 60, 300])
+    dia_cita = (datetime.date(2026, 1, 1) + datetime.timedelta(days=rng.randrange(365))).isoformat()
+    extra_days = rng.choice([0, 0, 1, 2, 3])
+    return {
+        "persona": rng.choice([1, 2, 3, 4, 5, 6, 7, "2", "5", "", None, 0]),
+        "dia_cita": dia_cita,
+        "hora_cita": f"{rng.randint(9, 22)}:{rng.choice(['00', '15', '30', '45'])}",
+        "horas": [random_hora(rng) for _ in range(rng.randint(0, busy))],
+        "seed": seed,
+        "k": rng.choice([1, 2, 3, 3, 5]),
+        "extra_days": extra_days,
+        "agenda": random_agenda(rng, dia_cita, extra_days, busy // 3),
+    }
+
+
+def run_js(cases, node="node"):
+    cases = [dict(case, rows=rpc_rows(case["horas"])) for case in cases]
+    result = subprocess.run([node, "-e", _JS_HARNESS, CHECK_JS, SUGGEST_JS, CHECK_RPC_JS, SUGGEST_RPC_JS,
+                             SUGGEST_SCHEDULE_JS], input=json.dumps(cases), capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def differential_check(n_cases, seed=0, node="node"):
+    """Returns (cases run, [mismatch descriptions])."""
+    rng = random.Random(seed)
+    cases = [random_case(rng, seed * 1000003 + i) for i in range(n_cases)]
+    js = run_js(cases, node) if node else [None] * len(cases)
+    mismatches = []
+    for case, js_result in zip(cases, js):
+        args = (case["persona"], case["hora_cita"], case["horas"])
+        expected = check_capacity(*args)
+        slots = valid_slots(case["persona"], case["horas"])
+        suggested = pick_suggestions(slots, lcg(case["seed"]))
+        if naive_check_capacity(*args) != expected:
+            mismatches.append(("check: naive vs reference", case, naive_check_capacity(*args), expected))
+        if naive_valid_slots(case["persona"], case["horas"]) != slots:
+            mismatches.append(("slots: naive vs reference", case, naive_valid_slots(case["persona"], case["horas"]), slots))
+        if js_result is not None:
+            nearest = nearest_suggestions(case["persona"], case["dia_cita"], case["hora_cita"], case["agenda"],
+                                          case["k"], case["extra_days"])
+            if js_result["suggest_schedule"] != nearest:
+                mismatches.append(("suggest: node JS (horario) vs reference", case, js_result["suggest_schedule"], nearest))
+            for suffix, label in (("", "node JS"), ("_rpc", "node JS (RPC)")):
+                if js_result["check" + suffix] != expected:
+                    mismatches.append((f"check: {label} vs reference", case, js_result["check" + suffix], expected))
+                if js_result["suggest" + suffix] != suggested:
+                    mismatches.append((f"suggest: {label} vs reference", case, js_result["suggest" + suffix], suggested))
+    return len(cases), mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Referencia Python del calculo de capacidad de los nodos n8n")
+    parser.add_argument("--check", action="store_true", help="Comparar version anterior, referencia y JS del nodo con casos aleatorios")
+    parser.add_argument("--cases", type=int, default=1000, help="Casos aleatorios para --check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--node", default="node", help="Ejecutable de Node.js para probar el JS ('' para omitirlo)")
+    args = parser.parse_args()
+    if not args.check:
+        parser.print_help()
+        return
+    try:
+        total, mismatches = differential_check(args.cases, args.seed, args.node)
+    except (OSError, subprocess.CalledProcessError) as exc:
+        print(f"ERROR: no se pudo ejecutar el JS con node: {exc}", file=sys.stderr)
+        sys.exit(2)
+    for what, case, got, expected in mismatches[:10]:
+        print(f"DIFF {what}: {json.dumps(case)[:300]}\n  obtenido: {got}\n  esperado: {expected}")
+    print(f"INFO: {total} casos, {len(mismatches)} discrepancias")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+
+
+// INPUTS
+const requestedPersons = parseInt($('AI Agent3').first().json.output.persona) || 1;
+const requestedDateStr = $('AI Agent3').first().json.output.dia_cita; // YYYY-MM-DD
+const requestedTimeStr = $('AI Agent3').first().json.output.hora_cita; // HH:MM
+
+const MAX_CAPACITY_PER_SLOT = 3;
+const SLOT_MINUTES = 30;
+
+// 1. Validation for Large Groups (> 6)
+if (requestedPersons > 6) {
+    return { json: { status: "OVER_LIMIT" } };
+}
+
+// 2. Parse Requested Time
+// Assumes format HH:MM
+const [reqH, reqM] = requestedTimeStr.split(':').map(Number);
+const reqMinutesStart = reqH * 60 + reqM;
+
+// 3. Occupancy
+// Helper: Get Minute of day for a booking
+const getBookingMinutes = (timeStr) => {
+    if(!timeStr) return -1;
+    // Handle HH:MM:SS or HH:MM
+    const parts = timeStr.split(':');
+    return parseInt(parts[0])*60 + parseInt(parts[1]);
+};
+
+// 'Get many rows' returns ALL bookings for the day. Each one is bucketed by its
+// start minute once; prefix sums then give the bookings in any window with two
+// lookups instead of a pass over every booking per slot.
+const allBookings = $('Get many rows').all().map(item => item.json);
+const starts = [];
+// Start minutes past two days are typos in Hora; they are left out.
+const MAX_HORIZON = 48 * 60;
+let horizon = 24 * 60;
+for (const booking of allBookings) {
+    const bM = getBookingMinutes(booking.Hora);
+    if (bM >= 0 && bM < MAX_HORIZON) {
+        starts.push(bM);
+        if (bM >= horizon) horizon = bM + 1;
+    }
+}
+const prefix = new Int32Array(horizon + 1);
+for (const bM of starts) prefix[bM + 1]++;
+for (let i = 0; i < horizon; i++) prefix[i + 1] += prefix[i];
+
+// Bookings starting within [from, to] (minutes, inclusive)
+const countBetween = (from, to) => {
+    if (!Number.isFinite(from) || !Number.isFinite(to)) return 0;
+    const a = Math.min(Math.max(Math.ceil(from), 0), horizon);
+    const b = Math.min(Math.max(Math.floor(to) + 1, 0), horizon);
+    return b > a ? prefix[b] - prefix[a] : 0;
+};
+const countSlot = (start) => countBetween(start, start + SLOT_MINUTES - 1);
+
+// 4. Check Capacity
+// Persons 1-3: 1 Slot (30 mins), at most MAX_CAPACITY_PER_SLOT people in it.
+// Persons 4-6: 2 Slots (60 mins). User logic: "chekee la aviabilidad de una hora
+// entera ya que sería el doble de la capacidad (6)", so the hour is one bucket:
+// Used A + Used B + Requested <= 6.
+let isAvailable;
+if (requestedPersons <= 3) {
+    isAvailable = (countSlot(reqMinutesStart) + requestedPersons) <= MAX_CAPACITY_PER_SLOT;
+} else {
+    const totalUsed = countSlot(reqMinutesStart) + countSlot(reqMinutesStart + SLOT_MINUTES);
+    isAvailable = (totalUsed + requestedPersons) <= MAX_CAPACITY_PER_SLOT * 2;
+}
+
+return {
+    json: {
+        status: isAvailable ? "OK" : "FULL",
+        requestedPersons,
+        requestedTimeStr
+    }
+};
@@ -0,0 +1,82 @@
+
+// INPUTS
+const requestedPersons = parseInt($('AI Agent3').first().json.output.persona) || 1;
+const allBookings = $('Get many rows').all().map(item => item.json);
+const MAX_CAPACITY_PER_SLOT = 3;
+const SLOT_MINUTES = 30;
+
+// Helper: Get Booking Minutes
+const getBookingMinutes = (timeStr) => {
+    if(!timeStr) return -1;
+    const parts = timeStr.split(':');
+    return parseInt(parts[0])*60 + parseInt(parts[1]);
+};
+
+// Occupancy: bookings bucketed by start minute once, prefix sums for O(1) slot counts
+const starts = [];
+// Start minutes past two days are typos in Hora; they are left out.
+const MAX_HORIZON = 48 * 60;
+let horizon = 24 * 60;
+for (const b of allBookings) {
+    const bM = getBookingMinutes(b.Hora);
+    if (bM >= 0 && bM < MAX_HORIZON) {
+        starts.push(bM);
+        if (bM >= horizon) horizon = bM + 1;
+    }
+}
+const prefix = new Int32Array(horizon + 1);
+for (const bM of starts) prefix[bM + 1]++;
+for (let i = 0; i < horizon; i++) prefix[i + 1] += prefix[i];
+const countSlot = (start) => {
+    const a = Math.min(start, horizon);
+    const b = Math.min(start + SLOT_MINUTES, horizon);
+    return prefix[b] - prefix[a];
+};
+
+const validSlots = [];
+
+// Range: 10:00 to 21:00 (last booking start)
+for (let h = 10; h <= 21; h++) {
+    for (let m of [0, 30]) {
+        const startMin = h * 60 + m;
+
+        let isSlotAvailable = false;
+
+        if (requestedPersons <= 3) {
+            // Check 1 slot (30m)
+            isSlotAvailable = (countSlot(startMin) + requestedPersons) <= MAX_CAPACITY_PER_SLOT;
+        } else {
+            // Check 2 slots (60m)
+            // Limit: If slot2 starts after closing (22:00 = 1320)
+            const slot2Start = startMin + SLOT_MINUTES;
+            isSlotAvailable = slot2Start < 1320 &&
+                (countSlot(startMin) + countSlot(slot2Start) + requestedPersons) <= (MAX_CAPACITY_PER_SLOT*2);
+        }
+
+        if (isSlotAvailable) {
+            const minStr = m === 0 ? '00' : '30';
+            validSlots.push(`${h}:${minStr}`);
+        }
+    }
+}
+
+// SUFFLE & PICK 3
+if (validSlots.length > 3) {
+    for (let i = validSlots.length - 1; i > 0; i--) {
+        const j = Math.floor(Math.random() * (i + 1));
+        [validSlots[i], validSlots[j]] = [validSlots[j], validSlots[i]];
+    }
+}
+const selected = validSlots.slice(0, 3);
+// Sort chronologically
+selected.sort((a,b) => {
+    const [h1,m1] = a.split(':').map(Number);
+    const [h2,m2] = b.split(':').map(Number);
+    return (h1*60+m1) - (h2*60+m2);
+});
+
+return {
+    json: {
+        horas_sugeridas: selected.join(", ")
+    }
+};
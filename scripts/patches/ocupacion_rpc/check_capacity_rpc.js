@@ -0,0 +1,65 @@
+
+
+// INPUTS
+const requestedPersons = parseInt($('AI Agent3').first().json.output.persona) || 1;
+const requestedDateStr = $('AI Agent3').first().json.output.dia_cita; // YYYY-MM-DD
+const requestedTimeStr = $('AI Agent3').first().json.output.hora_cita; // HH:MM
+
+const MAX_CAPACITY_PER_SLOT = 3;
+const SLOT_MINUTES = 30;
+
+// 1. Validation for Large Groups (> 6)
+if (requestedPersons > 6) {
+    return { json: { status: "OVER_LIMIT" } };
+}
+
+// 2. Parse Requested Time
+// Assumes format HH:MM
+const [reqH, reqM] = requestedTimeStr.split(':').map(Number);
+const reqMinutesStart = reqH * 60 + reqM;
+
+// 3. Occupancy
+// 'Slot Occupancy' (RPC ocupacion_slots) returns one item per start minute with
+// the number of bookings starting then, already grouped in Postgres: the
+// prefix sums are built from those counts instead of from every booking row.
+// With no bookings the node outputs a single empty item, which is skipped.
+const MAX_HORIZON = 48 * 60;
+const rows = $('Slot Occupancy').all().map(item => item.json)
+    .filter(row => Number.isInteger(row.minuto) && row.minuto >= 0 && row.minuto < MAX_HORIZON);
+let horizon = 24 * 60;
+for (const row of rows) {
+    if (row.minuto >= horizon) horizon = row.minuto + 1;
+}
+const prefix = new Int32Array(horizon + 1);
+for (const row of rows) prefix[row.minuto + 1] += Number(row.citas) || 0;
+for (let i = 0; i < horizon; i++) prefix[i + 1] += prefix[i];
+
+// Bookings starting within [from, to] (minutes, inclusive)
+const countBetween = (from, to) => {
+    if (!Number.isFinite(from) || !Number.isFinite(to)) return 0;
+    const a = Math.min(Math.max(Math.ceil(from), 0), horizon);
+    const b = Math.min(Math.max(Math.floor(to) + 1, 0), horizon);
+    return b > a ? prefix[b] - prefix[a] : 0;
+};
+const countSlot = (start) => countBetween(start, start + SLOT_MINUTES - 1);
+
+// 4. Check Capacity
+// Persons 1-3: 1 Slot (30 mins), at most MAX_CAPACITY_PER_SLOT people in it.
+// Persons 4-6: 2 Slots (60 mins). User logic: "chekee la aviabilidad de una hora
+// entera ya que sería el doble de la capacidad (6)", so the hour is one bucket:
+// Used A + Used B + Requested <= 6.
+let isAvailable;
+if (requestedPersons <= 3) {
+    isAvailable = (countSlot(reqMinutesStart) + requestedPersons) <= MAX_CAPACITY_PER_SLOT;
+} else {
+    const totalUsed = countSlot(reqMinutesStart) + countSlot(reqMinutesStart + SLOT_MINUTES);
+    isAvailable = (totalUsed + requestedPersons) <= MAX_CAPACITY_PER_SLOT * 2;
+}
+
+return {
+    json: {
+        status: isAvailable ? "OK" : "FULL",
+        requestedPersons,
+        requestedTimeStr
+    }
+};
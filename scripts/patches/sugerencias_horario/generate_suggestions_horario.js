@@ -0,0 +1,139 @@
+
+// INPUTS
+const requestedPersons = parseInt($('AI Agent3').first().json.output.persona) || 1;
+const requestedDateStr = $('AI Agent3').first().json.output.dia_cita; // YYYY-MM-DD
+const requestedTimeStr = $('AI Agent3').first().json.output.hora_cita; // HH:MM
+const agenda = $('Suggestion Agenda').first().json;
+
+const MAX_CAPACITY_PER_SLOT = 3;
+const SLOT_MINUTES = 30;
+// Suggestions to return and following days to look into (patch vars
+// "sugerencias" and "dias_extra"; the fallbacks apply if left unset).
+const K = Math.max(1, parseInt('${sugerencias}', 10) || 3);
+const EXTRA_DAYS = Math.min(Math.max(parseInt('${dias_extra}', 10) || 0, 0), 14);
+// Opening hours when neither the shop nor its barbers have a schedule
+const DEFAULT_RANGES = [[10 * 60, 22 * 60]];
+const DAY_KEYS = ['domingo', 'lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado'];
+
+const toMinutes = (time) => {
+    const [hours, minutes] = String(time).split(':').map(Number);
+    return hours * 60 + minutes;
+};
+
+// [[from, to], ...] in minutes for that weekday (0 = Sunday), [] if closed,
+// null without a schedule. Array format: [{dia, activo|abierto, turnos|franjas:
+// [{inicio, fin}]}]; object format: {lunes: [{desde, hasta}], ...}.
+const dayRanges = (schedule, weekday) => {
+    if (!schedule || typeof schedule !== 'object') return null;
+    let ranges;
+    if (Array.isArray(schedule)) {
+        const day = schedule.find(d => d && d.dia === weekday);
+        const open = day && ('abierto' in day ? day.abierto : day.activo);
+        ranges = open ? (day.turnos || day.franjas || []).map(t => [toMinutes(t.inicio), toMinutes(t.fin)]) : [];
+    } else {
+        ranges = (schedule[DAY_KEYS[weekday]] || []).map(t => [toMinutes(t.desde), toMinutes(t.hasta)]);
+    }
+    return ranges.filter(([from, to]) => Number.isFinite(from) && Number.isFinite(to) && from < to);
+};
+
+const fits = (ranges, start, length) => ranges.some(([from, to]) => start >= from && start + length <= to);
+
+const shopClosures = Array.isArray(agenda.cierres) ? agenda.cierres : [];
+const barbers = Array.isArray(agenda.barberos) ? agenda.barberos : [];
+const length = requestedPersons <= 3 ? SLOT_MINUTES : SLOT_MINUTES * 2;
+
+// Per day: candidate starts (every SLOT_MINUTES from the start of each shift,
+// the whole service inside the shop's hours and inside some barber's shift)
+// and the day's occupancy as prefix sums over start minutes.
+const MAX_HORIZON = 48 * 60;
+const baseDate = new Date(requestedDateStr + 'T00:00:00Z');
+const days = [];
+for (let d = 0; d <= EXTRA_DAYS && !Number.isNaN(baseDate.getTime()); d++) {
+    const date = new Date(baseDate.getTime() + d * 86400000);
+    const dia = date.toISOString().slice(0, 10);
+    const weekday = date.getUTCDay();
+    let starts = [];
+    if (!shopClosures.includes(dia)) {
+        const shop = dayRanges(agenda.horario, weekday);
+        const staff = [];
+        let staffScheduled = false;
+        for (const barber of barbers) {
+            const absences = Array.isArray(barber.fechas_cierre) ? barber.fechas_cierre : [];
+            const ranges = dayRanges(barber.horario_semanal, weekday);
+            if (ranges === null) continue;
+            staffScheduled = true;
+            if (!absences.includes(dia)) staff.push(ranges);
+        }
+        const grid = shop !== null ? shop : (staffScheduled ? staff.flat() : DEFAULT_RANGES);
+        const seen = new Set();
+        for (const [from, to] of grid) {
+            for (let s = from; s + length <= to; s += SLOT_MINUTES) seen.add(s);
+        }
+        starts = [...seen].sort((a, b) => a - b).filter(s =>
+            (shop === null || fits(shop, s, length)) &&
+            (!staffScheduled || staff.some(ranges => fits(ranges, s, length))));
+    }
+    days.push({ dia, starts, rows: [] });
+}
+const byDia = new Map(days.map(day => [day.dia, day]));
+for (const row of Array.isArray(agenda.ocupacion) ? agenda.ocupacion : []) {
+    const day = byDia.get(row.dia);
+    if (day && Number.isInteger(row.minuto) && row.minuto >= 0 && row.minuto < MAX_HORIZON) day.rows.push(row);
+}
+for (const day of days) {
+    let horizon = 24 * 60;
+    for (const row of day.rows) {
+        if (row.minuto >= horizon) horizon = row.minuto + 1;
+    }
+    const prefix = new Int32Array(horizon + 1);
+    for (const row of day.rows) prefix[row.minuto + 1] += Number(row.citas) || 0;
+    for (let i = 0; i < horizon; i++) prefix[i + 1] += prefix[i];
+    day.countSlot = (start) => prefix[Math.min(start + SLOT_MINUTES, horizon)] - prefix[Math.min(start, horizon)];
+}
+
+const hasRoom = (day, start) => requestedPersons <= 3
+    ? day.countSlot(start) + requestedPersons <= MAX_CAPACITY_PER_SLOT
+    : day.countSlot(start) + day.countSlot(start + SLOT_MINUTES) + requestedPersons <= MAX_CAPACITY_PER_SLOT * 2;
+
+// Nearest first: on the requested day two cursors walk away from the
+// requested time, on later days starts come in order; each step takes the
+// closest head (ties: the earlier one) and stops once K slots have room.
+const requested = toMinutes(requestedTimeStr);
+const target = Number.isFinite(requested) ? requested : 0;
+const cursors = [];
+days.forEach((day, d) => {
+    const offset = d * 24 * 60;
+    if (d === 0) {
+        let split = day.starts.findIndex(s => s >= target);
+        if (split < 0) split = day.starts.length;
+        cursors.push({ day, offset, i: split - 1, step: -1 }, { day, offset, i: split, step: 1 });
+    } else {
+        cursors.push({ day, offset, i: 0, step: 1 });
+    }
+});
+const at = (c) => c.offset + c.day.starts[c.i];
+const selected = [];
+while (selected.length < K) {
+    let best = null;
+    for (const c of cursors) {
+        if (c.i < 0 || c.i >= c.day.starts.length) continue;
+        if (best === null) { best = c; continue; }
+        const dc = Math.abs(at(c) - target), db = Math.abs(at(best) - target);
+        if (dc < db || (dc === db && at(c) < at(best))) best = c;
+    }
+    if (best === null) break;
+    const start = best.day.starts[best.i];
+    best.i += best.step;
+    if (hasRoom(best.day, start)) selected.push({ offset: best.offset, dia: best.day.dia, start });
+}
+
+// Sort chronologically
+selected.sort((a, b) => (a.offset + a.start) - (b.offset + b.start));
+const label = (s) => `${Math.floor(s.start / 60)}:${String(s.start % 60).padStart(2, '0')}`;
+
+return {
+    json: {
+        horas_sugeridas: selected.map(s => s.dia === requestedDateStr ? label(s) : `${s.dia} ${label(s)}`).join(", "),
+        sugerencias: selected.map(s => ({ dia: s.dia, hora: label(s) }))
+    }
+};
@@ -0,0 +1,432 @@
+import os
+import re
+import json
+import mmap
+import hashlib
+import tempfile
+from collections import namedtuple
+
+# Indexed model of an exported n8n workflow.
+#
+# n8n stores edges under the source node's name:
+#   "connections": {"Src": {"main": [[{"node": "Tgt", "type": "main", "index": 0}], ...]}}
+# where the list position is the source output and "index" the target input.
+# The graph keeps that structure as ordered dicts (forward) plus a reverse
+# index per target, so adding or removing an edge is O(1) and removing a node
+# costs its degree instead of a scan of every connection list. Edges form a
+# set: adding an existing one is a no-op and repeated edges in an export are
+# dropped on load. to_json() gives back the same shape, key order and output
+# slots n8n exported.
+
+Edge = namedtuple("Edge", "source kind output target target_kind index")
+
+# Top-level members the graph works on; everything else (pinData, staticData...
+# which dominate the size of large exports) is kept as raw JSON.
+#
+# load_workflow() mmaps the export (its pages come from the OS file cache, not
+# the heap) and decodes the graph members one entry at a time: each node, each
+# source's connections. Peak memory is the graph plus one entry's text, not the
+# whole document as a string and as objects. The other members are never
+# decoded or copied: their end is found by a bracket scan that skips strings,
+# and RawJSON reads their bytes back from the file when the workflow is written
+# or hashed.
+GRAPH_MEMBERS = ("nodes", "connections")
+
+_WS_RE = re.compile(rb"[ \t\r\n]*")
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR_RE = re.compile(rb'[^,}\]\s]+')
+# Everything up to the next bracket outside a string, and that bracket.
+_BRACKET_RE = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+
+
+class RawJSON:
+    """A JSON value kept as its source text and written back verbatim: either
+    the text itself or the span of an export file it was loaded from."""
+
+    def __init__(self, text=None, source=None, start=0, end=0):
+        self._text = text
+        self.source = source  # (path, size, mtime_ns) of the export
+        self.start, self.end = start, end
+
+    @property
+    def text(self):
+        if self._text is not None:
+            return self._text
+        path, size, mtime_ns = self.source
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                raise ValueError(f"workflow: {path} changed since it was loaded")
+            f.seek(self.start)
+            return f.read(self.end - self.start).decode("utf-8")
+
+    def decode(self):
+        return json.loads(self.text)
+
+
+def _skip_ws(buf, pos):
+    return _WS_RE.match(buf, pos).end()
+
+
+def _char(buf, pos):
+    if pos >= len(buf):
+        raise ValueError("workflow: unexpected end of input")
+    return buf[pos:pos + 1]
+
+
+def _expect(buf, pos, char):
+    """Position after `char` (and the whitespace that follows it) at `pos`."""
+    if _char(buf, pos) != char:
+        raise ValueError(f"workflow: expected {char.decode()!r} at {pos}")
+    return _skip_ws(buf, pos + 1)
+
+
+def _skip_value(buf, pos):
+    """End of the JSON value at `pos`, found by matching brackets outside
+    strings; nothing inside it is decoded or checked."""
+    first = _char(buf, pos)
+    if first == b'"':
+        match = _STRING_RE.match(buf, pos)
+    elif first not in (b"[", b"{"):
+        match = _SCALAR_RE.match(buf, pos)
+    else:
+        depth, end = 0, pos
+        while True:
+            match = _BRACKET_RE.match(buf, end)
+            if match is None:
+                break
+            end = match.end()
+            depth += 1 if match.group(1) in (b"[", b"{") else -1
+            if not depth:
+                return end
+    if match is None:
+        raise ValueError(f"workflow: unterminated JSON value at {pos}")
+    return match.end()
+
+
+def _next_entry(buf, pos, close):
+    """After an entry ending at `pos`: (position of the next entry, True), or
+    (position after `close`, False) when the array or object ends there."""
+    pos = _skip_ws(buf, pos)
+    if _char(buf, pos) == b",":
+        return _skip_ws(buf, pos + 1), True
+    if buf[pos:pos + 1] != close:
+        raise ValueError(f"workflow: expected ',' or {close.decode()!r} at {pos}")
+    return pos + 1, False
+
+
+def _first_entry(buf, pos, close):
+    """Like _next_entry, for the array or object opening at `pos`."""
+    pos = _skip_ws(buf, pos + 1)
+    return (pos + 1, False) if _char(buf, pos) == close else (pos, True)
+
+
+def _key(buf, pos):
+    """(key, position of its value) for the object member at `pos`."""
+    end = _skip_value(buf, pos)
+    return json.loads(buf[pos:end]), _expect(buf, _skip_ws(buf, end), b":")
+
+
+def _decode_entries(buf, pos):
+    """(value, end) of the JSON value at `pos`; an array or object is decoded
+    entry by entry, so only one entry is held as text at a time."""
+    close = {b"[": b"]", b"{": b"}"}.get(_char(buf, pos))
+    if close is None:
+        end = _skip_value(buf, pos)
+        return json.loads(buf[pos:end]), end
+    value = [] if close == b"]" else {}
+    pos, more = _first_entry(buf, pos, close)
+    while more:
+        if close == b"]":
+            end = _skip_value(buf, pos)
+            value.append(json.loads(buf[pos:end]))
+        else:
+            key, pos = _key(buf, pos)
+            end = _skip_value(buf, pos)
+            value[key] = json.loads(buf[pos:end])
+        pos, more = _next_entry(buf, end, close)
+    return value, pos
+
+
+def iter_members(buf, decode=GRAPH_MEMBERS, source=None):
+    """Yields (key, value) for the top-level members of the workflow export in
+    `buf` (bytes or an mmap). Members in `decode` are decoded entry by entry;
+    the rest come back as RawJSON spans of `source` (path, size, mtime_ns), or
+    as text when there is no source file, without being decoded."""
+    pos = _skip_ws(buf, 0)
+    if buf[pos:pos + 1] != b"{":
+        raise ValueError("workflow: expected a JSON object")
+    pos, more = _first_entry(buf, pos, b"}")
+    while more:
+        key, start = _key(buf, pos)
+        if key in decode:
+            value, end = _decode_entries(buf, start)
+        else:
+            end = _skip_value(buf, start)
+            value = (RawJSON(source=source, start=start, end=end) if source is not None
+                     else RawJSON(bytes(buf[start:end]).decode("utf-8")))
+        yield key, value
+        del value
+        pos, more = _next_entry(buf, end, b"}")
+
+
+def load_workflow(path):
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if not st.st_size:
+            raise ValueError("workflow: expected a JSON object")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return dict(iter_members(buf, source=(path, st.st_size, st.st_mtime_ns)))
+
+
+def dump_workflow(data, f, indent=2):
+    """Writes `data` member by member; RawJSON members are copied as they were."""
+    pad = " " * indent
+    encoder = json.JSONEncoder(indent=indent, ensure_ascii=False)
+    f.write("{")
+    for i, (key, value) in enumerate(data.items()):
+        f.write(("," if i else "") + "\n" + pad + json.dumps(key, ensure_ascii=False) + ": ")
+        if isinstance(value, RawJSON):
+            f.write(value.text)
+        else:
+            for chunk in encoder.iterencode(value):
+                f.write(chunk.replace("\n", "\n" + pad))
+    f.write("\n}\n" if data else "}\n")
+
+
+def content_hash(data):
+    """sha256 of a workflow's content, independent of formatting, node order
+    and edge order within an output: what n8n would see on import."""
+    h = hashlib.sha256()
+    for key in sorted(data):
+        value = data[key]
+        if key == "nodes":
+            value = sorted(value, key=lambda n: n.get("name", ""))
+        elif key == "connections":
+            value = {source: {kind: [sorted(slot or [], key=lambda e: json.dumps(e, sort_keys=True)) for slot in slots]
+                              for kind, slots in kinds.items()}
+                     for source, kinds in value.items()}
+        h.update(json.dumps(key).encode())
+        h.update((value.text if isinstance(value, RawJSON) else json.dumps(value, sort_keys=True, ensure_ascii=False)).encode())
+    return h.hexdigest()
+
+
+def _file_mode(path):
+    """Mode for the new `path`: the one it has, else the umask default
+    (mkstemp would leave 0600)."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mask = os.umask(0)
+        os.umask(mask)
+        return 0o666 & ~mask
+
+
+def write_workflow(path, data):
+    """Atomic write: a temp file in the same directory replaces `path`, so a
+    crash never leaves a truncated export behind. The file keeps its mode."""
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = _file_mode(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            dump_workflow(data, f)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class WorkflowGraph:
+    def __init__(self, data):
+        # Everything but nodes/connections is carried through untouched.
+        self._data = data
+        self.nodes = {}  # name -> node dict, in workflow order
+        self.by_id = {}  # id -> name
+        # source -> {kind: [ {Edge: None} per output ]}
+        self._out = {}
+        # target -> {Edge: None}
+        self._in = {}
+        self.duplicates_dropped = 0
+        if not isinstance(data.get("nodes", []), list) or not isinstance(data.get("connections", {}), dict):
+            raise ValueError("workflow: 'nodes' must be a list and 'connections' an object")
+        for node in data.get("nodes", []):
+            self.add_node(node)
+        for source, outputs in data.get("connections", {}).items():
+            slots = self._out.setdefault(source, {})
+            for kind, per_output in outputs.items():
+                slots[kind] = [{} for _ in per_output]
+                for output, entries in enumerate(per_output):
+                    for entry in entries or []:
+                        if not self.add_edge(source, entry["node"], output, entry.get("index", 0), kind,
+                                             entry.get("type", kind)):
+                            self.duplicates_dropped += 1
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data)
+
+    # Nodes
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, name):
+        return self.nodes.get(name)
+
+    def node_by_id(self, node_id):
+        name = self.by_id.get(node_id)
+        return self.nodes.get(name) if name is not None else None
+
+    def add_node(self, node):
+        """Adds (or replaces, keeping its position) the node with node["name"]."""
+        old = self.nodes.get(node["name"])
+        if old is not None and old.get("id") is not None:
+            self.by_id.pop(old["id"], None)
+        self.nodes[node["name"]] = node
+        if node.get("id") is not None:
+            self.by_id[node["id"]] = node["name"]
+        return node
+
+    def remove_node(self, name):
+        """Removes the node and every edge from or to it. Edges naming a node
+        that is not in the workflow are removed too. Returns the node or None."""
+        node = self.nodes.pop(name, None)
+        if node is not None and node.get("id") is not None:
+            self.by_id.pop(node["id"], None)
+        for edge in list(self._in.pop(name, {})):
+            if edge.source != name:
+                self._discard(edge)
+        for edge in self.out_edges(name):
+            if edge.target != name:
+                self._in[edge.target].pop(edge, None)
+        self._out.pop(name, None)
+        return node
+
+    def replace_node(self, name, node):
+        """Puts `node` in the place of `name` (position in the node list and every
+        edge from or to it), whatever its new name. Returns the old node or None."""
+        new_name = node["name"]
+        if new_name != name and new_name in self.nodes:
+            raise ValueError(f"replace_node: ya existe un nodo {new_name!r}")
+        old = self.nodes.get(name)
+        order = [new_name if n == name else n for n in self.nodes] if old is not None else None
+        incoming, outgoing = self.in_edges(name), self.out_edges(name)
+        self.remove_node(name)
+        self.add_node(node)
+        if order is not None:
+            self.nodes = {n: self.nodes[n] for n in order}
+        for e in outgoing:
+            target = new_name if e.target == name else e.target
+            self.add_edge(new_name, target, e.output, e.index, e.kind, e.target_kind)
+        for e in incoming:
+            if e.source != name:
+                self.add_edge(e.source, new_name, e.output, e.index, e.kind, e.target_kind)
+        return old
+
+    # Edges
+
+    def add_edge(self, source, target, output=0, index=0, kind="main", target_kind=None):
+        """Connects output `output` of `source` to input `index` of `target`.
+        Returns False when the edge already existed."""
+        edge = Edge(source, kind, output, target, target_kind or kind, index)
+        slots = self._out.setdefault(source, {}).setdefault(kind, [])
+        while len(slots) <= output:
+            slots.append({})
+        if edge in slots[output]:
+            return False
+        slots[output][edge] = None
+        self._in.setdefault(target, {})[edge] = None
+        return True
+
+    def remove_edge(self, source, target, output=0, index=0, kind="main", target_kind=None):
+        """Removes the edge. Returns whether it existed."""
+        return self._discard(Edge(source, kind, output, target, target_kind or kind, index))
+
+    def has_edge(self, source, target, output=0, index=0, kind="main", target_kind=None):
+        edge = Edge(source, kind, output, target, target_kind or kind, index)
+        slot = self._slot(edge)
+        return slot is not None and edge in slot
+
+    def _slot(self, edge):
+        slots = self._out.get(edge.source, {}).get(edge.kind, [])
+        return slots[edge.output] if edge.output < len(slots) else None
+
+    def _discard(self, edge):
+        slot = self._slot(edge)
+        if slot is None or edge not in slot:
+            return False
+        del slot[edge]
+        incoming = self._in.get(edge.target)
+        if incoming is not None:
+            incoming.pop(edge, None)
+        return True
+
+    def out_edges(self, name):
+        return [edge for slots in self._out.get(name, {}).values() for slot in slots for edge in slot]
+
+    def in_edges(self, name):
+        return list(self._in.get(name, {}))
+
+    def successors(self, name):
+        return list(dict.fromkeys(edge.target for edge in self.out_edges(name)))
+
+    def predecessors(self, name):
+        return list(dict.fromkeys(edge.source for edge in self._in.get(name, {})))
+
+    def edges(self):
+        return [edge for name in self._out for edge in self.out_edges(name)]
+
+    # Change detection
+
+    def snapshot(self):
+        """State to diff against after a patch: node fingerprints and edge set."""
+        return ({name: {k: json.dumps(v, sort_keys=True) for k, v in node.items()} for name, node in self.nodes.items()},
+                set(self.edges()), self.duplicates_dropped)
+
+    def diff(self, snapshot):
+        """Minimal change set between `snapshot` and the current graph."""
+        nodes, edges, duplicates = snapshot
+        current = set(self.edges())
+        changed = {}
+        for name, node in self.nodes.items():
+            before = nodes.get(name)
+            if before is not None:
+                keys = sorted(k for k in set(before) | set(node)
+                              if before.get(k) != (json.dumps(node[k], sort_keys=True) if k in node else None))
+                if keys:
+                    changed[name] = keys
+        return {
+            "removed_nodes": sorted(set(nodes) - set(self.nodes)),
+            "added_nodes": sorted(set(self.nodes) - set(nodes)),
+            "changed_nodes": changed,
+            "removed_edges": sorted(edges - current),
+            "added_edges": sorted(current - edges),
+            "duplicates_dropped": duplicates,
+        }
+
+    # Serialization
+
+    def connections_json(self):
+        connections = {}
+        for source, kinds in self._out.items():
+            connections[source] = {
+                kind: [
+                    [{"node": e.target, "type": e.target_kind, "index": e.index} for e in slot]
+                    for slot in slots
+                ]
+                for kind, slots in kinds.items()
+            }
+        return connections
+
+    def to_json(self):
+        """The workflow in n8n's export shape, top-level key order preserved."""
+        data = dict(self._data)
+        data["nodes"] = list(self.nodes.values())
+        data["connections"] = self.connections_json()
+        return data
@@ -0,0 +1,300 @@
+import os
+import re
+import json
+
+# Declarative patches for exported n8n workflows. A patch is a JSON file:
+#
+#   {"description": "...",
+#    "requires_nodes": ["Get many rows"], "skip_if_nodes": ["Slot Occupancy"],
+#    "vars": {"barberia_id": {"from_filter": ["Get many rows", "barberia_id"],
+#                             "from_body": ["Slot Occupancy", "p_barberia_id"]},
+#             "supabase_url": {"default": "{{ $env.SUPABASE_URL }}"}},
+#    "migrations": ["funcion.sql"],
+#    "operations": [
+#      {"op": "remove-nodes", "names": ["If1", "Switch1"]},
+#      {"op": "add-node", "node": {...n8n node...}, "code_file": "capacity.js"},
+#      {"op": "add-node", "node": {...}, "credentials_from": ["Get many rows", "Slot Occupancy"]},
+#      {"op": "replace-node", "name": "Get many rows", "node": {...}, "keep": ["credentials", "position"]},
+#      {"op": "rewire", "disconnect": [{"from": "A", "to": "B"}],
+#                       "connect": [{"from": "A", "to": "C", "output": 1, "index": 0}]},
+#      {"op": "rewrite-code", "nodes": ["Code1"], "drop_lines_containing": ["require('luxon')"],
+#                             "replace": [{"old": "...", "new": "..."}]}
+#    ]}
+#
+# Operations run in order against a WorkflowGraph. "code_file" is read
+# relative to the patch and becomes the node's parameters.jsCode;
+# "rewrite-code" without "nodes" applies to every node with jsCode.
+# "credentials_from" gives the new node the credentials of the first of
+# those nodes the workflow has.
+# "replace-node" puts a node in the place of another (same edges, whatever
+# its new name), copying the "keep" keys over from the old one.
+#
+# "${var}" in the string values of a patch, jsCode included, is replaced per
+# workflow for the vars the patch declares (any other "${...}", such as a JS
+# template literal, is left alone): by the value given on the command line,
+# else by the value the workflow's Supabase node filters "from_filter" on (a
+# condition keyName or "key=eq.VALUE" in filterString), else by that key of
+# the JSON body of the HTTP node "from_body", else by "default".
+# "migrations" are SQL files next to the patch that the runner emits once
+# per run.
+#
+# "requires_nodes" and "skip_if_nodes" guard a patch against the wrong
+# workflow: without one of the required nodes it fails, and with any of the
+# skip nodes (left there by a later patch) it changes nothing, so re-running an
+# earlier patch cannot undo a later one. Both also work on a single operation.
+# "rewire" fails on edges from or to a node the workflow does not have, and
+# a patch fails if a node it removed or renamed is still referenced by name
+# ($('Name'), $("Name"), $node["Name"], $items("Name")) in the parameters,
+# jsCode included, of the nodes it leaves.
+
+VAR_RE = re.compile(r"\$\{(\w+)\}")
+NODE_REF_RE = re.compile(r"""\$(?:\(|node\[|items\()\s*(['"])(.+?)\1""")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _edge_args(spec):
+    try:
+        return (spec["from"], spec["to"], spec.get("output", 0), spec.get("index", 0), spec.get("kind", "main"))
+    except KeyError as exc:
+        raise PatchError(f"rewire: falta {exc.args[0]!r} en {spec}") from None
+
+
+def load_patch(path):
+    """Reads a patch file and inlines its code files and migrations."""
+    with open(path, "r", encoding="utf-8") as f:
+        patch = json.load(f)
+    operations = patch.get("operations")
+    if not isinstance(operations, list):
+        raise PatchError(f"{path}: falta la lista 'operations'")
+    base = os.path.dirname(os.path.abspath(path))
+    for i, op in enumerate(operations):
+        kind = op.get("op")
+        if kind not in OPERATIONS:
+            raise PatchError(f"{path}: operacion {i} desconocida: {kind!r}")
+        if kind in ("add-node", "replace-node"):
+            if "name" not in op.get("node", {}):
+                raise PatchError(f"{path}: operacion {i}: {kind} necesita node.name")
+            if kind == "replace-node" and "name" not in op:
+                raise PatchError(f"{path}: operacion {i}: replace-node necesita name")
+            if "code_file" in op:
+                with open(os.path.join(base, op["code_file"]), "r", encoding="utf-8") as f:
+                    op["node"].setdefault("parameters", {})["jsCode"] = f.read()
+        elif kind == "rewire":
+            for spec in op.get("connect", []) + op.get("disconnect", []):
+                _edge_args(spec)
+        _check_guards(op, f"{path}: operacion {i}")
+    _check_guards(patch, path)
+    for name, spec in patch.get("vars", {}).items():
+        if not isinstance(spec, dict) or not {"default", "from_filter", "from_body"} & set(spec):
+            raise PatchError(f"{path}: la variable {name!r} necesita 'default', 'from_filter' o 'from_body'")
+    migrations = []
+    for name in patch.get("migrations", []):
+        with open(os.path.join(base, name), "r", encoding="utf-8") as f:
+            migrations.append({"file": os.path.basename(name), "sql": f.read()})
+    patch["migrations"] = migrations
+    return patch
+
+
+def _check_guards(spec, where):
+    for key in ("requires_nodes", "skip_if_nodes"):
+        names = spec.get(key, [])
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise PatchError(f"{where}: '{key}' debe ser una lista de nombres de nodo")
+
+
+def skip_nodes(graph, spec):
+    """Nodes of `spec`'s "skip_if_nodes" the graph has ([] if it applies).
+    Otherwise raises PatchError when one of its "requires_nodes" is missing."""
+    present = [name for name in spec.get("skip_if_nodes", []) if name in graph]
+    missing = [name for name in spec.get("requires_nodes", []) if name not in graph]
+    if missing and not present:
+        raise PatchError(f"el workflow no tiene {', '.join(missing)}")
+    return present
+
+
+def _filter_value(node, key):
+    """Value the Supabase node `node` filters column `key` on, or None."""
+    params = (node or {}).get("parameters", {})
+    for cond in params.get("filters", {}).get("conditions", []):
+        if cond.get("keyName") == key and cond.get("keyValue") not in (None, ""):
+            return str(cond["keyValue"])
+    for part in str(params.get("filterString", "")).lstrip("=").split("&"):
+        column, _, value = part.partition("=")
+        if column.strip() == key and value.startswith("eq."):
+            return value[3:]
+    return None
+
+
+def _body_value(node, key):
+    """Value of `key` in the JSON body of the HTTP node `node`, or None."""
+    body = (node or {}).get("parameters", {}).get("jsonBody")
+    if not isinstance(body, str):
+        return None
+    try:
+        value = json.loads(body.lstrip("=")).get(key)
+    except (ValueError, AttributeError):
+        return None
+    return None if value in (None, "") else str(value)
+
+
+def resolve_vars(graph, patch, values=None):
+    """{var: value} for the vars this workflow can resolve. The others stay as
+    "${var}" and only fail if a node that is actually written still uses them
+    (a patch already applied has no node left to read its filters from)."""
+    resolved = {}
+    for name, spec in patch.get("vars", {}).items():
+        value = (values or {}).get(name)
+        if value is None and "from_filter" in spec:
+            node_name, key = spec["from_filter"]
+            value = _filter_value(graph.node(node_name), key)
+            if value is not None and value.startswith("="):
+                # An n8n expression: its "{{ ... }}" still works inside another expression.
+                value = value[1:]
+        if value is None and "from_body" in spec:
+            node_name, key = spec["from_body"]
+            value = _body_value(graph.node(node_name), key)
+        if value is None:
+            value = spec.get("default")
+        if value is not None:
+            resolved[name] = value
+    return resolved
+
+
+def substitute(value, resolved):
+    if isinstance(value, str):
+        return VAR_RE.sub(lambda m: resolved.get(m.group(1), m.group(0)), value)
+    if isinstance(value, dict):
+        return {k: substitute(v, resolved) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, resolved) for v in value]
+    return value
+
+
+def _placeholders(value):
+    if isinstance(value, str):
+        return set(VAR_RE.findall(value))
+    if isinstance(value, dict):
+        return set().union(*map(_placeholders, value.values()))
+    if isinstance(value, list):
+        return set().union(*map(_placeholders, value))
+    return set()
+
+
+def _references(value):
+    """Node names `value` refers to in n8n expressions or Code node JS."""
+    if isinstance(value, str):
+        return {m.group(2) for m in NODE_REF_RE.finditer(value)}
+    if isinstance(value, dict):
+        return set().union(*map(_references, value.values()))
+    if isinstance(value, list):
+        return set().union(*map(_references, value))
+    return set()
+
+
+def dangling_references(graph, names):
+    """{node: [names it still refers to]} for the `names` no longer in the graph."""
+    gone = {name for name in names if name not in graph}
+    dangling = {}
+    for node in graph.nodes.values() if gone else ():
+        refs = sorted(_references(node.get("parameters", {})) & gone)
+        if refs:
+            dangling[node["name"]] = refs
+    return dangling
+
+
+def _new_node(op):
+    # A copy per workflow: the same patch is applied to many graphs.
+    node = json.loads(json.dumps(op["node"]))
+    missing = sorted(_placeholders(node) & set(op.get("_unresolved", ())))
+    if missing:
+        raise PatchError(f"{node['name']}: no se pudo resolver {', '.join(missing)} (usa --var NOMBRE=VALOR)")
+    return node
+
+
+def remove_nodes(graph, op):
+    return sum(graph.remove_node(name) is not None for name in op["names"])
+
+
+def add_node(graph, op):
+    node = _new_node(op)
+    for name in op.get("credentials_from", []):
+        source = graph.node(name)
+        if source is not None and "credentials" in source:
+            node["credentials"] = json.loads(json.dumps(source["credentials"]))
+            break
+    graph.add_node(node)
+    return 1
+
+
+def replace_node(graph, op):
+    old = graph.node(op["name"])
+    if old is None:
+        return 0
+    node = _new_node(op)
+    for key in op.get("keep", []):
+        if key in old:
+            node[key] = old[key]
+    graph.replace_node(op["name"], node)
+    return 1
+
+
+def rewire(graph, op):
+    edges = [(False, _edge_args(spec)) for spec in op.get("disconnect", [])]
+    edges += [(True, _edge_args(spec)) for spec in op.get("connect", [])]
+    missing = sorted({name for _, args in edges for name in args[:2] if name not in graph})
+    if missing:
+        raise PatchError(f"rewire: el workflow no tiene {', '.join(missing)}")
+    changed = 0
+    for connect, args in edges:
+        changed += graph.add_edge(*args) if connect else graph.remove_edge(*args)
+    return changed
+
+
+def rewrite_code(graph, op):
+    names = op.get("nodes")
+    nodes = [graph.node(n) for n in names] if names is not None else list(graph.nodes.values())
+    drop = op.get("drop_lines_containing", [])
+    changed = 0
+    for node in nodes:
+        if node is None or "jsCode" not in node.get("parameters", {}):
+            continue
+        code = node["parameters"]["jsCode"]
+        new = "\n".join(l for l in code.split("\n") if not any(d in l for d in drop)) if drop else code
+        for rule in op.get("replace", []):
+            new = new.replace(rule["old"], rule["new"])
+        if new != code:
+            node["parameters"]["jsCode"] = new
+            changed += 1
+    return changed
+
+
+OPERATIONS = {
+    "remove-nodes": remove_nodes,
+    "add-node": add_node,
+    "replace-node": replace_node,
+    "rewire": rewire,
+    "rewrite-code": rewrite_code,
+}
+
+
+def apply_patch(graph, patch, values=None):
+    """Applies the operations in order, with the patch vars resolved against
+    this graph (`values` overrides them). Returns [(op, items changed)], []
+    when the patch is skipped (see skip_nodes) and 0 for a skipped operation."""
+    if skip_nodes(graph, patch):
+        return []
+    operations = patch["operations"]
+    if patch.get("vars"):
+        resolved = resolve_vars(graph, patch, values)
+        unresolved = sorted(set(patch["vars"]) - set(resolved))
+        operations = [dict(op, _unresolved=unresolved) for op in substitute(operations, resolved)]
+    before = list(graph.nodes)
+    results = [(op["op"], 0 if skip_nodes(graph, op) else OPERATIONS[op["op"]](graph, op)) for op in operations]
+    dangling = dangling_references(graph, before)
+    if dangling:
+        raise PatchError("nodos que aun usan nodos quitados: " +
+                         "; ".join(f"{node} -> {', '.join(refs)}" for node, refs in sorted(dangling.items())))
+    return results
@@ -0,0 +1,154 @@
+import os
+
+import audit_tslex
+from audit_tslex import tokenize, directive, functions, imports, resolve_import
+from audit_cache import file_cache
+
+ACTIONS_GLOB = "app/actions/**/*.ts"
+# Helper modules whose exported functions may act as guards (getRequiredSession...)
+HELPER_GLOBS = ["lib/**/*.ts", "utils/**/*.ts"]
+
+GUARD_METHODS = {"getUser", "getSession", "getClaims"}
+
+# Actions that are public by design (anonymous booking, sign-up, password reset).
+PUBLIC_ACTIONS = {
+    "signUp",
+    "sendResetEmail",
+    "bookGuestAppointment",
+    "getAvailableSlots",
+    "checkBarberNameAvailability",
+    "cancelAppointmentByUuid",
+}
+
+MAX_CALL_DEPTH = 4
+
+
+def _events(tokens, start, end, callable_names):
+    """Ordered guard / data-access / call events inside tokens[start:end]."""
+    events = []
+    for i in range(start, end):
+        t = tokens[i]
+        if t.kind != "ident":
+            continue
+        prev = tokens[i - 1].value if i > 0 else ""
+        nxt = tokens[i + 1].value if i + 1 < len(tokens) else ""
+        nxt2 = tokens[i + 2].value if i + 2 < len(tokens) else ""
+        if t.value == "auth" and prev == "." and nxt == ".":
+            if nxt2 in GUARD_METHODS:
+                events.append(["guard", f"auth.{nxt2}", t.line])
+            elif nxt2 == "admin":
+                events.append(["access", "auth.admin", t.line])
+        elif prev in (".", "?.") and t.value in ("from", "rpc") and nxt == "(":
+            arg = tokens[i + 2] if i + 2 < len(tokens) else None
+            target = audit_tslex.string_value(arg) if arg is not None else None
+            events.append(["access", f"{t.value}:{target or '?'}", t.line])
+        elif prev in (".", "?.") and t.value == "storage":
+            events.append(["access", "storage", t.line])
+        elif t.value == "stripe" and prev not in (".", "?.") and nxt == ".":
+            events.append(["access", "stripe", t.line])
+        elif nxt == "(" and prev not in (".", "?.", "function") and t.value in callable_names:
+            events.append(["call", t.value, t.line])
+    return events
+
+
+def analyze_batch(batch):
+    """Process-pool worker: raw guard/access facts for each file."""
+    root, rel_paths = batch
+    out = {}
+    for rel_path in rel_paths:
+        with open(os.path.join(root, *rel_path.split("/")), "r", encoding="utf-8", errors="replace") as f:
+            tokens = tokenize(f.read())
+        spans = functions(tokens)
+        bound = imports(tokens)
+        callable_names = set(bound) | {s.name for s in spans}
+        out[rel_path] = {
+            "directive": directive(tokens),
+            "imports": bound,
+            "functions": [
+                {
+                    "name": s.name,
+                    "exported": s.exported,
+                    "line": s.line,
+                    "events": _events(tokens, s.body_start, s.body_end, callable_names),
+                }
+                for s in spans
+            ],
+        }
+    return out
+
+
+class _Resolver:
+    def __init__(self, index, facts):
+        self.index = index
+        self.facts = facts
+
+    def _function(self, rel_path, name):
+        for fn in self.facts.get(rel_path, {}).get("functions", []):
+            if fn["name"] == name:
+                return fn
+        return None
+
+    def flatten(self, rel_path, fn, depth=0, seen=None):
+        """Inlines calls to local and imported helpers we have facts for."""
+        seen = seen if seen is not None else set()
+        flat = []
+        for kind, name, line in fn["events"]:
+            if kind != "call":
+                flat.append((kind, name, line))
+                continue
+            if depth >= MAX_CALL_DEPTH or (rel_path, name) in seen:
+                continue
+            target_path, target = rel_path, self._function(rel_path, name)
+            if target is None:
+                spec = self.facts.get(rel_path, {}).get("imports", {}).get(name)
+                target_path = resolve_import(self.index.exists, rel_path, spec) if spec else None
+                target = self._function(target_path, name) if target_path else None
+            if target is None:
+                continue
+            inner = self.flatten(target_path, target, depth + 1, seen | {(rel_path, name)})
+            # Report helper events at the call site line, tagged with the helper.
+            flat.extend((kind2, f"{name}>{name2}", line) for kind2, name2, _ in inner)
+        return flat
+
+
+def classify(flat_events):
+    first_guard = next((e for e in flat_events if e[0] == "guard"), None)
+    first_access = next((e for e in flat_events if e[0] == "access"), None)
+    if first_access is None:
+        status = "GUARDED" if first_guard else "NO_DATA_ACCESS"
+    elif first_guard is None:
+        status = "UNGUARDED"
+    elif flat_events.index(first_guard) < flat_events.index(first_access):
+        status = "GUARDED"
+    else:
+        status = "GUARD_AFTER_ACCESS"
+    return status, first_guard, first_access
+
+
+def analyze_auth_guards(ctx):
+    index = ctx.index
+    action_files = index.glob(ACTIONS_GLOB)
+    helper_files = sorted({p for g in HELPER_GLOBS for p in index.glob(g)})
+    facts, analysed = file_cache(ctx).map_files(
+        "auth_guards", analyze_batch, sorted(set(action_files) | set(helper_files)), depends=[audit_tslex]
+    )
+    resolver = _Resolver(index, facts)
+
+    actions = []
+    for rel_path in action_files:
+        file_facts = facts[rel_path]
+        if file_facts["directive"] != "use server":
+            continue
+        for fn in file_facts["functions"]:
+            if not fn["exported"]:
+                continue
+            status, guard, access = classify(resolver.flatten(rel_path, fn))
+            if fn["name"] in PUBLIC_ACTIONS and status in ("UNGUARDED", "GUARD_AFTER_ACCESS"):
+                status = "PUBLIC"
+            entry = {"file": rel_path, "action": fn["name"], "line": fn["line"], "status": status}
+            if guard:
+                entry["first_guard"] = f"{guard[1]} (L{guard[2]})"
+            if access:
+                entry["first_access"] = f"{access[1]} (L{access[2]})"
+            actions.append(entry)
+    return actions, analysed
@@ -0,0 +1,180 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from audit_engine import AuditContext, CHECKS, run_checks, compute_verdict
+from audit_cache import FileResultCache, write_json_atomic
+from audit_index import RepoIndex
+
+# Batch mode: audits several branded variants of the project in one run.
+# A target is either a checkout (directory) or an env file, which is audited
+# as the base checkout's .env.local. Files shared by several variants are
+# hashed once, and per-file analysis results are shared through one file
+# cache keyed on content, so identical sources are analysed once. Variants
+# only read that cache; they hand back what they added and the parent merges
+# it and writes the file, so concurrent variants never lose each other's entries.
+
+BATCH_REPORT_PATH = "artifacts/audit_batch_report.json"
+BATCH_FILE_CACHE = "audit_batch_file_cache.json"  # next to the batch report
+ENV_PATH = ".env.local"
+
+VERDICT_ORDER = ["READY_FOR_MARKET", "NEEDS_ATTENTION", "NOT_READY"]
+
+
+def variant_name(path):
+    name = os.path.basename(os.path.normpath(path))
+    if os.path.isfile(path):
+        # .env.barberia-sur / barberia-sur.env -> barberia-sur
+        for affix in (".env.local.", ".env."):
+            if name.startswith(affix) and len(name) > len(affix):
+                return name[len(affix):]
+        if name.endswith(".env"):
+            return name[:-len(".env")]
+    return name
+
+
+def resolve_variants(targets, base_root):
+    """[{name, root, env}] for the batch targets, in the order given."""
+    variants, seen = [], {}
+    for target in targets:
+        path = os.path.abspath(target)
+        if os.path.isdir(path):
+            root, env = path, None
+        elif os.path.isfile(path):
+            root, env = os.path.abspath(base_root), path
+        else:
+            raise ValueError(f"{target}: no existe")
+        name = variant_name(path)
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}-{seen[name]}"
+        variants.append({"name": name, "root": root, "env": env})
+    return variants
+
+
+def build_indexes(variants, max_workers=None):
+    """{name: RepoIndex}; each distinct checkout is walked once."""
+    roots = sorted({v["root"] for v in variants})
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, len(roots))) as pool:
+        base = dict(zip(roots, pool.map(RepoIndex.build, roots)))
+    return {v["name"]: base[v["root"]].overlay({ENV_PATH: v["env"]}) if v["env"] else base[v["root"]]
+            for v in variants}
+
+
+def hash_once(indexes, reads, max_workers=None):
+    """Seeds every index with the hashes of the files the checks read (`reads`:
+    one declaration per check). A file is hashed once however many variants
+    see it (same path, size and mtime). Returns (files seen, files hashed)."""
+    owners = {}
+    for index in indexes.values():
+        for rel_path in sorted({p for declared in reads for p in index.resolve(declared)}):
+            entry = index.get(rel_path)
+            if entry is not None:
+                key = (index.abspath(rel_path), entry.size, entry.mtime_ns)
+                owners.setdefault(key, []).append((index, rel_path))
+    keys = list(owners)
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        hashes = list(pool.map(lambda key: owners[key][0][0].sha256(owners[key][0][1]), keys))
+    seeded = {}
+    for key, sha in zip(keys, hashes):
+        for index, rel_path in owners[key]:
+            seeded.setdefault(id(index), (index, {}))[1][rel_path] = sha
+    for index, known in seeded.values():
+        index.add_hashes(known)
+    return sum(len(o) for o in owners.values()), len(keys)
+
+
+def audit_variant(job):
+    """Process-pool worker: runs the checks over one variant's index and
+    returns (checks_data, duration_ms, file cache results it added)."""
+    import audit_launch  # noqa: F401  registers the checks in a spawned worker
+
+    index, check_names, cache_path, fail_fast = job
+    started = time.perf_counter()
+    ctx = AuditContext(root=index.root, index=index)
+    cache = ctx.memo("file_cache", lambda c: FileResultCache(c, path=cache_path, persist=False))
+    checks = [CHECKS[name] for name in check_names]
+    checks_data = run_checks(checks, ctx, fail_fast=fail_fast)
+    index.close()
+    return checks_data, round((time.perf_counter() - started) * 1000, 1), cache.added
+
+
+def differences(variants):
+    """{check: {status: [variant names]}} for checks whose status is not the
+    same in every variant."""
+    by_check = {}
+    for name, variant in variants.items():
+        for check, result in variant.get("checks", {}).items():
+            by_check.setdefault(check, {}).setdefault(result["status"], []).append(name)
+    return {check: statuses for check, statuses in by_check.items() if len(statuses) > 1}
+
+
+def run_batch(targets, base_root, checks, output=None, workers=None, fail_fast=False, log=print):
+    started = datetime.now()
+    variants = resolve_variants(targets, base_root)
+    indexes = build_indexes(variants)
+    reads = [check.reads for check in checks]
+    hash_start = time.perf_counter()
+    files_seen, files_hashed = hash_once(indexes, reads)
+    hash_ms = round((time.perf_counter() - hash_start) * 1000, 1)
+    log(f"INFO: {len(variants)} variante(s), {files_hashed} fichero(s) distintos hasheados de {files_seen} ({hash_ms} ms)")
+
+    output = output or os.path.join(os.path.abspath(base_root), *BATCH_REPORT_PATH.split("/"))
+    cache_path = os.path.join(os.path.dirname(output), BATCH_FILE_CACHE)
+    names = [c.name for c in checks]
+    jobs = {v["name"]: (indexes[v["name"]], names, cache_path, fail_fast) for v in variants}
+    results = {}
+    file_cache = FileResultCache(None, path=cache_path)
+
+    def done(variant, outcome):
+        if isinstance(outcome, Exception):
+            result = {"verdict": "NOT_READY", "error": f"{outcome.__class__.__name__}: {outcome}", "checks": {}}
+        else:
+            checks_data, duration_ms, added = outcome
+            file_cache.merge(added)
+            result = {"verdict": compute_verdict(checks_data), "duration_ms": duration_ms, "checks": checks_data}
+        results[variant["name"]] = {"root": variant["root"], "env": variant["env"], **result}
+        log(f"INFO: [{variant['name']}] {result['verdict']}" + (f" ({result['duration_ms']} ms)" if "duration_ms" in result else f" - {result['error']}"))
+
+    # The first variant runs alone and fills the shared file cache; the rest
+    # then only analyse the files that differ from it.
+    first, rest = variants[0], variants[1:]
+    try:
+        done(first, audit_variant(jobs[first["name"]]))
+    except Exception as exc:
+        done(first, exc)
+    file_cache.save()
+    if rest:
+        mp = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers or min(len(rest), os.cpu_count() or 1), mp_context=mp) as pool:
+            futures = {pool.submit(audit_variant, jobs[v["name"]]): v for v in rest}
+            for future in as_completed(futures):
+                try:
+                    done(futures[future], future.result())
+                except Exception as exc:
+                    done(futures[future], exc)
+        file_cache.save()
+
+    ordered = {v["name"]: results[v["name"]] for v in variants}
+    verdicts = {}
+    for variant in ordered.values():
+        verdicts[variant["verdict"]] = verdicts.get(variant["verdict"], 0) + 1
+    report = {
+        "timestamp": started.isoformat(),
+        "duration_ms": round((datetime.now() - started).total_seconds() * 1000, 1),
+        "verdict": max((v["verdict"] for v in ordered.values()), key=VERDICT_ORDER.index),
+        "summary": {
+            "variants": len(ordered),
+            "verdicts": verdicts,
+            "files_read": files_seen,
+            "files_hashed": files_hashed,
+            "hash_ms": hash_ms,
+        },
+        "verdicts": {name: v["verdict"] for name, v in ordered.items()},
+        "differences": differences(ordered),
+        "variants": ordered,
+    }
+    write_json_atomic(output, report, indent=4)
+    return report, output
@@ -0,0 +1,380 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+from audit_cache import CACHE_PATH, FILE_CACHE_PATH, write_json_atomic
+
+# Benchmark suite for the audit engine: generates synthetic Next.js trees and
+# measures every registered check on them, cold (no caches) and warm
+# (per-file result cache populated), each in its own process so wall time,
+# peak RSS and files read are attributable to one check.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = "artifacts/bench"
+
+# (routes, components, lockfile packages)
+SIZES = {
+    "small": (100, 1000, 500),
+    "medium": (1000, 10000, 3000),
+    "large": (3000, 30000, 10000),
+}
+TABLES = ("citas", "perfiles", "barberos", "servicios", "mis_mensajes", "ventas_productos")
+ICONS = ("Calendar", "User", "Scissors", "Clock", "Phone", "Mail", "Star", "Check", "X", "Plus")
+ALL_CHECKS = "__all__"
+
+# Exit test: a check sleeping EXIT_SLOW_SECONDS with a timeout of EXIT_TIMEOUT
+# (or skipped by fail-fast) must not keep the process alive; each case is
+# {expected statuses} and the process has to be gone within EXIT_LIMIT.
+EXIT_SLOW_SECONDS = 5.0
+EXIT_TIMEOUT = 1.0
+EXIT_LIMIT = EXIT_SLOW_SECONDS / 2
+EXIT_CASES = {
+    "timeout": {"slow": "WARNING"},
+    "fail-fast": {"failing": "CRITICAL", "slow": "SKIPPED"},
+    "process-pool": {"slow": "WARNING"},
+}
+
+
+# --- generator ---------------------------------------------------------------
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(content)
+
+
+def _query(rng, var):
+    table = rng.choice(TABLES)
+    chain = f"supabase.from('{table}').select('{rng.choice(['*', 'id, barberia_id', 'id, created_at'])}')"
+    chain += ".eq('barberia_id', barberiaId)"
+    if rng.random() < 0.5:
+        chain += ".gte('created_at', desde)"
+    if rng.random() < 0.3:
+        chain += ".order('created_at', { ascending: false }).limit(50)"
+    return f"  const {{ data: {var} }} = await {chain}\n"
+
+
+def _component(rng, j, n_components):
+    imports = ["'use client'\n", "import { useState } from 'react'\n"]
+    icons = rng.sample(ICONS, 3)
+    imports.append(f"import {{ {', '.join(icons)} }} from 'lucide-react'\n")
+    children = sorted({rng.randrange(j) for _ in range(min(j, 3))}) if j else []
+    for k in children:
+        imports.append(f"import Widget{k} from '@/components/w{k // 500}/widget{k}'\n")
+    body = "".join(f"      <Widget{k} />\n" for k in children)
+    return "".join(imports) + (
+        f"\nexport default function Widget{j}() {{\n"
+        f"  const [open, setOpen] = useState(false)\n"
+        f"  return (\n    <div onClick={{() => setOpen(!open)}}>\n"
+        + "".join(f"      <{icon} size={{16}} />\n" for icon in icons) + body +
+        f"    </div>\n  )\n}}\n"
+    )
+
+
+def _page(rng, i, n_components):
+    widget = rng.randrange(n_components)
+    config = "export const revalidate = 60\n\n" if rng.random() < 0.2 else ""
+    queries = "".join(_query(rng, f"rows{q}") for q in range(rng.randint(1, 3)))
+    return (
+        "import { createClient } from '@/utils/supabase/server'\n"
+        f"import Widget{widget} from '@/components/w{widget // 500}/widget{widget}'\n\n"
+        + config +
+        f"export default async function Page{i}() {{\n"
+        "  const supabase = await createClient()\n"
+        "  const barberiaId = 'x'\n  const desde = '2026-01-01'\n"
+        + queries +
+        f"  return <Widget{widget} />\n}}\n"
+    )
+
+
+def _action(rng, i):
+    guard = "  const { data: { user } } = await supabase.auth.getUser()\n  if (!user) throw new Error('auth')\n" \
+        if rng.random() < 0.9 else ""
+    return (
+        "'use server'\n\nimport { createClient } from '@/utils/supabase/server'\n\n"
+        f"export async function action{i}(barberiaId: string, desde: string) {{\n"
+        "  const supabase = await createClient()\n" + guard
+        + "".join(_query(rng, f"rows{q}") for q in range(rng.randint(1, 4))) +
+        "  return rows0\n}\n"
+    )
+
+
+def _lockfile(rng, n_packages):
+    packages = {"": {"name": "synthetic", "version": "0.1.0",
+                     "dependencies": {f"pkg-{k}": "^1.0.0" for k in range(min(40, n_packages))}}}
+    for k in range(n_packages):
+        deps = {f"pkg-{d}": "^1.0.0" for d in rng.sample(range(k + 1, n_packages), min(3, n_packages - k - 1))}
+        packages[f"node_modules/pkg-{k}"] = {
+            "version": f"1.{k % 7}.0",
+            "resolved": f"https://registry.npmjs.org/pkg-{k}/-/pkg-{k}-1.{k % 7}.0.tgz",
+            "integrity": "sha512-" + "A" * 86 + "==",
+            "dev": k % 3 == 0,
+            "dependencies": deps,
+        }
+        if k % 25 == 0 and deps:
+            nested = next(iter(deps))
+            packages[f"node_modules/pkg-{k}/node_modules/{nested}"] = {"version": "0.9.0", "dev": k % 3 == 0}
+    return json.dumps({"name": "synthetic", "version": "0.1.0", "lockfileVersion": 3, "requires": True,
+                       "packages": packages}, indent=2)
+
+
+def generate_tree(root, routes, components, lock_packages, seed=0, template=PROJECT_ROOT):
+    """Writes a synthetic Next.js project under `root`. The table catalogue and
+    SQL are copied from `template` so the data checks see realistic inputs."""
+    rng = random.Random(seed)
+    for rel_path in ("tablas_supabase.txt", "package.json"):
+        if os.path.exists(os.path.join(template, rel_path)):
+            shutil.copy(os.path.join(template, rel_path), os.path.join(root, rel_path))
+    for folder in ("supabase", "scripts/sql"):
+        if os.path.isdir(os.path.join(template, folder)):
+            shutil.copytree(os.path.join(template, folder), os.path.join(root, folder), dirs_exist_ok=True)
+
+    _write(root, ".env.local", "".join(f"{key}=placeholder\n" for key in (
+        "NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "STRIPE_SECRET_KEY",
+        "STRIPE_WEBHOOK_SECRET", "NEXT_PUBLIC_RECAPTCHA_SITE_KEY", "RECAPTCHA_SECRET_KEY", "RECAPTCHA_PROJECT_ID")))
+    _write(root, "utils/supabase/server.ts",
+           "import { cookies } from 'next/headers'\nimport { createServerClient } from '@supabase/ssr'\n\n"
+           "export async function createClient() {\n  const cookieStore = await cookies()\n"
+           "  return createServerClient('url', 'key', { cookies: cookieStore })\n}\n")
+    _write(root, "app/layout.tsx", "export default function RootLayout({ children }) {\n  return <html>{children}</html>\n}\n")
+    _write(root, "app/not-found.tsx", "export default function NotFound() {\n  return <p>404</p>\n}\n")
+    for j in range(components):
+        _write(root, f"components/w{j // 500}/widget{j}.tsx", _component(rng, j, components))
+    for i in range(routes):
+        group = f"(g{i % 10})"
+        segment = f"r{i}" if i % 7 else f"r{i}/[slug]"
+        _write(root, f"app/{group}/{segment}/page.tsx", _page(rng, i, components))
+        if i % 5 == 0:
+            _write(root, f"app/actions/a{i}.ts", _action(rng, i))
+        if i % 20 == 0:
+            _write(root, f"app/api/r{i}/route.ts",
+                   "export async function GET() {\n  return Response.json({ ok: true })\n}\n")
+    for g in range(10):
+        _write(root, f"app/(g{g})/layout.tsx",
+               "export default function Layout({ children }) {\n  return <section>{children}</section>\n}\n")
+    _write(root, "package-lock.json", _lockfile(rng, lock_packages))
+    return root
+
+
+# --- measurement -------------------------------------------------------------
+
+def _peak_rss_mb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(root, name):
+    """Runs one check (or all of them) in this process; returns its measurements."""
+    import audit_launch  # registers the checks
+    import audit_index
+    from audit_engine import AuditContext, CHECKS, run_checks
+
+    read = set()
+    original_data = audit_index.RepoIndex.data
+
+    def counting_data(self, rel_path):
+        read.add(rel_path)
+        return original_data(self, rel_path)
+
+    audit_index.RepoIndex.data = counting_data
+    # Per-file workers open files themselves: count what they are handed.
+    for module in [m for n, m in sys.modules.items() if n.startswith("audit_")]:
+        original_map = getattr(module, "parallel_map", None)
+        if original_map is not None:
+            def counting_map(func, batches, max_workers=None, _original=original_map):
+                for batch in batches:
+                    read.update(batch[1])
+                return _original(func, batches, max_workers=max_workers)
+            module.parallel_map = counting_map
+
+    started = time.perf_counter()
+    ctx = AuditContext(root)
+    files = len(ctx.index.entries)
+    index_ms = (time.perf_counter() - started) * 1000
+    checks = list(CHECKS.values()) if name == ALL_CHECKS else [CHECKS[name]]
+    started = time.perf_counter()
+    results = run_checks(checks, ctx)
+    wall_ms = (time.perf_counter() - started) * 1000
+    return {
+        "check": name,
+        "status": results[checks[0].name]["status"] if name != ALL_CHECKS else None,
+        "wall_ms": round(wall_ms, 1),
+        "index_ms": round(index_ms, 1),
+        "files_indexed": files,
+        "files_read": len(read),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "workers_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def _clear_caches(root):
+    for rel_path in (CACHE_PATH, FILE_CACHE_PATH):
+        try:
+            os.remove(os.path.join(root, *rel_path.split("/")))
+        except FileNotFoundError:
+            pass
+
+
+def _measure_in_child(root, name):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "_measure", root, name],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        return {"check": name, "error": proc.stderr.strip().splitlines()[-1:] or ["exit " + str(proc.returncode)]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(root, names, log=print):
+    rows = []
+    for name in names:
+        _clear_caches(root)
+        cold = _measure_in_child(root, name)
+        warm = _measure_in_child(root, name)
+        log(f"INFO: {name:<14} cold {cold.get('wall_ms', '-'):>9} ms  warm {warm.get('wall_ms', '-'):>9} ms  "
+            f"read {cold.get('files_read', '-')}/{warm.get('files_read', '-')}  rss {cold.get('peak_rss_mb', '-')} MB")
+        rows.append({"check": name, "cold": cold, "warm": warm})
+    _clear_caches(root)
+    return rows
+
+
+# --- exit time ---------------------------------------------------------------
+
+def _exit_case(case):
+    """Child of check_exit_times: runs the case and exits like audit_launch."""
+    from audit_engine import AuditContext, Check, parallel_map, run_checks, exit_process
+
+    def slow(ctx):
+        if case == "process-pool":
+            # Abandoned inside a process pool, whose atexit hook joins it.
+            parallel_map(time.sleep, [EXIT_SLOW_SECONDS] * 2)
+        else:
+            time.sleep(EXIT_SLOW_SECONDS)
+        return {"status": "SUCCESS"}
+
+    checks = [Check("slow", slow, timeout=EXIT_TIMEOUT)]
+    if case == "fail-fast":
+        checks.insert(0, Check("failing", lambda ctx: {"status": "CRITICAL"}))
+    results = run_checks(checks, AuditContext(PROJECT_ROOT), fail_fast=case == "fail-fast")
+    print(json.dumps({name: result["status"] for name, result in results.items()}))
+    exit_process(0)
+
+
+def check_exit_times(log=print):
+    """Time from start to process exit for each EXIT_CASES case. Returns the failures."""
+    failures = 0
+    for case, expected in EXIT_CASES.items():
+        # Output to a file, not a pipe: orphaned pool workers would keep a pipe open.
+        with tempfile.TemporaryFile("w+") as out:
+            started = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "_exit", case],
+                                    stdout=out, stderr=subprocess.STDOUT, cwd=os.path.dirname(os.path.abspath(__file__)))
+            try:
+                code = proc.wait(timeout=EXIT_SLOW_SECONDS * 4)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                code = proc.wait()
+            elapsed = time.perf_counter() - started
+            out.seek(0)
+            lines = out.read().strip().splitlines()
+        try:
+            statuses = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            statuses = None
+        ok = code == 0 and statuses == expected and elapsed < EXIT_LIMIT
+        failures += not ok
+        log(f"{'INFO' if ok else 'ERROR'}: salida con {case:<12} {elapsed:.2f} s (limite {EXIT_LIMIT:.1f} s), "
+            f"exit {code}, {statuses if statuses is not None else lines[-1:]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de AUDIT-LAUNCH sobre proyectos Next.js sinteticos")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("generate", help="Genera un proyecto sintetico")
+    p.add_argument("dest")
+    p.add_argument("--size", choices=SIZES, default="small")
+    p.add_argument("--routes", type=int)
+    p.add_argument("--components", type=int)
+    p.add_argument("--lock-packages", type=int)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("run", help="Mide cada check en frio y en caliente")
+    p.add_argument("--size", choices=SIZES, default="small")
+    p.add_argument("--tree", help="Proyecto ya generado (o real) en lugar de uno sintetico nuevo")
+    p.add_argument("--only", nargs="+", metavar="CHECK", help="Medir solo estos checks")
+    p.add_argument("--output", help=f"JSON de resultados (por defecto {RESULTS_DIR}/<fecha>-<size>.json)")
+    p.add_argument("--seed", type=int, default=0)
+    sub.add_parser("exit", help="Comprueba que el proceso termina sin esperar a los checks abandonados")
+    p = sub.add_parser("_measure")
+    p.add_argument("root")
+    p.add_argument("check")
+    p = sub.add_parser("_exit")
+    p.add_argument("case", choices=EXIT_CASES)
+    args = parser.parse_args()
+
+    if args.command == "_measure":
+        print(json.dumps(measure(args.root, args.check)))
+        return
+    if args.command == "_exit":
+        _exit_case(args.case)
+    if args.command == "exit":
+        sys.exit(1 if check_exit_times() else 0)
+
+    if args.command == "generate":
+        routes, components, lock_packages = SIZES[args.size]
+        os.makedirs(args.dest, exist_ok=True)
+        generate_tree(args.dest, args.routes or routes, args.components or components,
+                      args.lock_packages or lock_packages, args.seed)
+        print(f"INFO: proyecto sintetico generado en {args.dest}")
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import audit_launch  # noqa: F401  (registers the checks)
+    from audit_engine import CHECKS
+    names = [n for n in CHECKS if not args.only or n in args.only] + ([] if args.only else [ALL_CHECKS])
+
+    tree = args.tree
+    tmp = None
+    if tree is None:
+        tmp = tree = tempfile.mkdtemp(prefix="audit-bench-")
+        started = time.perf_counter()
+        generate_tree(tree, *SIZES[args.size], seed=args.seed)
+        print(f"INFO: arbol '{args.size}' generado en {time.perf_counter() - started:.1f} s ({tree})")
+    try:
+        rows = run_benchmark(tree, names)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    started = datetime.now()
+    results = {
+        "timestamp": started.isoformat(),
+        "size": None if args.tree else args.size,
+        "tree": args.tree,
+        "shape": None if args.tree else dict(zip(("routes", "components", "lock_packages"), SIZES[args.size])),
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+        "checks": rows,
+    }
+    output = args.output or os.path.join(PROJECT_ROOT, *RESULTS_DIR.split("/"),
+                                         f"{started:%Y%m%d-%H%M%S}-{args.size if not args.tree else 'tree'}.json")
+    write_json_atomic(output, results, indent=2)
+    print(f"INFO: resultados en {output}")
+
+
+if __name__ == "__main__":
+    main()
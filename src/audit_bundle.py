@@ -0,0 +1,229 @@
+import os
+import json
+import zlib
+
+import audit_tslex
+from audit_tslex import tokenize, directive, import_specifiers, resolve_import
+from audit_cache import file_cache
+from audit_index import NEXT_BUILD_MANIFESTS
+from audit_routes import SOURCE_EXTENSIONS, route_manifest
+from audit_rendering import _layouts
+
+# Client JavaScript per route: the import graph below every 'use client'
+# boundary reached from a page (and its layouts), weighed either from the
+# local `.next` build or from source sizes plus a package weight table.
+
+BUNDLE_SOURCES = ["app/**", "components/**", "hooks/**", "lib/**", "utils/**", "store/**", "types/**", "schemas/**"]
+CONFIG_PATH = "audit.config.json"
+NEXT_DIR = ".next"
+
+# Initial client JS per route (gzip KB), including the framework runtime.
+# audit.config.json: {"client_js_budget_kb": 200, "client_js_budget_routes": {"/[slug]": 150}}
+DEFAULT_BUDGET_KB = 200.0
+
+# Estimate mode: framework runtime shared by every route (react-dom, next router).
+FRAMEWORK_KB = 95.0
+# Minified size relative to TS/TSX source, applied to its gzip size.
+MINIFY_RATIO = 0.6
+# gzip KB as (base, per imported name) for packages that tree-shake by export.
+PACKAGE_WEIGHTS_KB = {
+    "lucide-react": (0.0, 0.5),
+    "date-fns": (0.0, 1.0),
+    "sonner": (10.0, 0.0),
+    "framer-motion": (45.0, 0.0),
+    "recharts": (95.0, 0.0),
+    "swr": (4.5, 0.0),
+    "zustand": (1.2, 0.0),
+    "@supabase/supabase-js": (48.0, 0.0),
+    "@supabase/ssr": (50.0, 0.0),
+    "react-day-picker": (22.0, 0.0),
+    "react-easy-crop": (8.0, 0.0),
+    "react-google-recaptcha": (4.0, 0.0),
+    "jspdf": (110.0, 0.0),
+    "jspdf-autotable": (18.0, 0.0),
+    "@react-pdf/renderer": (430.0, 0.0),
+    "qrcode": (14.0, 0.0),
+    "zod": (14.0, 0.0),
+    "clsx": (0.4, 0.0),
+    "tailwind-merge": (7.0, 0.0),
+    "class-variance-authority": (1.0, 0.0),
+    "@radix-ui/react-slot": (1.5, 0.0),
+    "stripe": (80.0, 0.0),
+    "resend": (12.0, 0.0),
+}
+UNKNOWN_PACKAGE_KB = 10.0
+# Part of FRAMEWORK_KB / the shared runtime.
+FRAMEWORK_PACKAGES = ("react", "react-dom", "next", "scheduler")
+# Must never reach the browser (secrets, Node-only APIs).
+SERVER_ONLY_PACKAGES = {"stripe", "resend", "server-only", "fs", "path", "crypto"}
+
+
+def package_name(spec):
+    parts = spec.split("/")
+    return "/".join(parts[:2]) if spec.startswith("@") else parts[0]
+
+
+def analyze_batch(batch):
+    """Process-pool worker: directive, imports and gzip size of each source file."""
+    root, rel_paths = batch
+    out = {}
+    for rel_path in rel_paths:
+        with open(os.path.join(root, *rel_path.split("/")), "rb") as f:
+            data = f.read()
+        tokens = tokenize(data.decode("utf-8", errors="replace"))
+        out[rel_path] = {
+            "directive": directive(tokens),
+            "gzip_bytes": len(zlib.compress(data, 6)),
+            "imports": [[spec, kind, names] for spec, kind, names in import_specifiers(tokens) if kind != "type"],
+        }
+    return out
+
+
+def load_config(index):
+    config = {}
+    if index.exists(CONFIG_PATH):
+        try:
+            config = json.loads(index.text(CONFIG_PATH))
+        except ValueError:
+            pass
+    return float(config.get("client_js_budget_kb", DEFAULT_BUDGET_KB)), config.get("client_js_budget_routes", {})
+
+
+class ClientGraph:
+    def __init__(self, index, facts):
+        self.index = index
+        self.facts = facts
+        self._resolved = {}
+
+    def _targets(self, rel_path):
+        # Every route walks the shared components again: resolve each file once.
+        if rel_path not in self._resolved:
+            self._resolved[rel_path] = [
+                (spec, kind, names, resolve_import(self.index.exists, rel_path, spec))
+                for spec, kind, names in self.facts.get(rel_path, {}).get("imports", [])
+            ]
+        return self._resolved[rel_path]
+
+    def client_entries(self, roots):
+        """'use client' files reached from server components `roots`."""
+        entries, seen, stack = [], set(roots), list(roots)
+        while stack:
+            rel_path = stack.pop()
+            if self.facts.get(rel_path, {}).get("directive") == "use client":
+                entries.append(rel_path)
+                continue
+            for _, kind, _, target in self._targets(rel_path):
+                if target and target in self.facts and target not in seen and kind == "static":
+                    seen.add(target)
+                    stack.append(target)
+        return sorted(entries)
+
+    def closure(self, entries):
+        """Project files and package imports in the initial client bundle of `entries`."""
+        files, packages, seen, stack = [], {}, set(entries), list(entries)
+        while stack:
+            rel_path = stack.pop()
+            files.append(rel_path)
+            for spec, kind, names, target in self._targets(rel_path):
+                if kind == "dynamic":
+                    continue  # separate lazy chunk
+                if target:
+                    # Server actions ship as an RPC stub, not their module.
+                    if target in self.facts and target not in seen \
+                            and self.facts[target]["directive"] != "use server":
+                        seen.add(target)
+                        stack.append(target)
+                    continue
+                if spec.startswith((".", "@/")) or spec.endswith((".css", ".scss")):
+                    continue
+                name = package_name(spec)
+                if name in FRAMEWORK_PACKAGES or name.startswith("next/"):
+                    continue
+                packages.setdefault(name, set()).update(names)
+        return sorted(files), packages
+
+
+def estimate_kb(graph, files, packages):
+    project = sum(graph.facts[f]["gzip_bytes"] for f in files) * MINIFY_RATIO / 1024
+    weights = {}
+    for name, names in packages.items():
+        base, per_name = PACKAGE_WEIGHTS_KB.get(name, (UNKNOWN_PACKAGE_KB, 0.0))
+        weights[name] = round(base + per_name * len(names - {"default"}), 1)
+    return project, weights
+
+
+def build_sizes(root):
+    """Per app entry ("/(dashboard)/inicio/page") gzip KB from a local `.next`
+    build, or None when there is no build output."""
+    manifest_path, build_manifest_path = (os.path.join(root, *p.split("/")) for p in NEXT_BUILD_MANIFESTS)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            app_manifest = json.load(f).get("pages", {})
+    except (OSError, ValueError):
+        return None
+    shared = []
+    try:
+        with open(build_manifest_path, "r", encoding="utf-8") as f:
+            build_manifest = json.load(f)
+        shared = build_manifest.get("rootMainFiles", []) + build_manifest.get("polyfillFiles", [])
+    except (OSError, ValueError):
+        pass
+
+    chunk_kb = {}
+
+    def size(chunk):
+        if chunk not in chunk_kb:
+            try:
+                with open(os.path.join(root, NEXT_DIR, *chunk.split("/")), "rb") as f:
+                    chunk_kb[chunk] = len(zlib.compress(f.read(), 6)) / 1024
+            except OSError:
+                chunk_kb[chunk] = 0.0
+        return chunk_kb[chunk]
+
+    sizes = {}
+    for entry, chunks in app_manifest.items():
+        js = sorted({c for c in list(chunks) + shared if c.endswith(".js")})
+        sizes[entry] = round(sum(size(c) for c in js), 1)
+    return sizes
+
+
+def client_weights(ctx):
+    index = ctx.index
+    manifest = route_manifest(ctx)
+    files = sorted({p for g in BUNDLE_SOURCES for p in index.glob(g) if p.endswith(SOURCE_EXTENSIONS)})
+    facts, analysed = file_cache(ctx).map_files("client_bundle", analyze_batch, files, depends=[audit_tslex])
+    graph = ClientGraph(index, facts)
+    budget, route_budgets = load_config(index)
+    built = build_sizes(index.root)
+
+    routes = []
+    for entry in manifest["routes"]:
+        if entry["kind"] != "page":
+            continue
+        roots = _layouts(index, entry["file"]) + [entry["file"]]
+        client_entries = graph.client_entries(roots)
+        closure, packages = graph.closure(client_entries)
+        project_kb, package_kb = estimate_kb(graph, closure, packages)
+        route_budget = float(route_budgets.get(entry["route"], budget))
+        result = {
+            "route": entry["route"],
+            "client_entries": len(client_entries),
+            "files": len(closure),
+            "project_kb": round(project_kb, 1),
+            "packages_kb": dict(sorted(package_kb.items(), key=lambda kv: -kv[1])),
+            "budget_kb": route_budget,
+        }
+        build_key = "/" + entry["file"][len("app/"):].rsplit(".", 1)[0]
+        if built is not None and build_key in built:
+            result["total_kb"] = built[build_key]
+            result["source"] = "build"
+        else:
+            result["total_kb"] = round(FRAMEWORK_KB + project_kb + sum(package_kb.values()), 1)
+            result["source"] = "estimate"
+        server_only = sorted(SERVER_ONLY_PACKAGES & set(packages))
+        if server_only:
+            result["server_only_in_client"] = server_only
+        result["over_budget"] = result["total_kb"] > route_budget
+        routes.append(result)
+    routes.sort(key=lambda r: -r["total_kb"])
+    return routes, {"budget_kb": budget, "build_output": built is not None, "files_reanalysed": analysed}
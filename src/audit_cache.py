@@ -0,0 +1,252 @@
+import os
+import json
+import hashlib
+import inspect
+import tempfile
+import threading
+
+from audit_engine import parallel_map, split_batches
+
+CACHE_VERSION = 1
+CACHE_PATH = "artifacts/audit_cache.json"
+FILE_CACHE_PATH = "artifacts/audit_file_cache.json"
+FILE_CACHE_MAX_ENTRIES = 20000
+
+# Files the audit tooling itself writes (caches, reports, history, the route
+# manifest, temp files of atomic writes): they change on every run, so they are
+# no check's input, the secrets scan skips them and watch mode ignores them.
+OUTPUT_PREFIXES = ("artifacts/audit_", "artifacts/route_manifest", "artifacts/explain_report", "artifacts/.tmp-")
+
+# Below this many bytes of cache misses a process pool costs more than it saves.
+PARALLEL_MIN_BYTES = 1 << 20
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates 0600 files; the reports are shared, so they get the mode
+# open() would have given them.
+DEFAULT_FILE_MODE = 0o666 & ~_umask()
+
+
+def write_json_atomic(path, data, indent=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+        os.chmod(tmp_path, DEFAULT_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+_source_hashes = {}
+_source_lock = threading.Lock()
+
+
+def _source_hash(path):
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    with _source_lock:
+        cached = _source_hashes.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+    digest = sha256_file(path)
+    with _source_lock:
+        _source_hashes[path] = (key, digest)
+    return digest
+
+
+def _code_hash(check):
+    # Editing a check's module, or any audit_*.py helper next to it (checks
+    # registered in audit_launch.py do their work in those), invalidates its
+    # cached results.
+    source = inspect.getsourcefile(check.func)
+    if not source:
+        return check.name
+    directory = os.path.dirname(os.path.abspath(source))
+    modules = sorted({os.path.abspath(source)} | {
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.startswith("audit_") and name.endswith(".py")})
+    h = hashlib.sha256()
+    for path in modules:
+        h.update(os.path.basename(path).encode("utf-8") + b"\0" + _source_hash(path).encode("ascii"))
+    return h.hexdigest()
+
+
+class AuditCache:
+    """Persistent manifest of check results keyed on the inputs each check reads.
+
+    An input is considered unchanged when its size and mtime match the manifest;
+    otherwise its content hash decides, so a `touch` or a checkout that restores
+    identical content does not force a re-run. Inputs come from the shared
+    RepoIndex snapshot, and glob `reads` are expanded against it so adding or
+    removing a matching file also invalidates the check.
+    """
+
+    def __init__(self, ctx, path=CACHE_PATH):
+        self.ctx = ctx
+        self.path = ctx.path(path)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CACHE_VERSION:
+                self.entries = manifest.get("checks", {})
+        except (OSError, ValueError):
+            pass
+
+    def _fingerprint(self, rel_path, previous=None):
+        entry = self.ctx.index.get(rel_path)
+        if entry is None:
+            return None
+        stat = {"size": entry.size, "mtime_ns": entry.mtime_ns}
+        if previous and previous["size"] == stat["size"] and previous["mtime_ns"] == stat["mtime_ns"]:
+            stat["sha256"] = previous["sha256"]
+        else:
+            stat["sha256"] = self.ctx.index.sha256(rel_path)
+        return stat
+
+    def lookup(self, check):
+        entry = self.entries.get(check.name)
+        if not entry or entry.get("code") != _code_hash(check):
+            return None
+        if sorted(entry["inputs"]) != self.ctx.index.resolve(check.reads):
+            return None
+        refreshed = {}
+        for rel_path, previous in entry["inputs"].items():
+            current = self._fingerprint(rel_path, previous)
+            if (current is None) != (previous is None):
+                return None
+            if current is not None and current["sha256"] != previous["sha256"]:
+                return None
+            refreshed[rel_path] = current
+        if refreshed != entry["inputs"]:
+            entry["inputs"] = refreshed
+            self.dirty = True
+        return entry["result"]
+
+    def store(self, check, result):
+        self.entries[check.name] = {
+            "code": _code_hash(check),
+            "inputs": {rel_path: self._fingerprint(rel_path) for rel_path in self.ctx.index.resolve(check.reads)},
+            "result": result,
+        }
+        self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            write_json_atomic(self.path, {"version": CACHE_VERSION, "checks": self.entries})
+            self.dirty = False
+
+
+def _modules_hash(funcs_or_modules):
+    h = hashlib.sha256()
+    for obj in funcs_or_modules:
+        h.update(sha256_file(inspect.getsourcefile(obj)).encode())
+    return h.hexdigest()
+
+
+class FileResultCache:
+    """Per-file analysis results keyed on content hash, shared by the per-file
+    analyzers (auth guards, waterfalls...).
+
+    `worker((root, rel_paths)) -> {rel_path: result}` must be a module-level
+    function; cache misses are split into batches and analysed in a process
+    pool. Results are invalidated when the worker's module (or any module in
+    `depends`) changes.
+
+    With `persist=False` nothing is written: the results computed here are
+    kept in `added` ({analyzer: {"code", "results"}}) for another process to
+    merge() into the shared file, so concurrent users do not overwrite each
+    other's entries.
+    """
+
+    def __init__(self, ctx, path=FILE_CACHE_PATH, persist=True):
+        self.ctx = ctx
+        self.path = path if os.path.isabs(path) else ctx.path(path)
+        self.persist = persist
+        self.analyzers = {}
+        self.added = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CACHE_VERSION:
+                self.analyzers = manifest.get("analyzers", {})
+        except (OSError, ValueError):
+            pass
+
+    def map_files(self, name, worker, rel_paths, depends=(), max_workers=None):
+        index = self.ctx.index
+        code = _modules_hash([worker, *depends])
+        hashes = {p: index.sha256(p) for p in rel_paths}
+
+        with self._lock:
+            store = self.analyzers.get(name)
+            if not store or store.get("code") != code:
+                store = self.analyzers[name] = {"code": code, "results": {}}
+            known = store["results"]
+            misses = sorted({p for p, sha in hashes.items() if sha not in known}, key=lambda p: hashes[p])
+
+        if misses:
+            sizes = [index.get(p).size for p in misses]
+            workers = max_workers or os.cpu_count() or 1
+            if sum(sizes) < PARALLEL_MIN_BYTES:
+                workers = 1
+            batches = split_batches(misses, sizes, workers)
+            computed = {}
+            for result in parallel_map(worker, [(index.root, b) for b in batches], max_workers=workers):
+                computed.update(result)
+            results = {hashes[rel_path]: result for rel_path, result in computed.items()}
+            with self._lock:
+                known.update(results)
+                # Read back below before any trimming drops them.
+                found = {p: known[sha] for p, sha in hashes.items()}
+                added = self.added.get(name)
+                if not added or added["code"] != code:
+                    added = self.added[name] = {"code": code, "results": {}}
+                added["results"].update(results)
+                self._trim(known)
+                if self.persist:
+                    self.save()
+            return found, len(misses)
+
+        return {p: known[sha] for p, sha in hashes.items()}, len(misses)
+
+    def merge(self, added):
+        """Adds the `added` results of another FileResultCache."""
+        with self._lock:
+            for name, delta in added.items():
+                store = self.analyzers.get(name)
+                if not store or store.get("code") != delta["code"]:
+                    store = self.analyzers[name] = {"code": delta["code"], "results": {}}
+                store["results"].update(delta["results"])
+                self._trim(store["results"])
+
+    def save(self):
+        write_json_atomic(self.path, {"version": CACHE_VERSION, "analyzers": self.analyzers})
+
+    @staticmethod
+    def _trim(known):
+        while len(known) > FILE_CACHE_MAX_ENTRIES:
+            known.pop(next(iter(known)))
+
+
+def file_cache(ctx):
+    return ctx.memo("file_cache", lambda c: FileResultCache(c))
@@ -0,0 +1,226 @@
+import os
+import re
+import json
+
+import audit_tslex
+from audit_cache import file_cache
+from audit_routes import SOURCE_EXTENSIONS
+from audit_bundle import BUNDLE_SOURCES, analyze_batch, package_name
+
+# Dependency footprint from package-lock.json: duplicated versions, the
+# transitive closure of each direct dependency and how many source files
+# actually import it.
+
+LOCKFILE_PATH = "package-lock.json"
+NODE_MODULES = "node_modules"
+DEPS_SOURCES = BUNDLE_SOURCES + ["middleware.ts", "next.config.ts"]
+
+# Used by tooling or the framework, never imported from app code.
+TOOLING_PACKAGES = {"next", "react-dom", "typescript", "eslint", "eslint-config-next", "tailwindcss",
+                    "@tailwindcss/postcss"}
+
+# The only fields of a lockfile entry the analysis reads; integrity, resolved,
+# engines, license... are dropped as each entry is decoded.
+LOCK_FIELDS = ("version", "dev", "link", "dependencies", "optionalDependencies", "devDependencies")
+
+_WS_RE = re.compile(rb"[ \t\r\n]*")
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_SCALAR_RE = re.compile(rb'[^,}\]\s]+')
+# Everything up to the next bracket outside a string, and that bracket.
+_BRACKET_RE = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+
+
+def _skip_ws(buf, pos):
+    return _WS_RE.match(buf, pos).end()
+
+
+def _char(buf, pos):
+    if pos >= len(buf):
+        raise ValueError(f"{LOCKFILE_PATH}: unexpected end of input")
+    return buf[pos:pos + 1]
+
+
+def _skip_value(buf, pos):
+    """End of the JSON value at `pos` (brackets matched outside strings, nothing decoded)."""
+    first = _char(buf, pos)
+    if first == b'"':
+        match = _STRING_RE.match(buf, pos)
+    elif first not in (b"[", b"{"):
+        match = _SCALAR_RE.match(buf, pos)
+    else:
+        depth, end = 0, pos
+        while True:
+            match = _BRACKET_RE.match(buf, end)
+            if match is None:
+                break
+            end = match.end()
+            depth += 1 if match.group(1) in (b"[", b"{") else -1
+            if not depth:
+                return end
+    if match is None:
+        raise ValueError(f"{LOCKFILE_PATH}: unterminated JSON value at {pos}")
+    return match.end()
+
+
+def _members(buf, pos):
+    """Yields (key, value start, value end) for the object opening at `pos`."""
+    if _char(buf, pos) != b"{":
+        raise ValueError(f"{LOCKFILE_PATH}: expected an object at {pos}")
+    pos = _skip_ws(buf, pos + 1)
+    if _char(buf, pos) == b"}":
+        return
+    while True:
+        end = _skip_value(buf, pos)
+        key = json.loads(buf[pos:end])
+        pos = _skip_ws(buf, end)
+        if _char(buf, pos) != b":":
+            raise ValueError(f"{LOCKFILE_PATH}: expected ':' at {pos}")
+        start = _skip_ws(buf, pos + 1)
+        end = _skip_value(buf, start)
+        yield key, start, end
+        pos = _skip_ws(buf, end)
+        if _char(buf, pos) == b"}":
+            return
+        if buf[pos:pos + 1] != b",":
+            raise ValueError(f"{LOCKFILE_PATH}: expected ',' or '}}' at {pos}")
+        pos = _skip_ws(buf, pos + 1)
+
+
+def lock_packages(buf):
+    """{install path: entry} from the lockfile's "packages" object (lockfile
+    v2/v3; empty for v1 lockfiles, which do not have it), parsed from the raw
+    buffer one entry at a time with only LOCK_FIELDS kept. Members before
+    "packages" are skipped without decoding and the ones after it (the v1
+    "dependencies" tree of a v2 lockfile) are not read at all."""
+    for key, start, end in _members(buf, _skip_ws(buf, 0)):
+        if key == "packages":
+            packages = {}
+            for path, entry_start, entry_end in _members(buf, start):
+                entry = json.loads(buf[entry_start:entry_end])
+                packages[path] = {k: entry[k] for k in LOCK_FIELDS if k in entry}
+            return packages
+    return {}
+
+
+def installed_name(path):
+    return path.rsplit(NODE_MODULES + "/", 1)[-1]
+
+
+def resolve_dependency(packages, from_path, name):
+    """Install path `name` resolves to when required from `from_path` (Node lookup)."""
+    base = from_path
+    while True:
+        candidate = f"{base}/{NODE_MODULES}/{name}" if base else f"{NODE_MODULES}/{name}"
+        if candidate in packages:
+            return candidate
+        if not base:
+            return None
+        cut = base.rfind("/" + NODE_MODULES + "/")
+        base = base[:cut] if cut >= 0 else ""
+
+
+def closure(packages, start):
+    seen, stack = {start}, [start]
+    while stack:
+        path = stack.pop()
+        entry = packages[path]
+        for name in {**entry.get("dependencies", {}), **entry.get("optionalDependencies", {})}:
+            target = resolve_dependency(packages, path, name)
+            if target and target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def disk_size(root, install_path):
+    """Bytes on disk of an installed package (not its nested node_modules), or None."""
+    top = os.path.join(root, *install_path.split("/"))
+    if not os.path.isdir(top):
+        return None
+    total, stack = 0, [top]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name != NODE_MODULES:
+                        stack.append(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    total += e.stat(follow_symlinks=False).st_size
+    return total
+
+
+def import_counts(ctx):
+    """{package: [files importing it]} over the project sources."""
+    index = ctx.index
+    files = sorted({p for g in DEPS_SOURCES for p in index.glob(g) if p.endswith(SOURCE_EXTENSIONS)})
+    facts, analysed = file_cache(ctx).map_files("client_bundle", analyze_batch, files, depends=[audit_tslex])
+    users = {}
+    for rel_path, file_facts in facts.items():
+        for spec, _, _ in file_facts["imports"]:
+            if spec.startswith((".", "@/")) or spec.endswith((".css", ".scss")):
+                continue
+            users.setdefault(package_name(spec), set()).add(rel_path)
+    return {name: sorted(paths) for name, paths in users.items()}, analysed
+
+
+def dependency_footprint(ctx):
+    index = ctx.index
+    if not index.exists(LOCKFILE_PATH):
+        return None
+    packages = lock_packages(index.data(LOCKFILE_PATH))
+    root_entry = packages.get("", {})
+    has_modules = os.path.isdir(os.path.join(index.root, NODE_MODULES))
+    sizes = {}
+
+    def size_of(path):
+        if path not in sizes:
+            sizes[path] = disk_size(index.root, path) if has_modules else None
+        return sizes[path]
+
+    versions = {}
+    for path, entry in packages.items():
+        if path and not entry.get("link"):
+            versions.setdefault(installed_name(path), {}).setdefault(entry.get("version"), []).append(path)
+    duplicates = [
+        {"package": name, "versions": sorted(v for v in by_version if v),
+         "dev_only": all(packages[p].get("dev") for paths in by_version.values() for p in paths)}
+        for name, by_version in versions.items() if len(by_version) > 1
+    ]
+    duplicates.sort(key=lambda d: (d["dev_only"], -len(d["versions"]), d["package"]))
+
+    users, analysed = import_counts(ctx)
+    direct = []
+    for kind in ("dependencies", "devDependencies"):
+        for name in root_entry.get(kind, {}):
+            path = resolve_dependency(packages, "", name)
+            if path is None:
+                continue
+            reached = closure(packages, path)
+            measured = [size_of(p) for p in reached]
+            direct.append({
+                "package": name,
+                "dev": kind == "devDependencies",
+                "version": packages[path].get("version"),
+                "transitive_packages": len(reached),
+                "transitive_kb": round(sum(measured) / 1024, 1) if None not in measured else None,
+                "imported_by": len(users.get(name, [])),
+            })
+    direct.sort(key=lambda d: (d["dev"], -(d["transitive_kb"] or 0), -d["transitive_packages"]))
+
+    runtime = [d for d in direct if not d["dev"] and not d["package"].startswith("@types/")]
+    single_import = {d["package"]: users[d["package"]][0] for d in runtime if d["imported_by"] == 1}
+    unused = [d["package"] for d in runtime if not d["imported_by"] and d["package"] not in TOOLING_PACKAGES]
+    summary = {
+        "installed_packages": sum(1 for p in packages if p),
+        "dev_only_packages": sum(1 for p, e in packages.items() if p and e.get("dev")),
+        "duplicated_packages": len(duplicates),
+        "sizes": "node_modules" if has_modules else "unavailable",
+        "files_reanalysed": analysed,
+    }
+    return {
+        "summary": summary,
+        "duplicates": duplicates,
+        "direct": direct,
+        "single_import": single_import,
+        "unused": unused,
+    }
@@ -0,0 +1,250 @@
+import os
+import sys
+import time
+import queue
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Default wall-clock limits (seconds). `budget` is soft: the check finishes but is
+# flagged as over budget. `timeout` is hard: the runner stops waiting for it.
+DEFAULT_BUDGET = 5.0
+DEFAULT_TIMEOUT = 30.0
+
+# Worker threads still running a check the runner gave up on (timeout or
+# fail-fast). They are daemon threads, so they never hold the interpreter up;
+# exit_process() also skips the atexit hooks they could block (process pools).
+_abandoned = []
+
+
+@dataclass
+class Check:
+    name: str
+    func: Callable
+    reads: List[str] = field(default_factory=list)
+    budget: float = DEFAULT_BUDGET
+    timeout: float = DEFAULT_TIMEOUT
+
+
+class AuditContext:
+    """Per-run state shared by all checks. The repository index is built on
+    first use and then shared, so the tree is walked once per audit."""
+
+    def __init__(self, root, index=None):
+        self.root = root
+        self._index = index
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._memo_locks = {}
+
+    def path(self, rel_path):
+        return os.path.join(self.root, *rel_path.split("/"))
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                from audit_index import RepoIndex
+                self._index = RepoIndex.build(self.root)
+            return self._index
+
+    def memo(self, key, factory):
+        """Computes `factory(self)` once per run for derived data several checks
+        need (route manifest, parsed schemas...)."""
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+            key_lock = self._memo_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._memo:
+                self._memo[key] = factory(self)
+            return self._memo[key]
+
+
+CHECKS: Dict[str, Check] = {}
+
+
+def register_check(name, reads=(), budget=DEFAULT_BUDGET, timeout=DEFAULT_TIMEOUT):
+    """Registers `func(ctx)` as an audit check. `reads` lists the project-relative
+    paths the check depends on."""
+    def decorator(func):
+        CHECKS[name] = Check(name=name, func=func, reads=list(reads), budget=budget, timeout=timeout)
+        return func
+    return decorator
+
+
+def _run_one(check, ctx, started, on_event=None):
+    started[check.name] = time.perf_counter()
+    if on_event is not None:
+        on_event("check_started", check, None)
+    try:
+        result, completed = check.func(ctx), True
+    except Exception as exc:
+        result, completed = {
+            "status": "CRITICAL",
+            "message": f"check failed: {exc.__class__.__name__}: {exc}",
+            "traceback": traceback.format_exc(limit=3),
+        }, False
+    return result, time.perf_counter() - started[check.name], completed
+
+
+def _worker(jobs, done, ctx, started, on_event):
+    while True:
+        try:
+            check = jobs.get_nowait()
+        except queue.Empty:
+            return
+        done.put((check, _run_one(check, ctx, started, on_event)))
+
+
+def _with_timing(check, result, elapsed):
+    result = dict(result)
+    result["duration_ms"] = round(elapsed * 1000, 1)
+    result["budget_ms"] = round(check.budget * 1000, 1)
+    if elapsed > check.budget:
+        result["over_budget"] = True
+    return result
+
+
+def run_checks(checks: List[Check], ctx: AuditContext, max_workers: Optional[int] = None, cache=None,
+               on_event: Optional[Callable] = None, fail_fast: bool = False):
+    """Runs checks concurrently and returns {name: result} in registration order.
+
+    A check that exceeds its timeout is reported as WARNING and abandoned; its
+    worker (a daemon thread) is left to finish in the background so neither
+    the rest of the audit nor the process exit is held up. With a `cache` (see
+    audit_cache.AuditCache), checks whose inputs are unchanged reuse their
+    previous result and are not run.
+
+    `on_event(kind, check, result)` is called with "check_started" (from the
+    worker thread) and "check_finished" (once the result is final). With
+    `fail_fast`, the first CRITICAL result abandons the checks still pending
+    and reports them as SKIPPED.
+    """
+    results = {}
+    if not checks:
+        return results
+
+    def finish(check, result):
+        results[check.name] = result
+        if on_event is not None:
+            on_event("check_finished", check, result)
+
+    def skip_rest(remaining, cause):
+        for check in remaining:
+            finish(check, {"status": "SKIPPED", "message": f"fail-fast: {cause} is CRITICAL"})
+
+    to_run = []
+    for check in checks:
+        lookup_start = time.perf_counter()
+        cached = cache.lookup(check) if cache is not None else None
+        if cached is None:
+            to_run.append(check)
+        else:
+            result = _with_timing(check, cached, time.perf_counter() - lookup_start)
+            result["cached"] = True
+            finish(check, result)
+    critical = next((name for name, r in results.items() if r["status"] == "CRITICAL"), None)
+    if fail_fast and critical and to_run:
+        skip_rest(to_run, critical)
+        to_run = []
+    if not to_run:
+        if cache is not None:
+            cache.save()
+        return {check.name: results[check.name] for check in checks}
+
+    started = {}
+    jobs, done = queue.Queue(), queue.Queue()
+    for check in to_run:
+        jobs.put(check)
+    workers = [threading.Thread(target=_worker, args=(jobs, done, ctx, started, on_event),
+                                name=f"audit_{i}", daemon=True)
+               for i in range(min(max_workers or len(to_run), len(to_run)))]
+    for worker in workers:
+        worker.start()
+    pending = {check.name: check for check in to_run}
+    try:
+        while pending:
+            now = time.perf_counter()
+            deadline = min(started.get(name, now) + check.timeout for name, check in pending.items())
+            try:
+                check, (result, elapsed, completed) = done.get(timeout=max(0.0, deadline - now))
+            except queue.Empty:
+                check = None
+            if check is not None and pending.pop(check.name, None) is not None:
+                if completed and cache is not None:
+                    cache.store(check, result)
+                finish(check, _with_timing(check, result, elapsed))
+
+            now = time.perf_counter()
+            for name, timed in list(pending.items()):
+                if name in started and now - started[name] >= timed.timeout:
+                    finish(timed, _with_timing(
+                        timed,
+                        {"status": "WARNING", "message": f"TIMEOUT after {timed.timeout:.1f}s"},
+                        now - started[name],
+                    ))
+                    del pending[name]
+
+            if fail_fast and pending and check is not None and results[check.name]["status"] == "CRITICAL":
+                skip_rest(list(pending.values()), check.name)
+                pending = {}
+    finally:
+        # Checks not started yet are dropped; the workers stop after their current one.
+        while True:
+            try:
+                jobs.get_nowait()
+            except queue.Empty:
+                break
+        _abandoned[:] = [worker for worker in _abandoned + workers if worker.is_alive()]
+        if cache is not None:
+            cache.save()
+
+    return {check.name: results[check.name] for check in checks}
+
+
+def exit_process(code=0):
+    """sys.exit(code), unless abandoned checks are still running: then stdout
+    and stderr are flushed and the process ends at once (os._exit), without
+    the atexit hooks that would wait for them."""
+    if any(worker.is_alive() for worker in _abandoned):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+    sys.exit(code)
+
+
+def split_batches(items, sizes, batches):
+    """Greedily splits `items` into at most `batches` lists of similar total size."""
+    buckets = [[] for _ in range(max(1, batches))]
+    loads = [0] * len(buckets)
+    for item, size in sorted(zip(items, sizes), key=lambda pair: -pair[1]):
+        i = loads.index(min(loads))
+        buckets[i].append(item)
+        loads[i] += size
+    return [b for b in buckets if b]
+
+
+def parallel_map(func, batches, max_workers=None):
+    """Maps a picklable module-level `func` over `batches` in a process pool.
+
+    Uses "spawn" so behaviour matches Windows and forking from the check
+    threads is avoided. A single batch runs in-process.
+    """
+    if len(batches) <= 1:
+        return [func(batch) for batch in batches]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers or len(batches), mp_context=ctx) as pool:
+        return list(pool.map(func, batches))
+
+
+def compute_verdict(checks_data):
+    statuses = [c["status"] for c in checks_data.values()]
+    if "CRITICAL" in statuses:
+        return "NOT_READY"
+    if "WARNING" in statuses:
+        return "NEEDS_ATTENTION"
+    return "READY_FOR_MARKET"
@@ -0,0 +1,67 @@
+import sys
+import json
+import time
+import threading
+
+# NDJSON event stream for `audit_launch.py --stream`: one JSON object per
+# line on stdout as the audit runs, so a dashboard can show live progress.
+#
+#   {"event": "audit_started", "checks": [...]}
+#   {"event": "check_started", "check": "secrets"}
+#   {"event": "check_finished", "check": "secrets", "status": "SUCCESS", "duration_ms": 812.4, "files_read": 334}
+#   {"event": "finding", "check": "indexes", "status": "WARNING", "finding": {...}}
+#   {"event": "summary", "verdict": "NEEDS_ATTENTION", "exit_code": 1, ...}
+
+# Process exit code per verdict in stream mode.
+EXIT_CODES = {"READY_FOR_MARKET": 0, "NEEDS_ATTENTION": 1, "NOT_READY": 2}
+
+
+class EventStream:
+    def __init__(self, index, finding_keys=None, out=None):
+        self.index = index
+        self.finding_keys = finding_keys or {}
+        self.out = out or sys.stdout
+        self._lock = threading.Lock()
+        self._finished = set()
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, ensure_ascii=False, default=str)
+        with self._lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def findings(self, name, result):
+        """Individual findings of one check result: `details[key]` for each key
+        registered for the check (default "findings"), items of lists and dicts."""
+        details = result.get("details")
+        if not isinstance(details, dict):
+            return []
+        found = []
+        for key in self.finding_keys.get(name, ("findings",)):
+            value = details.get(key)
+            if isinstance(value, list):
+                found.extend(value)
+            elif isinstance(value, dict):
+                found.extend({"key": k, "value": v} for k, v in value.items())
+        return found
+
+    def on_check(self, kind, check, result):
+        """`run_checks(on_event=...)` callback."""
+        if kind == "check_started":
+            with self._lock:
+                if check.name in self._finished:  # abandoned by fail-fast
+                    return
+            self.emit("check_started", check=check.name)
+            return
+        with self._lock:
+            self._finished.add(check.name)
+        fields = {k: result[k] for k in ("status", "duration_ms", "budget_ms", "message") if k in result}
+        fields["cached"] = bool(result.get("cached"))
+        if result.get("over_budget"):
+            fields["over_budget"] = True
+        if result["status"] != "SKIPPED":
+            fields["files_read"] = len(self.index.resolve(check.reads))
+        self.emit("check_finished", check=check.name, **fields)
+        if result["status"] in ("WARNING", "CRITICAL"):
+            for finding in self.findings(check.name, result):
+                self.emit("finding", check=check.name, status=result["status"], finding=finding)
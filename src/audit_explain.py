@@ -0,0 +1,404 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+
+from audit_engine import AuditContext
+from audit_cache import write_json_atomic
+from audit_sql import SQL_SOURCES, load_statements, extract_indexes
+from audit_supabase import supabase_queries
+from audit_overfetch import catalogue
+
+# EXPLAIN harness: a throwaway local PostgreSQL with the schema the app
+# queries, synthetic data at a configurable scale and EXPLAIN (ANALYZE,
+# BUFFERS) of every query shape extracted from app/actions and the Python
+# materializer templates. Needs the PostgreSQL server binaries (initdb,
+# pg_ctl, psql) on PATH or in --pg-bin; not part of the audit run.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = "artifacts/explain_report.json"
+MIGRATIONS = "supabase/migrations/*.sql"
+EXPLAIN_SOURCES = ("app/actions/",)
+
+# Rows per table at --scale 1 (roughly today's production volume).
+BASE_ROWS = {
+    "perfiles": 100,
+    "barberos": 400,
+    "servicios": 800,
+    "citas": 20000,
+    "mis_mensajes": 30000,
+    "ventas_productos": 5000,
+    "fichajes_logs": 8000,
+}
+DEFAULT_ROWS = 1000
+DEFAULT_SCALE = 100
+# Days of history the synthetic dates spread over.
+HISTORY_DAYS = 730
+
+# Column types the catalogue does not spell out, by name.
+UUID_COLUMNS = {"barberia_id", "user_id", "usuario_id", "servicio_id", "afiliado_id"}
+BOOLEAN_COLUMNS = {"confirmada", "cancelada", "activo", "abierto", "leido", "onboarding_completado", "afiliado",
+                   "pagado", "no_show", "asistio"}
+NUMERIC_HINTS = ("precio", "importe", "total", "ingresos", "monto", "coste", "salario", "cantidad_eur")
+TYPE_OVERRIDES = {("perfiles", "id"): "uuid", ("citas", "barbero_id"): "text", ("citas", "barbero"): "text"}
+
+
+def _quote(column):
+    return f'"{column}"' if column != column.lower() or not re.match(r"^[a-z_][a-z0-9_]*$", column) else column
+
+
+def column_type(table, column, jsonb=()):
+    if (table, column) in TYPE_OVERRIDES:
+        return TYPE_OVERRIDES[(table, column)]
+    name = column.lower()
+    if column in jsonb or name in ("configuracion", "horario_semanal", "metadata", "detalles"):
+        return "jsonb"
+    if name == "uuid":
+        return "uuid"
+    if name.startswith("stripe_"):
+        return "text"
+    if name == "id" or name.endswith("_id"):
+        return "uuid" if name in UUID_COLUMNS else "bigint"
+    if name in BOOLEAN_COLUMNS or name.startswith(("is_", "es_")):
+        return "boolean"
+    if name in ("created_at", "updated_at") or name.startswith("timestamp") or name.endswith("_at"):
+        return "timestamptz"
+    if name in ("dia", "fecha") or name.startswith("fecha_"):
+        return "date"
+    if name in ("hora", "hora_inicio", "hora_fin"):
+        return "time"
+    if any(hint in name for hint in NUMERIC_HINTS):
+        return "numeric"
+    if name in ("duracion", "anio", "capacidad_slots", "cortes", "citas", "productos", "minutos"):
+        return "integer"
+    return "text"
+
+
+def value_sql(table, column, ctype, g, rows):
+    """SQL expression for row `g` of `table`; with g='1' it is a literal that
+    matches generated data, used as the filter value in the explained queries."""
+    shops = max(1, rows.get("perfiles", 1))
+    barbers = max(1, rows.get("barberos", 1))
+    if ctype == "uuid":
+        if column == "barberia_id" or (table == "perfiles" and column == "id"):
+            return f"md5((1 + ({g}) % {shops})::text)::uuid" if column == "barberia_id" else f"md5(({g})::text)::uuid"
+        return f"md5('{column}' || ({g}))::uuid"
+    if ctype == "bigint":
+        if column == "id":
+            return f"({g})::bigint"
+        if column == "barbero_id":
+            return f"(1 + ({g}) % {barbers})::bigint"
+        return f"(1 + ({g}) % 1000)::bigint"
+    if column == "barbero_id" or column == "barbero":
+        return f"(1 + ({g}) % {barbers})::text"
+    if ctype == "boolean":
+        return f"(({g}) % 7 = 0)" if column in ("cancelada", "no_show") else f"(({g}) % 2 = 0)"
+    if ctype == "timestamptz":
+        return f"(now() - (({g}) % ({HISTORY_DAYS} * 1440)) * interval '1 minute')"
+    if ctype == "date":
+        return f"(current_date - (({g}) % {HISTORY_DAYS})::int)"
+    if ctype == "time":
+        return f"make_time(9 + ({g}) % 11, (({g}) % 4) * 15, 0)"
+    if ctype == "numeric":
+        return f"(10 + ({g}) % 40)::numeric"
+    if ctype == "integer":
+        return f"(({g}) % 100)::int"
+    if ctype == "jsonb":
+        return "'{}'::jsonb"
+    if column.lower() == "telefono":
+        return f"('+346' || lpad((({g}) % 100000)::text, 8, '0'))"
+    if column == "slug":
+        return f"('shop-' || ({g}))"
+    return f"('{column}-' || (({g}) % 1000))"
+
+
+def _plain_columns(select):
+    """Columns of a PostgREST select list, or None when it embeds/aliases/uses '*'."""
+    if not select:
+        return None
+    columns = [c.strip() for c in select.split(",")]
+    if any(not re.match(r"^[A-Za-z_]\w*$", c) for c in columns):
+        return None
+    return columns
+
+
+def build_schema(ctx, queries):
+    """{table: {column: type}} from the table catalogue plus every column the
+    extracted queries and the repo's indexes touch."""
+    tables = catalogue(ctx)
+    schema = {}
+
+    def add(table, column):
+        info = tables.get(table.lower(), {"jsonb": []})
+        schema.setdefault(table, {"id": column_type(table, "id")})
+        if column not in schema[table] and column.lower() not in {c.lower() for c in schema[table]}:
+            schema[table][column] = column_type(table, column, info["jsonb"])
+
+    for query in queries:
+        add(query["table"], "id")
+        for _, column in query["filters"]:
+            add(query["table"], column)
+        for column in query["orders"]:
+            add(query["table"], column)
+        for column in _plain_columns(query["select"]) or ():
+            add(query["table"], column)
+    for table in BASE_ROWS:
+        add(table, "id")
+    for table in list(schema):
+        for column in tables.get(table.lower(), {}).get("columns", []):
+            add(table, column)
+    for idx in extract_indexes(load_statements(ctx.index, SQL_SOURCES)):
+        if idx.table in schema and idx.kind == "index":
+            for column in idx.columns:
+                if not column.startswith("expr:"):
+                    add(idx.table, column)
+    return schema
+
+
+def schema_sql(schema):
+    out = []
+    for table, columns in schema.items():
+        defs = ", ".join(f"{_quote(c)} {t}" + (" PRIMARY KEY" if c == "id" else "") for c, t in columns.items())
+        out.append(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({defs});")
+    return out
+
+
+def data_sql(schema, rows):
+    out = []
+    for table, columns in schema.items():
+        count = rows.get(table, DEFAULT_ROWS)
+        names = ", ".join(_quote(c) for c in columns)
+        values = ", ".join(value_sql(table, c, t, "g", rows) for c, t in columns.items())
+        out.append(f"INSERT INTO {_quote(table)} ({names}) SELECT {values} FROM generate_series(1, {count}) AS g;")
+    return out
+
+
+def index_sql(ctx, schema):
+    """The repo's CREATE INDEX statements whose columns exist in the harness schema."""
+    out = []
+    for idx in extract_indexes(load_statements(ctx.index, SQL_SOURCES)):
+        columns = schema.get(idx.table)
+        if not columns or idx.kind not in ("index", "unique") or idx.partial:
+            continue
+        if not all(c in columns for c in idx.columns):
+            continue
+        name = idx.name or f"idx_{idx.table}_{'_'.join(idx.columns)}".lower()
+        unique = "UNIQUE " if idx.kind == "unique" else ""
+        cols = ", ".join(_quote(c) for c in idx.columns)
+        out.append(f"CREATE {unique}INDEX IF NOT EXISTS {_quote(name)} ON {_quote(idx.table)} ({cols});")
+    return out
+
+
+def query_sql(query, schema, rows):
+    """The SQL PostgREST would run for one extracted query shape, or None."""
+    table = query["table"]
+    columns = schema[table]
+
+    def literal(column):
+        return value_sql(table, column, columns[column], "1", rows)
+
+    where = []
+    for op, column in query["filters"]:
+        col = _quote(column)
+        if op in ("eq", "is", "match"):
+            where.append(f"{col} = {literal(column)}")
+        elif op == "in":
+            where.append(f"{col} IN ({literal(column)})")
+        elif op in ("gt", "gte", "lt", "lte"):
+            where.append(f"{col} {dict(gt='>', gte='>=', lt='<', lte='<=')[op]} {literal(column)}")
+        elif op in ("like", "ilike"):
+            where.append(f"{col}::text {op.upper()} '%1%'")
+        elif op in ("contains", "containedBy", "overlaps"):
+            where.append(f"{col}::jsonb @> '{{}}'::jsonb")
+        elif op == "or":
+            where.append(f"({col} = {literal(column)} OR {col} IS NULL)")
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+    if query["operation"] == "select":
+        selected = _plain_columns(query["select"])
+        cols = ", ".join(_quote(c) for c in selected) if selected else "*"
+        order = f" ORDER BY {', '.join(_quote(c) + ' DESC' for c in query['orders'])}" if query["orders"] else ""
+        limit = " LIMIT 50" if query["bounded"] else ""
+        return f"SELECT {cols} FROM {_quote(table)}{clause}{order}{limit}"
+    if query["operation"] == "update":
+        first = next((c for _, c in query["filters"] if c != "id"), "id")
+        return f"UPDATE {_quote(table)} SET {_quote(first)} = {_quote(first)}{clause}"
+    if query["operation"] == "delete":
+        return f"DELETE FROM {_quote(table)}{clause}"
+    return None
+
+
+def summarize_plan(plan):
+    """Sequential scans, index usage and buffer counts from an EXPLAIN JSON plan."""
+    seq_scans, indexes = [], []
+    stack = [plan["Plan"]]
+    while stack:
+        node = stack.pop()
+        kind = node.get("Node Type", "")
+        if kind == "Seq Scan":
+            seq_scans.append({
+                "table": node.get("Relation Name"),
+                "rows": node.get("Actual Rows"),
+                "removed_by_filter": node.get("Rows Removed by Filter", 0),
+            })
+        elif "Index" in kind and node.get("Index Name"):
+            indexes.append(node["Index Name"])
+        stack.extend(node.get("Plans", []))
+    top = plan["Plan"]
+    return {
+        "execution_ms": plan.get("Execution Time"),
+        "planning_ms": plan.get("Planning Time"),
+        "rows": top.get("Actual Rows"),
+        "seq_scans": seq_scans,
+        "indexes": sorted(set(indexes)),
+        "buffers": {"shared_hit": top.get("Shared Hit Blocks", 0), "shared_read": top.get("Shared Read Blocks", 0)},
+    }
+
+
+class Postgres:
+    """initdb + pg_ctl cluster in a temporary directory, reachable over its Unix socket."""
+
+    def __init__(self, bindir=None, keep=False):
+        self.bindir = bindir
+        self.keep = keep
+        self.datadir = None
+        self.port = None
+
+    def _bin(self, name):
+        if self.bindir:
+            return os.path.join(self.bindir, name)
+        found = shutil.which(name)
+        if not found:
+            raise FileNotFoundError(f"{name} no encontrado: instala PostgreSQL o usa --pg-bin")
+        return found
+
+    def __enter__(self):
+        initdb, pg_ctl = self._bin("initdb"), self._bin("pg_ctl")
+        self._bin("psql")
+        self.datadir = tempfile.mkdtemp(prefix="audit-explain-")
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        try:
+            subprocess.run([initdb, "-D", os.path.join(self.datadir, "data"), "-U", "postgres",
+                            "--auth=trust", "-E", "UTF8", "--no-sync"], check=True, capture_output=True)
+            options = f"-k {self.datadir} -p {self.port} -c listen_addresses='' -c fsync=off -c shared_buffers=256MB"
+            subprocess.run([pg_ctl, "-D", os.path.join(self.datadir, "data"), "-o", options,
+                            "-l", os.path.join(self.datadir, "server.log"), "-w", "start"], check=True, capture_output=True)
+        except subprocess.CalledProcessError:
+            shutil.rmtree(self.datadir, ignore_errors=True)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.run([self._bin("pg_ctl"), "-D", os.path.join(self.datadir, "data"), "-m", "immediate", "stop"],
+                       capture_output=True)
+        if not self.keep:
+            shutil.rmtree(self.datadir, ignore_errors=True)
+
+    def psql(self, sql, stop_on_error=True):
+        """(stdout, stderr) of running `sql` through psql."""
+        proc = subprocess.run(
+            [self._bin("psql"), "-X", "-q", "-A", "-t", "-h", self.datadir, "-p", str(self.port), "-U", "postgres",
+             "-d", "postgres", "-v", f"ON_ERROR_STOP={1 if stop_on_error else 0}"],
+            input=sql, capture_output=True, text=True,
+        )
+        if stop_on_error and proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip())
+        return proc.stdout, proc.stderr
+
+
+def explain_queries(root, scale=DEFAULT_SCALE, rows=None, bindir=None, keep=False, log=print):
+    ctx = AuditContext(root)
+    queries, _ = supabase_queries(ctx)
+    queries = [q for q in queries if q["file"].startswith(EXPLAIN_SOURCES) or q["file"].endswith(".py")]
+    counts = {table: n * scale for table, n in BASE_ROWS.items()}
+    counts.update(rows or {})
+    schema = build_schema(ctx, queries)
+    counts = {table: counts.get(table, DEFAULT_ROWS * scale) for table in schema}
+
+    results = []
+    with Postgres(bindir, keep) as pg:
+        log(f"INFO: cluster temporal en {pg.datadir} (puerto {pg.port})")
+        pg.psql("\n".join(schema_sql(schema)))
+        migration_errors = []
+        for rel_path in ctx.index.glob(MIGRATIONS):
+            _, err = pg.psql(ctx.index.text(rel_path), stop_on_error=False)
+            migration_errors.extend(f"{rel_path}: {line}" for line in err.splitlines() if "ERROR" in line)
+        started = time.perf_counter()
+        pg.psql("\n".join(data_sql(schema, counts)))
+        log(f"INFO: {sum(counts.values())} filas sinteticas en {time.perf_counter() - started:.1f} s")
+        # Unique indexes can fail on synthetic values: reported, not fatal.
+        _, err = pg.psql("\n".join(index_sql(ctx, schema)) + "\nANALYZE;", stop_on_error=False)
+        migration_errors.extend(f"indices: {line}" for line in err.splitlines() if "ERROR" in line)
+
+        for query in queries:
+            sql = query_sql(query, schema, counts)
+            if sql is None:
+                continue
+            entry = {"call_site": f"{query['file']}:{query['line']}", "table": query["table"],
+                     "operation": query["operation"], "sql": sql}
+            try:
+                out, _ = pg.psql(f"BEGIN;\nEXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql};\nROLLBACK;")
+                plan = json.loads(out.strip())[0]
+                entry.update(summarize_plan(plan))
+                entry["plan"] = plan["Plan"]
+            except (RuntimeError, ValueError) as exc:
+                entry["error"] = str(exc)
+            results.append(entry)
+
+    results.sort(key=lambda r: -(r.get("execution_ms") or 0))
+    return {
+        "scale": scale,
+        "rows": counts,
+        "migration_errors": migration_errors,
+        "queries": results,
+        "summary": {
+            "explained": sum(1 for r in results if "error" not in r),
+            "failed": sum(1 for r in results if "error" in r),
+            "with_seq_scan": sum(1 for r in results if r.get("seq_scans")),
+        },
+    }
+
+
+def _parse_rows(values):
+    rows = {}
+    for value in values or ():
+        table, _, count = value.partition("=")
+        rows[table] = int(count)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN (ANALYZE, BUFFERS) de las consultas extraidas sobre un PostgreSQL local")
+    parser.add_argument("--root", default=PROJECT_ROOT, help="Raiz del proyecto Next.js")
+    parser.add_argument("--scale", type=int, default=DEFAULT_SCALE, help="Multiplicador del volumen actual de datos")
+    parser.add_argument("--rows", nargs="+", metavar="TABLA=N", help="Filas exactas para tablas concretas")
+    parser.add_argument("--pg-bin", help="Directorio con initdb, pg_ctl y psql")
+    parser.add_argument("--output", default=REPORT_PATH, help="Reporte JSON (relativo a --root)")
+    parser.add_argument("--keep", action="store_true", help="No borrar el cluster temporal al terminar")
+    args = parser.parse_args()
+
+    try:
+        report = explain_queries(args.root, args.scale, _parse_rows(args.rows), args.pg_bin, args.keep)
+    except (FileNotFoundError, subprocess.CalledProcessError, RuntimeError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        sys.exit(2)
+    output = os.path.join(args.root, args.output)
+    write_json_atomic(output, report, indent=2)
+    summary = report["summary"]
+    print(f"INFO: {summary['explained']} consultas analizadas, {summary['with_seq_scan']} con Seq Scan, "
+          f"{summary['failed']} fallidas. Reporte en {output}")
+    for entry in report["queries"][:10]:
+        if "error" not in entry:
+            scans = ", ".join(s["table"] for s in entry["seq_scans"]) or "-"
+            print(f"{entry['execution_ms']:>10.1f} ms  seq: {scans:<20} {entry['call_site']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = "artifacts/audit_history.sqlite3"
+
+SEVERITY = {"SUCCESS": 0, "WARNING": 1, "CRITICAL": 2}
+
+# A check is a timing regression when it runs this much slower than its median
+# over the previous runs.
+SLOWDOWN_FACTOR = 1.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    root TEXT,
+    verdict TEXT NOT NULL,
+    duration_ms REAL
+);
+CREATE TABLE IF NOT EXISTS check_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration_ms REAL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    over_budget INTEGER NOT NULL DEFAULT 0,
+    details TEXT,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS check_results_name ON check_results (name, run_id);
+"""
+
+
+def connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_run(path, report, root=None):
+    """Appends one audit report. Details are stored as compact JSON; `root` is
+    stored absolute so runs of the same tree group together."""
+    root = os.path.abspath(root) if root else root
+    conn = connect(path)
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO runs (timestamp, root, verdict, duration_ms) VALUES (?, ?, ?, ?)",
+                (report["timestamp"], root, report["verdict"], report.get("duration_ms")),
+            )
+            run_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO check_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        name,
+                        result["status"],
+                        result.get("duration_ms"),
+                        int(bool(result.get("cached"))),
+                        int(bool(result.get("over_budget"))),
+                        json.dumps(result.get("details", result.get("message")), separators=(",", ":")),
+                    )
+                    for name, result in report["checks"].items()
+                ],
+            )
+        return run_id
+    finally:
+        conn.close()
+
+
+# The last N runs of one audited tree
+_RECENT_RUNS = "SELECT id FROM runs WHERE root = ? ORDER BY id DESC LIMIT ?"
+
+
+def verdict_changes(conn, root, limit=20):
+    rows = conn.execute("SELECT id, timestamp, verdict, duration_ms FROM runs WHERE root = ? ORDER BY timestamp, id",
+                        (root,)).fetchall()
+    changes = []
+    previous = None
+    for run_id, timestamp, verdict, duration in rows:
+        if previous is None or verdict != previous:
+            changes.append((run_id, timestamp, previous, verdict, duration))
+        previous = verdict
+    return changes[-limit:]
+
+
+def slowest_checks(conn, root, runs=50, limit=10):
+    # Cached results took no real time; leave them out of the timing stats.
+    rows = conn.execute(
+        f"""
+        SELECT name, COUNT(*), AVG(duration_ms), MAX(duration_ms), SUM(over_budget)
+        FROM check_results
+        WHERE cached = 0 AND run_id IN ({_RECENT_RUNS})
+        GROUP BY name
+        ORDER BY AVG(duration_ms) DESC
+        LIMIT ?
+        """,
+        (root, runs, limit),
+    ).fetchall()
+    return rows
+
+
+def regressions(conn, root, runs=50):
+    """Status downgrades and slowdowns between consecutive runs of each check."""
+    rows = conn.execute(
+        f"""
+        SELECT c.name, c.run_id, r.timestamp, c.status, c.duration_ms, c.cached
+        FROM check_results c JOIN runs r ON r.id = c.run_id
+        WHERE c.run_id IN ({_RECENT_RUNS})
+        ORDER BY c.name, r.timestamp, c.run_id
+        """,
+        (root, runs),
+    ).fetchall()
+    found = []
+    history = {}
+    for name, run_id, timestamp, status, duration, cached in rows:
+        past = history.setdefault(name, [])
+        if past:
+            prev_status = past[-1][0]
+            if SEVERITY.get(status, 0) > SEVERITY.get(prev_status, 0):
+                found.append((timestamp, run_id, name, "status", f"{prev_status} -> {status}"))
+            timings = [d for _, d, c in past if d is not None and not c]
+            if duration is not None and not cached and len(timings) >= 3:
+                median = statistics.median(timings)
+                if median > 0 and duration > median * SLOWDOWN_FACTOR:
+                    found.append((timestamp, run_id, name, "timing", f"{duration:.1f} ms vs mediana {median:.1f} ms"))
+        past.append((status, duration, cached))
+    return sorted(found, key=lambda r: r[1])
+
+
+def import_reports(conn_path, paths):
+    imported = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        if "checks" in report and "verdict" in report:
+            record_run(conn_path, report, root=os.path.dirname(os.path.dirname(os.path.abspath(path))))
+            imported += 1
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historial de ejecuciones de AUDIT-LAUNCH")
+    parser.add_argument("--db", default=os.path.join(PROJECT_ROOT, *HISTORY_PATH.split("/")),
+                        help="Ruta del historial SQLite (por defecto el del proyecto, desde cualquier directorio)")
+    parser.add_argument("--root", default=PROJECT_ROOT,
+                        help="Proyecto auditado cuyas ejecuciones se consultan (el --root de audit_launch.py)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("verdicts", help="Cambios de veredicto entre ejecuciones")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("slowest", help="Checks mas lentos (media sobre las ultimas N ejecuciones)")
+    p.add_argument("--runs", type=int, default=50)
+    p.add_argument("--limit", type=int, default=10)
+    p = sub.add_parser("regressions", help="Empeoramientos de estado o de tiempo por check")
+    p.add_argument("--runs", type=int, default=50)
+    p = sub.add_parser("import", help="Importa reportes JSON existentes al historial")
+    p.add_argument("reports", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"INFO: {import_reports(args.db, args.reports)} reporte(s) importados en {args.db}")
+        return
+
+    if not os.path.exists(args.db):
+        print(f"ERROR: no existe el historial {args.db}", file=sys.stderr)
+        sys.exit(2)
+    root = os.path.abspath(args.root)
+    conn = connect(args.db)
+    try:
+        if args.command == "verdicts":
+            for run_id, timestamp, before, after, duration in verdict_changes(conn, root, args.limit):
+                print(f"#{run_id:<5} {timestamp}  {before or '-':>16} -> {after:<16} {duration or 0:>9.1f} ms")
+        elif args.command == "slowest":
+            print(f"{'check':<20} {'runs':>5} {'avg ms':>10} {'max ms':>10} {'over budget':>12}")
+            for name, count, avg, worst, over in slowest_checks(conn, root, args.runs, args.limit):
+                print(f"{name:<20} {count:>5} {avg or 0:>10.1f} {worst or 0:>10.1f} {over:>12}")
+        elif args.command == "regressions":
+            for timestamp, run_id, name, kind, description in regressions(conn, root, args.runs):
+                print(f"#{run_id:<5} {timestamp}  {name:<20} {kind:<7} {description}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
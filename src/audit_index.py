@@ -0,0 +1,340 @@
+import os
+import re
+import mmap
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+SKIP_DIRS = {"node_modules", ".next", ".git", ".vercel", ".turbo", "__pycache__", ".venv", "venv", ".pytest_cache"}
+
+# Indexed even though ".next" is skipped: the build manifests the bundle check
+# weighs routes from, so a new `next build` invalidates its cached result.
+NEXT_BUILD_MANIFESTS = (".next/app-build-manifest.json", ".next/build-manifest.json")
+
+# Smaller files are read into bytes: no handle or mapping is kept open on them.
+MMAP_MIN_BYTES = 1 << 20
+
+# Bytes of small-file buffers and decoded texts kept for the checks that read
+# the same file next; least recently used first out, so a check that reads the
+# whole tree (secrets, batch hashing) does not pin all of it.
+CONTENT_CACHE_BYTES = 32 << 20
+
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico", ".bmp", ".svgz",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp3", ".mp4", ".webm", ".mov", ".wav",
+    ".zip", ".gz", ".tgz", ".br", ".7z", ".pdf",
+    ".pyc", ".so", ".dll", ".exe", ".wasm", ".node",
+    ".sqlite", ".sqlite3", ".db",
+}
+
+
+class _ContentCache:
+    """LRU of file contents bounded by total size (the caller locks)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()  # key -> (value, size)
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, size):
+        self.pop(key)
+        if size > self.max_bytes:
+            return
+        self._items[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self.size -= self._items.popitem(last=False)[1][1]
+
+    def pop(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def clear(self):
+        self._items.clear()
+        self.size = 0
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: str  # project-relative, "/"-separated
+    size: int
+    mtime_ns: int
+
+
+def is_pattern(path):
+    # Only "*" and "?" are wildcards: "[...]" is literal because Next.js uses it
+    # for dynamic segments (app/[slug]/page.tsx).
+    return "*" in path or "?" in path
+
+
+@functools.lru_cache(maxsize=None)
+def _glob_to_regex(pattern):
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(parts) + r"\Z")
+
+
+def _excluded(reads, rel_path):
+    return any(r.startswith("!") and _glob_to_regex(r[1:]).match(rel_path) for r in reads)
+
+
+def reads_match(reads, rel_path):
+    """True if `rel_path` is one of the inputs a `reads` declaration names."""
+    hit = any(not r.startswith("!") and (_glob_to_regex(r).match(rel_path) if is_pattern(r) else r == rel_path)
+              for r in reads)
+    return hit and not _excluded(reads, rel_path)
+
+
+class RepoIndex:
+    """In-memory snapshot of the project tree built from a single os.scandir pass.
+
+    Stat data is captured during the walk. Contents are read on first access:
+    files of MMAP_MIN_BYTES or more are mmap'd and the map is kept until
+    release(); smaller ones are read into bytes, which are kept (with decoded
+    texts) only in a CONTENT_CACHE_BYTES LRU, so checks reading the same files
+    share one read without the index pinning the whole tree. Hashes are kept.
+    """
+
+    def __init__(self, root, entries, dirs, overrides=None):
+        self.root = root
+        self.entries = entries
+        self.dirs = dirs
+        # rel_path -> absolute path of the file actually read in its place
+        self.overrides = overrides or {}
+        self._data = {}  # rel_path -> mmap
+        self._retired = []
+        self._contents = _ContentCache(CONTENT_CACHE_BYTES)  # ("data"|"text", rel_path) -> bytes|str
+        self._sha256 = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sent to batch workers: stat data and known hashes, no open buffers.
+        return {"root": self.root, "entries": self.entries, "dirs": self.dirs,
+                "overrides": self.overrides, "sha256": self._sha256}
+
+    def __setstate__(self, state):
+        self.__init__(state["root"], state["entries"], state["dirs"], state["overrides"])
+        self._sha256.update(state["sha256"])
+
+    @classmethod
+    def build(cls, root, skip_dirs=SKIP_DIRS, binary_extensions=BINARY_EXTENSIONS):
+        entries = {}
+        dirs = {"": []}
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                it = os.scandir(os.path.join(root, rel_dir) if rel_dir else root)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in skip_dirs:
+                                dirs[rel] = []
+                                dirs[rel_dir].append(entry.name)
+                                stack.append(rel)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        if os.path.splitext(entry.name)[1].lower() in binary_extensions:
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries[rel] = FileEntry(rel, st.st_size, st.st_mtime_ns)
+                    dirs[rel_dir].append(entry.name)
+        for rel in NEXT_BUILD_MANIFESTS:
+            try:
+                st = os.stat(os.path.join(root, *rel.split("/")))
+            except OSError:
+                continue
+            rel_dir, _, name = rel.rpartition("/")
+            entries[rel] = FileEntry(rel, st.st_size, st.st_mtime_ns)
+            dirs.setdefault(rel_dir, []).append(name)
+        return cls(root, entries, dirs)
+
+    def abspath(self, rel_path):
+        if rel_path in self.overrides:
+            return self.overrides[rel_path]
+        return os.path.join(self.root, *rel_path.split("/"))
+
+    def overlay(self, overrides):
+        """Copy of the index where each rel_path in `overrides` is read from the
+        given file instead (same checkout audited with another .env.local)."""
+        entries = dict(self.entries)
+        dirs = {d: list(names) for d, names in self.dirs.items()}
+        for rel_path, path in overrides.items():
+            st = os.stat(path)
+            rel_dir, _, name = rel_path.rpartition("/")
+            entries[rel_path] = FileEntry(rel_path, st.st_size, st.st_mtime_ns)
+            if name not in dirs.setdefault(rel_dir, []):
+                dirs[rel_dir].append(name)
+        return RepoIndex(self.root, entries, dirs, {**self.overrides, **overrides})
+
+    def exists(self, rel_path):
+        return rel_path in self.entries
+
+    def get(self, rel_path):
+        return self.entries.get(rel_path)
+
+    def listdir(self, rel_dir=""):
+        return list(self.dirs.get(rel_dir.strip("/"), []))
+
+    def glob(self, pattern):
+        regex = _glob_to_regex(pattern)
+        return sorted(p for p in self.entries if regex.match(p))
+
+    def files_under(self, rel_dir, extensions=None):
+        prefix = rel_dir.strip("/") + "/" if rel_dir.strip("/") else ""
+        return sorted(
+            p for p in self.entries
+            if p.startswith(prefix) and (extensions is None or os.path.splitext(p)[1] in extensions)
+        )
+
+    def resolve(self, paths):
+        """Expands `reads`-style declarations: patterns become their matches,
+        literal paths are kept even when missing (absence is an input too),
+        and "!pattern" entries drop what they match from the rest."""
+        resolved = []
+        for path in paths:
+            if path.startswith("!"):
+                continue
+            if is_pattern(path):
+                resolved.extend(self.glob(path))
+            else:
+                resolved.append(path)
+        return sorted(p for p in set(resolved) if not _excluded(paths, p))
+
+    def data(self, rel_path):
+        """File contents as a read-only buffer: bytes for files under
+        MMAP_MIN_BYTES, an mmap for larger ones (see release())."""
+        with self._lock:
+            buf = self._data.get(rel_path)
+            if buf is None:
+                buf = self._contents.get(("data", rel_path))
+            if buf is not None:
+                return buf
+            entry = self.entries.get(rel_path)
+            if entry is None:
+                raise FileNotFoundError(rel_path)
+            if entry.size < MMAP_MIN_BYTES:
+                with open(self.abspath(rel_path), "rb") as f:
+                    buf = f.read()
+                self._contents.put(("data", rel_path), buf, len(buf))
+            else:
+                with open(self.abspath(rel_path), "rb") as f:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data[rel_path] = buf
+            return buf
+
+    def text(self, rel_path):
+        with self._lock:
+            text = self._contents.get(("text", rel_path))
+        if text is None:
+            buf = self.data(rel_path)
+            text = bytes(buf).decode("utf-8", errors="replace")
+            with self._lock:
+                # The text takes the place of the bytes it was decoded from.
+                self._contents.pop(("data", rel_path))
+                self._contents.put(("text", rel_path), text, len(buf))
+        return text
+
+    def sha256(self, rel_path):
+        if rel_path not in self._sha256:
+            self._sha256[rel_path] = hashlib.sha256(self.data(rel_path)).hexdigest()
+        return self._sha256[rel_path]
+
+    def add_hashes(self, hashes):
+        """Records content hashes computed elsewhere ({rel_path: sha256})."""
+        with self._lock:
+            self._sha256.update(hashes)
+
+    def refresh(self, rel_paths):
+        """Re-stats `rel_paths` in place after a change notification, dropping any
+        cached content. Returns the set of paths whose entry actually changed."""
+        changed = set()
+        with self._lock:
+            for rel_path in rel_paths:
+                rel_dir, _, name = rel_path.rpartition("/")
+                old = self.entries.get(rel_path)
+                try:
+                    st = os.stat(self.abspath(rel_path))
+                    is_file = os.path.isfile(self.abspath(rel_path))
+                except OSError:
+                    st, is_file = None, False
+                parts = rel_path.split("/")
+                skipped = ((any(p in SKIP_DIRS for p in parts) and rel_path not in NEXT_BUILD_MANIFESTS)
+                           or os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS)
+                new = FileEntry(rel_path, st.st_size, st.st_mtime_ns) if is_file and not skipped else None
+                if new == old:
+                    continue
+                changed.add(rel_path)
+                # Not closed here: a check from the previous run may still hold
+                # it. release() closes it once that run is over.
+                superseded = self._data.pop(rel_path, None)
+                if superseded is not None:
+                    self._retired.append(superseded)
+                self._contents.pop(("data", rel_path))
+                self._contents.pop(("text", rel_path))
+                self._sha256.pop(rel_path, None)
+                if new is None:
+                    self.entries.pop(rel_path, None)
+                    if name in self.dirs.get(rel_dir, []):
+                        self.dirs[rel_dir].remove(name)
+                else:
+                    self.entries[rel_path] = new
+                    if old is None:
+                        self.dirs.setdefault(rel_dir, [])
+                        if name not in self.dirs[rel_dir]:
+                            self.dirs[rel_dir].append(name)
+        return changed
+
+    def release(self):
+        """Closes the mmaps held so far (current and superseded), keeping the
+        index usable: files are mapped again on next use. A mapped file cannot
+        be saved over on Windows, so watch mode calls this after every run.
+        A map still exported by a buffer is retried on the next call."""
+        with self._lock:
+            maps = self._retired + list(self._data.values())
+            self._data = {}
+            self._retired = []
+            for buf in maps:
+                try:
+                    buf.close()
+                except BufferError:
+                    self._retired.append(buf)
+
+    def close(self):
+        self.release()
+        with self._lock:
+            self._contents.clear()
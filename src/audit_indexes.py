@@ -0,0 +1,114 @@
+from audit_sql import SQL_SOURCES, extract_indexes, load_statements
+from audit_supabase import EQUALITY_OPS, RANGE_OPS, supabase_queries
+
+# Primary keys of tables created from the Supabase dashboard (no DDL in the repo).
+# Every table is assumed to have `id`; tablas_supabase.txt documents the rest.
+DEFAULT_KEY = ["id"]
+IMPLICIT_KEYS = {"rate_limits": ["ip"]}
+
+# Leading columns an index should cover before we stop asking for more.
+MAX_SUGGESTED_COLUMNS = 3
+
+
+def _quote(column):
+    return f'"{column}"' if column != column.lower() else column
+
+
+def known_indexes(ctx):
+    def build(c):
+        by_table = {}
+        for idx in extract_indexes(load_statements(c.index, SQL_SOURCES)):
+            by_table.setdefault(idx.table, []).append(idx)
+        return by_table
+    return ctx.memo("sql_indexes", build)
+
+
+def query_shape(query):
+    """(equality columns, first range/order column) the planner could use."""
+    equality = []
+    ranged = None
+    for op, column in query["filters"]:
+        if op in EQUALITY_OPS and column not in equality:
+            equality.append(column)
+        elif op in RANGE_OPS and ranged is None:
+            ranged = column
+    if ranged is None and query["orders"]:
+        ranged = query["orders"][0]
+    if ranged in equality:
+        ranged = None
+    return equality, ranged
+
+
+def covered_prefix(columns, equality, ranged):
+    """How many leading index columns the query constrains."""
+    n = 0
+    for column in columns:
+        if column in equality:
+            n += 1
+        elif column == ranged:
+            return n + 1
+        else:
+            break
+    return n
+
+
+def check_query(query, indexes, rank=None):
+    """None when an index supports the query, else (status, suggested columns).
+    `rank` orders equality columns (most shared across the table's queries first)."""
+    equality, ranged = query_shape(query)
+    if not equality and ranged is None:
+        return None
+    key = IMPLICIT_KEYS.get(query["table"], DEFAULT_KEY)
+    unique = [key] + [i.columns for i in indexes if i.kind != "index" and not i.partial]
+    if any(all(c in equality for c in cols) for cols in unique):
+        return None  # at most one row
+    rank = rank or {}
+    equality = sorted(equality, key=lambda c: (-rank.get(c, 0), c))
+    suggested = equality[:MAX_SUGGESTED_COLUMNS - (1 if ranged else 0)] + ([ranged] if ranged else [])
+    candidates = [key] + [i.columns for i in indexes]
+    best = max(covered_prefix(cols, equality, ranged) for cols in candidates)
+    if best == 0:
+        status = "MISSING"
+    elif best < min(len(suggested), 2):
+        status = "PARTIAL"
+    else:
+        return None
+    return status, suggested
+
+
+def find_missing_indexes(ctx):
+    """Query shapes without a supporting index, grouped by (table, suggested columns)."""
+    queries, analysed = supabase_queries(ctx)
+    by_table = known_indexes(ctx)
+    rank = {}
+    for query in queries:
+        for column in set(query_shape(query)[0]):
+            table_rank = rank.setdefault(query["table"], {})
+            table_rank[column] = table_rank.get(column, 0) + 1
+    grouped = {}
+    for query in queries:
+        verdict = check_query(query, by_table.get(query["table"], []), rank.get(query["table"]))
+        if verdict is None:
+            continue
+        status, suggested = verdict
+        key = (query["table"], tuple(suggested))
+        finding = grouped.setdefault(key, {
+            "table": query["table"],
+            "columns": suggested,
+            "status": status,
+            "sql": "CREATE INDEX IF NOT EXISTS idx_{}_{} ON {} ({});".format(
+                query["table"].lower(), "_".join(c.lower() for c in suggested), _quote(query["table"]),
+                ", ".join(_quote(c) for c in suggested),
+            ),
+            "call_sites": [],
+        })
+        if status == "MISSING":
+            finding["status"] = "MISSING"
+        finding["call_sites"].append(f"{query['file']}:{query['line']}")
+    findings = sorted(grouped.values(), key=lambda f: (f["status"] != "MISSING", -len(f["call_sites"]), f["table"]))
+    summary = {
+        "queries": len(queries),
+        "indexes": sum(len(v) for v in by_table.values()),
+        "files_reanalysed": analysed,
+    }
+    return findings, summary
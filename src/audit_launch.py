@@ -1,10 +1,48 @@
-import os
-import json
 import re
+import sys
+import argparse
 from datetime import datetime
 
-def check_env_vars():
-    env_path = r"c:\Users\Usuario\nextjs\.env.local"
+from audit_engine import AuditContext, CHECKS, register_check, run_checks, compute_verdict, exit_process
+from audit_cache import OUTPUT_PREFIXES, AuditCache, write_json_atomic
+from audit_routes import APP_DIR, MANIFEST_PATH, route_manifest, find_route
+from audit_secrets import scan_secrets
+from audit_auth import ACTIONS_GLOB, HELPER_GLOBS, analyze_auth_guards
+from audit_history import HISTORY_PATH, record_run
+from audit_sql import SQL_SOURCES
+from audit_supabase import QUERY_SOURCES, TEMPLATE_SOURCES
+from audit_indexes import find_missing_indexes
+from audit_overfetch import CATALOGUE_PATH, find_overfetch
+from audit_waterfall import WATERFALL_SOURCES, find_waterfalls
+from audit_rendering import RENDERING_SOURCES, classify_routes
+from audit_bundle import BUNDLE_SOURCES, CONFIG_PATH, client_weights
+from audit_index import NEXT_BUILD_MANIFESTS
+from audit_deps import DEPS_SOURCES, LOCKFILE_PATH, dependency_footprint
+from audit_triggers import TRIGGER_SOURCES, analyze_triggers
+from audit_events import EXIT_CODES, EventStream
+from audit_batch import run_batch
+
+PROJECT_ROOT = r"c:\Users\Usuario\nextjs"
+
+# Route name -> acceptable public URLs (any one of them satisfies the route)
+REQUIRED_ROUTES = {
+    "pricing": ["/pricing"],
+    "reserva": ["/cita", "/cita/[uuid]"],
+    "perfil": ["/perfil", "/configuracion"],
+    "dashboard": ["/inicio", "/dashboard"]
+}
+
+# details keys streamed as individual `finding` events (--stream); default "findings"
+FINDING_KEYS = {
+    "security": ("actions",),
+    "rendering": ("avoidable_dynamic",),
+    "bundle": ("over_budget", "server_only_in_client"),
+    "dependencies": ("unused", "runtime_duplicates"),
+    "triggers": ("hot_table_triggers",),
+}
+
+@register_check("environment", reads=[".env.local"])
+def check_env_vars(ctx):
     required_keys = [
         "NEXT_PUBLIC_SUPABASE_URL",
         "NEXT_PUBLIC_SUPABASE_ANON_KEY",
@@ -16,27 +54,25 @@ def check_env_vars():
         "RECAPTCHA_PROJECT_ID"
     ]
     results = {}
-    if not os.path.exists(env_path):
+    if not ctx.index.exists(".env.local"):
         return {"status": "CRITICAL", "message": ".env.local missing"}
     
-    with open(env_path, "r") as f:
-        content = f.read()
-        for key in required_keys:
-            if key in content:
-                match = re.search(fr"{key}\s*=\s*(.+)", content)
-                if match and match.group(1).strip():
-                    results[key] = "PRESENT"
-                else:
-                    results[key] = "EMPTY"
+    content = ctx.index.text(".env.local")
+    for key in required_keys:
+        if key in content:
+            match = re.search(fr"{key}\s*=\s*(.+)", content)
+            if match and match.group(1).strip():
+                results[key] = "PRESENT"
             else:
-                results[key] = "MISSING"
+                results[key] = "EMPTY"
+        else:
+            results[key] = "MISSING"
                 
     # Stripe Mode Check
     stripe_key = ""
-    with open(env_path, "r") as f:
-        for line in f:
-            if line.startswith("STRIPE_SECRET_KEY"):
-                stripe_key = line.split("=")[1].strip()
+    for line in content.splitlines():
+        if line.startswith("STRIPE_SECRET_KEY"):
+            stripe_key = line.split("=")[1].strip()
     
     stripe_status = "UNKNOWN"
     if stripe_key.startswith("sk_live"):
@@ -55,93 +91,297 @@ def check_env_vars():
         
     return {"status": status, "details": results}
 
-def check_routes():
-    base_app = r"c:\Users\Usuario\nextjs\app"
-    landing_path = os.path.join(base_app, "(landing)", "page.tsx")
-    
-    # Mapping route to possible file paths
-    critical_routes = {
-        "pricing": ["pricing/page.tsx"],
-        "reserva": ["cita/page.tsx", "cita/[uuid]/page.tsx"],
-        "perfil": ["(dashboard)/perfil/page.tsx", "perfil/page.tsx", "configuracion/page.tsx"],
-        "dashboard": ["(dashboard)/inicio/page.tsx", "dashboard/page.tsx"]
-    }
+@register_check("routes", reads=[APP_DIR + "/**"])
+def check_routes(ctx):
+    landing_path = "app/(landing)/page.tsx"
+    manifest = route_manifest(ctx)
     results = {}
-    
-    def file_exists_in_app(rel_path):
-        return os.path.exists(os.path.join(base_app, rel_path))
-
-    for route, paths in critical_routes.items():
-        found = False
-        for p in paths:
-            if file_exists_in_app(p):
-                found = True
-                break
+
+    for route, urls in REQUIRED_ROUTES.items():
+        found = any(find_route(manifest, url) for url in urls)
         results[route] = "EXISTS" if found else "MISSING"
             
     # Legal Check (External)
     legal_external = False
-    if os.path.exists(landing_path):
-        with open(landing_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            if "https://nelux.es" in content and "Nelux" in content:
-                legal_external = True
+    if ctx.index.exists(landing_path):
+        content = ctx.index.text(landing_path)
+        if "https://nelux.es" in content and "Nelux" in content:
+            legal_external = True
     
     results["legal_link"] = "PRESENT (nelux.es)" if legal_external else "MISSING"
+    results["not_found_page"] = "PRESENT" if manifest["not_found"] else "MISSING"
+    for url in manifest["conflicts"]:
+        results[f"conflict:{url}"] = "CONFLICT"
             
     status = "SUCCESS"
-    if not legal_external and not file_exists_in_app("politica-de-privacidad/page.tsx"):
+    if not legal_external and not find_route(manifest, "/politica-de-privacidad"):
         status = "CRITICAL"
-    elif any(v == "MISSING" for v in results.values()):
+    elif any(v in ("MISSING", "CONFLICT") for v in results.values()):
         status = "WARNING"
         
-    return {"status": status, "details": results}
+    return {
+        "status": status,
+        "details": results,
+        "summary": {
+            "routes": len(manifest["routes"]),
+            "pages": sum(1 for r in manifest["routes"] if r["kind"] == "page"),
+            "handlers": sum(1 for r in manifest["routes"] if r["kind"] == "route"),
+            "dynamic": sum(1 for r in manifest["routes"] if not r["static"]),
+        },
+    }
 
-def check_security_patterns():
+@register_check("security", reads=["middleware.ts", ACTIONS_GLOB] + HELPER_GLOBS)
+def check_security_patterns(ctx):
     # Check for session guards in actions
-    results = {"auth_guards": "UNKNOWN"}
+    actions, analysed = analyze_auth_guards(ctx)
+    counts = {}
+    for action in actions:
+        counts[action["status"]] = counts.get(action["status"], 0) + 1
+    results = {"auth_guards": counts, "files_reanalysed": analysed}
     
-    # We'll just check if middleware exists for now
-    middleware_path = r"c:\Users\Usuario\nextjs\middleware.ts"
-    if os.path.exists(middleware_path):
+    if ctx.index.exists("middleware.ts"):
         results["middleware"] = "PRESENT"
     else:
         results["middleware"] = "MISSING"
         
-    status = "SUCCESS" if results["middleware"] == "PRESENT" else "CRITICAL"
+    status = "SUCCESS"
+    if results["middleware"] != "PRESENT" or counts.get("UNGUARDED"):
+        status = "CRITICAL"
+    elif counts.get("GUARD_AFTER_ACCESS"):
+        status = "WARNING"
+    results["actions"] = [a for a in actions if a["status"] in ("UNGUARDED", "GUARD_AFTER_ACCESS")]
     return {"status": status, "details": results}
 
-def main():
-    print("INFO: Inicializando motor de auditoria AUDIT-LAUNCH v3.0...")
-    
-    checks_data = {
-        "environment": check_env_vars(),
-        "routes": check_routes(),
-        "security": check_security_patterns()
+@register_check("secrets", reads=["**"] + [f"!{prefix}*" for prefix in OUTPUT_PREFIXES], budget=10.0, timeout=120.0)
+def check_secrets(ctx):
+    # AUDIT-LAUNCH: no real .env keys in source
+    findings, files_scanned, bytes_scanned = scan_secrets(ctx.index)
+    severities = {f["severity"] for f in findings}
+    status = "SUCCESS"
+    if "CRITICAL" in severities:
+        status = "CRITICAL"
+    elif "WARNING" in severities:
+        status = "WARNING"
+    return {
+        "status": status,
+        "details": {"files_scanned": files_scanned, "bytes_scanned": bytes_scanned, "findings": findings}
     }
-    
+
+@register_check("indexes", reads=QUERY_SOURCES + TEMPLATE_SOURCES + SQL_SOURCES)
+def check_indexes(ctx):
+    # Filter/order columns of supabase-js queries vs indexes declared in SQL
+    findings, summary = find_missing_indexes(ctx)
+    status = "WARNING" if findings else "SUCCESS"
+    return {"status": status, "details": dict(summary, findings=findings)}
+
+@register_check("overfetch", reads=QUERY_SOURCES + TEMPLATE_SOURCES + [CATALOGUE_PATH])
+def check_overfetch(ctx):
+    # Reads without limit()/range() on growing tables and select('*') projections
+    findings, summary = find_overfetch(ctx)
+    status = "SUCCESS"
+    if summary["risk"].get("HIGH"):
+        status = "WARNING"
+    return {"status": status, "details": dict(summary, findings=findings)}
+
+@register_check("waterfalls", reads=WATERFALL_SOURCES)
+def check_waterfalls(ctx):
+    # Sequential independent awaits and awaits inside loops (N+1)
+    findings, summary = find_waterfalls(ctx)
+    status = "WARNING" if findings else "SUCCESS"
+    return {"status": status, "details": dict(summary, findings=findings)}
+
+@register_check("rendering", reads=RENDERING_SOURCES)
+def check_rendering(ctx):
+    # static / ISR / dynamic per route, and what forced each dynamic one
+    routes, analysed = classify_routes(ctx)
+    counts = {}
+    for route in routes:
+        counts[route["rendering"]] = counts.get(route["rendering"], 0) + 1
+    dynamic = [r for r in routes if r["rendering"] == "dynamic"]
+    avoidable = [r["route"] for r in dynamic if r["avoidable"]]
+    status = "WARNING" if avoidable else "SUCCESS"
+    return {
+        "status": status,
+        "details": {
+            "rendering": counts,
+            "avoidable_dynamic": avoidable,
+            "files_reanalysed": analysed,
+            "dynamic": [{k: r[k] for k in ("route", "kind", "forced_by", "at")} for r in dynamic],
+            "cacheable": [{k: v for k, v in r.items() if k in ("route", "rendering", "revalidate")}
+                          for r in routes if r["rendering"] != "dynamic"],
+        },
+    }
+
+# The `.next` build manifests are indexed inputs: a new `next build` invalidates the cached result.
+@register_check("bundle", reads=BUNDLE_SOURCES + [CONFIG_PATH] + list(NEXT_BUILD_MANIFESTS))
+def check_bundle(ctx):
+    # initial client JS per route against the audit.config.json budget
+    routes, summary = client_weights(ctx)
+    over = [r for r in routes if r["over_budget"]]
+    leaked = [r for r in routes if r.get("server_only_in_client")]
+    # Sizes estimated from the import graph are heuristic: only a measured
+    # build over budget blocks the release.
+    if leaked or any(r["source"] == "build" for r in over):
+        status = "CRITICAL"
+    elif over:
+        status = "WARNING"
+    else:
+        status = "SUCCESS"
+    return {
+        "status": status,
+        "details": {
+            **summary,
+            "over_budget": [r["route"] for r in over],
+            "server_only_in_client": {r["route"]: r["server_only_in_client"] for r in leaked},
+            "routes": routes,
+        },
+    }
+
+@register_check("dependencies", reads=[LOCKFILE_PATH] + DEPS_SOURCES)
+def check_dependencies(ctx):
+    # duplicated versions, transitive footprint and import fan-in from the lockfile
+    footprint = dependency_footprint(ctx)
+    if footprint is None:
+        return {"status": "WARNING", "message": f"{LOCKFILE_PATH} no encontrado"}
+    runtime_duplicates = [d["package"] for d in footprint["duplicates"] if not d["dev_only"]]
+    status = "WARNING" if footprint["unused"] or runtime_duplicates else "SUCCESS"
+    return {
+        "status": status,
+        "details": {
+            **footprint["summary"],
+            "unused": footprint["unused"],
+            "runtime_duplicates": runtime_duplicates,
+            "single_import": footprint["single_import"],
+            "direct": footprint["direct"],
+            "duplicates": footprint["duplicates"],
+        },
+    }
+
+@register_check("triggers", reads=TRIGGER_SOURCES)
+def check_triggers(ctx):
+    # row-level triggers that aggregate, scan or write other tables on every insert
+    findings, summary = analyze_triggers(ctx)
+    costly = [f for f in findings if f["cost"] == "HIGH"]
+    status = "WARNING" if costly else "SUCCESS"
+    return {
+        "status": status,
+        "details": {
+            **summary,
+            "hot_table_triggers": [f"{f['table']}.{f['trigger']}" for f in costly],
+            "triggers": findings,
+        },
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AUDIT-LAUNCH: auditoria de lanzamiento al mercado",
+                                     fromfile_prefix_chars="@")
+    parser.add_argument("--root", default=PROJECT_ROOT, help="Raiz del proyecto Next.js a auditar")
+    parser.add_argument("--workers", type=int, default=None, help="Hilos para ejecutar los checks")
+    parser.add_argument("--only", nargs="+", metavar="CHECK", help="Ejecutar solo estos checks")
+    parser.add_argument("--no-cache", action="store_true", help="Ignorar artifacts/audit_cache.json y re-ejecutar todo")
+    parser.add_argument("--no-history", action="store_true", help="No registrar la ejecucion en artifacts/audit_history.sqlite3")
+    parser.add_argument("--watch", action="store_true", help="Proceso persistente: re-ejecuta los checks afectados al cambiar ficheros")
+    parser.add_argument("--stream", action="store_true", help="Eventos NDJSON en stdout y codigo de salida segun el veredicto (0/1/2)")
+    parser.add_argument("--fail-fast", action="store_true", help="Abandonar los checks pendientes al primer CRITICAL")
+    parser.add_argument("--batch", nargs="+", metavar="VARIANTE",
+                        help="Auditar varias variantes: directorios del proyecto o ficheros .env (sobre --root); @lista.txt para leerlas de un fichero")
+    parser.add_argument("--batch-workers", type=int, default=None, help="Procesos para el modo --batch")
+    parser.add_argument("--batch-output", default=None, help="Reporte combinado del modo --batch (por defecto artifacts/audit_batch_report.json en --root)")
+    return parser.parse_args()
+
+REPORT_PATH = "artifacts/audit_report.json"
+
+def build_report(checks_data, started):
     report = {
-        "timestamp": datetime.now().isoformat(),
-        "checks": checks_data
+        "timestamp": started.isoformat(),
+        "checks": checks_data,
+        "duration_ms": round((datetime.now() - started).total_seconds() * 1000, 1)
     }
     
     # Final verdict
-    statuses = [c["status"] for c in checks_data.values()]
-    if "CRITICAL" in statuses:
-        report["verdict"] = "NOT_READY"
-    elif "WARNING" in statuses:
-        report["verdict"] = "NEEDS_ATTENTION"
-    else:
-        report["verdict"] = "READY_FOR_MARKET"
-        
-    output_path = r"c:\Users\Usuario\nextjs\artifacts\audit_report.json"
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    report["verdict"] = compute_verdict(checks_data)
+    return report
+
+def write_report(ctx, report, history=True):
+    write_json_atomic(ctx.path(MANIFEST_PATH), route_manifest(ctx), indent=4)
+    output_path = ctx.path(REPORT_PATH)
+    write_json_atomic(output_path, report, indent=4)
+    if history:
+        record_run(ctx.path(HISTORY_PATH), report, root=ctx.root)
+    return output_path
+
+def run_watch(ctx, checks, args, report):
+    from audit_watch import watch
+
+    state = {"checks": dict(report["checks"]), "verdict": report["verdict"]}
+
+    def on_change(changed, affected):
+        started = datetime.now()
+        # Fresh context over the refreshed index: derived data (route manifest...) is rebuilt.
+        run_ctx = AuditContext(root=ctx.root, index=ctx.index)
+        cache = None if args.no_cache else AuditCache(run_ctx)
+        state["checks"].update(run_checks(affected, run_ctx, max_workers=args.workers, cache=cache))
+        new_report = build_report({c.name: state["checks"][c.name] for c in checks}, started)
+        write_report(run_ctx, new_report, history=not args.no_history)
+        names = ", ".join(c.name for c in affected)
+        elapsed = new_report["duration_ms"]
+        if new_report["verdict"] != state["verdict"]:
+            print(f"INFO: [{started:%H:%M:%S}] {len(changed)} cambio(s) -> {names} ({elapsed} ms). Veredicto: {state['verdict']} -> {new_report['verdict']}")
+        else:
+            print(f"INFO: [{started:%H:%M:%S}] {len(changed)} cambio(s) -> {names} ({elapsed} ms). Veredicto: {new_report['verdict']}")
+        state["verdict"] = new_report["verdict"]
+        ctx.index.release()
+
+    ctx.index.release()
+    watch(ctx.index, checks, on_change, ignore_prefixes=OUTPUT_PREFIXES)
+
+def main():
+    args = parse_args()
+    # In stream mode stdout carries only NDJSON.
+    log = sys.stderr if args.stream else sys.stdout
+    print("INFO: Inicializando motor de auditoria AUDIT-LAUNCH v3.1...", file=log)
     
-    with open(output_path, "w") as f:
-        json.dump(report, f, indent=4)
+    checks = [c for name, c in CHECKS.items() if not args.only or name in args.only]
+    if args.batch:
+        if args.watch or args.stream:
+            print("ERROR: --batch no admite --watch ni --stream", file=sys.stderr)
+            sys.exit(2)
+        try:
+            report, output_path = run_batch(args.batch, args.root, checks, output=args.batch_output,
+                                            workers=args.batch_workers, fail_fast=args.fail_fast)
+        except ValueError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(2)
+        print(f"INFO: Auditoria por lotes completada. Reporte combinado en {output_path}")
+        print(f"INFO: Veredicto global: {report['verdict']}")
+        exit_process(EXIT_CODES[report["verdict"]])
+
+    ctx = AuditContext(root=args.root)
+    stream = EventStream(ctx.index, FINDING_KEYS) if args.stream else None
+    if stream:
+        stream.emit("audit_started", root=args.root, checks=[c.name for c in checks])
+    started = datetime.now()
+    cache = None if args.no_cache else AuditCache(ctx)
+    checks_data = run_checks(checks, ctx, max_workers=args.workers, cache=cache,
+                             on_event=stream.on_check if stream else None, fail_fast=args.fail_fast)
+    report = build_report(checks_data, started)
+    output_path = write_report(ctx, report, history=not args.no_history)
         
-    print(f"INFO: Auditoria v3.0 completada. Reporte materializado en {output_path}")
-    print(f"INFO: Veredicto: {report['verdict']}")
+    print(f"INFO: Auditoria v3.1 completada. Reporte materializado en {output_path}", file=log)
+    print(f"INFO: Veredicto: {report['verdict']}", file=log)
+    if stream:
+        counts = {}
+        for result in checks_data.values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        stream.emit("summary", verdict=report["verdict"], exit_code=EXIT_CODES[report["verdict"]],
+                    duration_ms=report["duration_ms"], statuses=counts, report=output_path,
+                    slowest=sorted(((r.get("duration_ms", 0), n) for n, r in checks_data.items()), reverse=True)[:3])
+
+    if args.watch:
+        run_watch(ctx, checks, args, report)
+    # Checks abandoned on timeout or by --fail-fast may still be running: the
+    # report is out, so the process ends now instead of waiting for them.
+    exit_process(EXIT_CODES[report["verdict"]] if args.stream else 0)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,136 @@
+import re
+
+from audit_supabase import EQUALITY_OPS, RANGE_OPS, supabase_queries
+
+CATALOGUE_PATH = "tablas_supabase.txt"
+
+# Tables that grow with every booking, sale or message. Tables in the catalogue
+# with a created_at / timestamp column are added automatically.
+GROWING_TABLES = {
+    "citas", "ventas_productos", "mensajes", "mis_mensajes", "fichajes_logs", "logs_sistema",
+    "arqueos_caja", "horas_extra", "facturas_emitidas", "gastos", "facturas", "stripe_procesados",
+    "metricas_diarias", "metricas_barberos", "metricas_contabilidad",
+}
+# Equality on any of these returns at most one row.
+UNIQUE_COLUMNS = {"id", "uuid", "slug", "stripe_customer_id", "ip"}
+# Equality on a date column selects one day/month: as good as a range filter.
+TIME_COLUMNS = {"dia", "fecha", "mes", "anio", "created_at", "timestamp", "timestamp_servidor"}
+# `select('*')` on a table with at least this many catalogued columns is "wide".
+WIDE_TABLE_COLUMNS = 10
+
+RISK_LEVELS = ((3, "HIGH"), (2, "MEDIUM"), (1, "LOW"))
+
+_TABLE_RE = re.compile(r'^(?:\d+\.\s*)?Tabla\s+"([^"]+)"')
+_COLUMN_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def parse_catalogue(text):
+    """tablas_supabase.txt -> {table: {"columns": [...], "jsonb": [...]}} (lower-case names).
+
+    Column lines look like `barberia_id: (UUID) ...`, `id (UUID): ...` or
+    `correo / telefono: ...`; capitalised lines are section headings."""
+    tables = {}
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        m = _TABLE_RE.match(line)
+        if m:
+            current = tables.setdefault(m.group(1).lower(), {"columns": [], "jsonb": []})
+            continue
+        if current is None or ":" not in line:
+            continue
+        head = line.split(":", 1)[0]
+        head = re.sub(r"\([^)]*\)", " ", head)
+        names = [n.strip() for n in re.split(r"\s*(?:/|,|\by\b)\s*", head) if n.strip()]
+        if not names or not all(_COLUMN_RE.match(n) for n in names):
+            continue
+        for name in names:
+            if name not in current["columns"]:
+                current["columns"].append(name)
+                if "JSONB" in line:
+                    current["jsonb"].append(name)
+    return tables
+
+
+def catalogue(ctx):
+    def build(c):
+        if not c.index.exists(CATALOGUE_PATH):
+            return {}
+        return parse_catalogue(c.index.text(CATALOGUE_PATH))
+    return ctx.memo("table_catalogue", build)
+
+
+def growing_tables(tables):
+    grown = set(GROWING_TABLES)
+    for name, info in tables.items():
+        if {"created_at", "timestamp"} & set(info["columns"]):
+            grown.add(name)
+    return grown
+
+
+def assess(query, tables, growing):
+    """(score, reasons) for one read; score 0 means no risk worth reporting."""
+    if query["operation"] != "select":
+        return 0, []
+    table = query["table"].lower()
+    info = tables.get(table)
+    equality = {c.lower() for op, c in query["filters"] if op in EQUALITY_OPS}
+    ranged = any(op in RANGE_OPS for op, _ in query["filters"]) or bool(equality & TIME_COLUMNS)
+    single_row = bool(equality & UNIQUE_COLUMNS)
+    score = 0
+    reasons = []
+
+    if not query["bounded"] and not single_row and table in growing:
+        if not query["filters"]:
+            score += 3
+            reasons.append("sin filtro ni limit() en tabla que crece")
+        elif not ranged:
+            score += 2
+            reasons.append("sin limit()/range() ni rango temporal: crece con el historico")
+        else:
+            score += 1
+            reasons.append("sin limit()/range() (acotada por fecha)")
+
+    if query["select"] and "*" in query["select"].replace(" ", "").split(","):
+        score += 1
+        width = len(info["columns"]) if info else None
+        reason = f"select('*') trae {width} columnas" if width else "select('*')"
+        if info and info["jsonb"]:
+            score += 1
+            reason += f" (incl. JSONB {', '.join(info['jsonb'])})"
+        elif width and width >= WIDE_TABLE_COLUMNS:
+            score += 1
+        if single_row:
+            score = min(score, 1)
+        reasons.append(reason)
+    return min(score, 3), reasons
+
+
+def find_overfetch(ctx):
+    queries, analysed = supabase_queries(ctx)
+    tables = catalogue(ctx)
+    growing = growing_tables(tables)
+    findings = []
+    for query in queries:
+        score, reasons = assess(query, tables, growing)
+        if not score:
+            continue
+        risk = next(level for threshold, level in RISK_LEVELS if score >= threshold)
+        findings.append({
+            "call_site": f"{query['file']}:{query['line']}",
+            "table": query["table"],
+            "select": query["select"],
+            "risk": risk,
+            "reasons": reasons,
+        })
+    findings.sort(key=lambda f: ([l for _, l in RISK_LEVELS].index(f["risk"]), f["call_site"]))
+    counts = {}
+    for finding in findings:
+        counts[finding["risk"]] = counts.get(finding["risk"], 0) + 1
+    summary = {
+        "reads": sum(1 for q in queries if q["operation"] == "select"),
+        "catalogued_tables": len(tables),
+        "risk": counts,
+        "files_reanalysed": analysed,
+    }
+    return findings, summary
@@ -0,0 +1,225 @@
+import os
+
+import audit_tslex
+from audit_tslex import tokenize, directive, functions, imports, resolve_import, string_value
+from audit_cache import file_cache
+from audit_routes import APP_DIR, SOURCE_EXTENSIONS, route_manifest
+
+# Static / ISR / dynamic classification of every App Router page and route
+# handler, with the construct that forced each dynamic one.
+
+# Request-time APIs and the module they must be imported from.
+DYNAMIC_APIS = {
+    "cookies": "next/headers",
+    "headers": "next/headers",
+    "draftMode": "next/headers",
+    "connection": "next/server",
+    "unstable_noStore": "next/cache",
+}
+SEGMENT_CONFIG = ("dynamic", "revalidate", "fetchCache")
+RENDERING_SOURCES = [APP_DIR + "/**", "lib/**/*.ts", "utils/**/*.ts"]
+
+MAX_CALL_DEPTH = 4
+
+
+def _config(tokens):
+    """`export const dynamic = 'force-dynamic'` style segment config, with lines."""
+    config = {}
+    for i in range(len(tokens) - 4):
+        if tokens[i].value == "export" and tokens[i + 1].value == "const" and tokens[i + 2].value in SEGMENT_CONFIG \
+                and tokens[i + 3].value == "=":
+            value = tokens[i + 4]
+            if value.kind == "string":
+                parsed = string_value(value)
+            elif value.kind == "number":
+                parsed = float(value.value)
+            else:
+                parsed = value.value  # false / Infinity
+            config[tokens[i + 2].value] = [parsed, tokens[i].line]
+        elif tokens[i].value == "export" and tokens[i + 1].value in ("async", "function") \
+                and "generateStaticParams" in (tokens[i + 2].value, tokens[i + 3].value):
+            config["generateStaticParams"] = [True, tokens[i].line]
+    return config
+
+
+def _dynamic_uses(tokens, start, end, bound):
+    """Request-time API calls in tokens[start:end] and the local names called."""
+    uses, calls = [], []
+    for k in range(start, end):
+        t = tokens[k]
+        if t.kind != "ident" or k + 1 >= len(tokens) or tokens[k + 1].value != "(":
+            if t.value == "searchParams" and t.kind == "ident" and tokens[k - 1].value not in ("?.",):
+                uses.append(["searchParams", t.line])
+            continue
+        if tokens[k - 1].value in (".", "?.", "function"):
+            continue
+        module = DYNAMIC_APIS.get(t.value)
+        if module and bound.get(t.value) == module:
+            uses.append([f"{t.value}()", t.line])
+        elif t.value == "fetch":
+            close = audit_tslex.match_brace(tokens, k + 1)
+            if any(string_value(x) == "no-store" for x in tokens[k + 1:close]):
+                uses.append(["fetch(no-store)", t.line])
+        else:
+            calls.append(t.value)
+    return uses, calls
+
+
+def _params_range(tokens, body_start):
+    """(start, end) of the parameter list preceding a function body."""
+    close = body_start - 1
+    while close > 0 and tokens[close].value != ")":
+        close -= 1
+    depth = 0
+    for k in range(close, -1, -1):
+        if tokens[k].value == ")":
+            depth += 1
+        elif tokens[k].value == "(":
+            depth -= 1
+            if depth == 0:
+                return k, close
+    return close, close
+
+
+def analyze_batch(batch):
+    """Process-pool worker: segment config, request-time API uses and calls per function."""
+    root, rel_paths = batch
+    out = {}
+    for rel_path in rel_paths:
+        with open(os.path.join(root, *rel_path.split("/")), "r", encoding="utf-8", errors="replace") as f:
+            tokens = tokenize(f.read())
+        bound = imports(tokens)
+        fns = []
+        for span in functions(tokens):
+            uses, calls = _dynamic_uses(tokens, span.body_start, span.body_end, bound)
+            # Page props: `function Page({ searchParams })` / `(props) => props.searchParams`
+            params_uses, _ = _dynamic_uses(tokens, *_params_range(tokens, span.body_start), {})
+            uses = [u for u in params_uses if u[0] == "searchParams"][:1] + uses
+            fns.append({"name": span.name, "exported": span.exported, "line": span.line,
+                        "uses": uses, "calls": sorted(set(calls))})
+        out[rel_path] = {
+            "directive": directive(tokens),
+            "config": _config(tokens),
+            "imports": {name: spec for name, spec in bound.items() if spec.startswith((".", "@/"))},
+            "functions": fns,
+        }
+    return out
+
+
+class _Resolver:
+    def __init__(self, index, facts):
+        self.index = index
+        self.facts = facts
+
+    def reasons(self, rel_path, fns, depth=0, seen=None):
+        """Request-time APIs reached from `fns`, as [construct, "file:line"] pairs."""
+        seen = seen if seen is not None else set()
+        facts = self.facts.get(rel_path, {})
+        by_name = {fn["name"]: fn for fn in facts.get("functions", [])}
+        found = []
+        for fn in fns:
+            if (rel_path, fn["name"]) in seen:
+                continue
+            seen.add((rel_path, fn["name"]))
+            for construct, line in fn["uses"]:
+                if construct == "searchParams" and depth > 0:
+                    continue
+                found.append([construct, f"{rel_path}:{line}"])
+            if depth >= MAX_CALL_DEPTH:
+                continue
+            for name in fn["calls"]:
+                if name in by_name:
+                    found.extend(self.reasons(rel_path, [by_name[name]], depth + 1, seen))
+                    continue
+                spec = facts.get("imports", {}).get(name)
+                target = resolve_import(self.index.exists, rel_path, spec) if spec else None
+                target_fn = next((f for f in self.facts.get(target, {}).get("functions", []) if f["name"] == name), None)
+                if target_fn:
+                    inner = self.reasons(target, [target_fn], depth + 1, seen)
+                    found.extend([f"{c} via {name}()", where] for c, where in inner)
+        return found
+
+
+def _layouts(index, rel_path):
+    """layout.* files wrapping `rel_path`, outermost first."""
+    folders = rel_path.split("/")[:-1]
+    found = []
+    for n in range(1, len(folders) + 1):
+        for ext in SOURCE_EXTENSIONS:
+            candidate = "/".join(folders[:n]) + "/layout" + ext
+            if index.exists(candidate):
+                found.append(candidate)
+    return found
+
+
+def _revalidate_seconds(value):
+    """Seconds of a parsed `revalidate` export; None for `false`, `Infinity`
+    (cached until the next deploy) and anything that is not a literal number,
+    such as an imported constant."""
+    if isinstance(value, float) and value != float("inf"):
+        return value
+    return None
+
+
+def classify_route(entry, facts, resolver, layouts):
+    """(class, reasons, revalidate) for one manifest entry."""
+    files = layouts + [entry["file"]]
+    dynamic_config, revalidate, reasons = None, None, []
+    for rel_path in files:
+        config = facts.get(rel_path, {}).get("config", {})
+        if "dynamic" in config:
+            dynamic_config = config["dynamic"] + [rel_path]
+        seconds = _revalidate_seconds(config.get("revalidate", [None])[0])
+        # The lowest revalidate of the segments wins.
+        if seconds is not None and (revalidate is None or seconds < revalidate[0]):
+            revalidate = [seconds, config["revalidate"][1], rel_path]
+
+    if dynamic_config and dynamic_config[0] == "force-static":
+        return "static", [], None
+    if dynamic_config and dynamic_config[0] == "force-dynamic":
+        reasons.append(["dynamic = 'force-dynamic'", f"{dynamic_config[2]}:{dynamic_config[1]}"])
+    if revalidate and revalidate[0] == 0:
+        reasons.append(["revalidate = 0", f"{revalidate[2]}:{revalidate[1]}"])
+
+    if entry["kind"] == "route":
+        methods = entry.get("methods") or []
+        if set(methods) - {"GET", "HEAD"}:
+            reasons.append([f"route handler {'/'.join(m for m in methods if m not in ('GET', 'HEAD'))}", entry["file"]])
+        elif not revalidate:
+            reasons.append(["route handler GET sin caché (por defecto desde Next 15)", entry["file"]])
+    for rel_path in files:
+        file_facts = facts.get(rel_path, {})
+        if file_facts.get("directive") == "use client":
+            continue
+        reasons.extend(resolver.reasons(rel_path, file_facts.get("functions", [])))
+
+    if reasons:
+        return "dynamic", reasons, None
+    if revalidate:
+        return "isr", [], revalidate[0]
+    if entry["params"] and not any("generateStaticParams" in facts.get(f, {}).get("config", {}) for f in files):
+        # No generateStaticParams: each param value is rendered on first request, then cached.
+        return "isr", [], None
+    return "static", [], None
+
+
+def classify_routes(ctx):
+    index = ctx.index
+    manifest = route_manifest(ctx)
+    files = sorted({p for g in RENDERING_SOURCES for p in index.glob(g) if p.endswith(SOURCE_EXTENSIONS)})
+    facts, analysed = file_cache(ctx).map_files("rendering", analyze_batch, files, depends=[audit_tslex])
+    resolver = _Resolver(index, facts)
+
+    routes = []
+    for entry in manifest["routes"]:
+        kind, reasons, revalidate = classify_route(entry, facts, resolver, _layouts(index, entry["file"]))
+        route = {"route": entry["route"], "file": entry["file"], "kind": entry["kind"], "rendering": kind}
+        if revalidate is not None:
+            route["revalidate"] = revalidate
+        if reasons:
+            route["forced_by"] = reasons[0][0]
+            route["at"] = reasons[0][1]
+            # Only the segment config forces it: nothing request-time is read.
+            route["avoidable"] = all(r[0] in ("dynamic = 'force-dynamic'", "revalidate = 0") for r in reasons)
+        routes.append(route)
+    return routes, analysed
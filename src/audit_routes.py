@@ -0,0 +1,120 @@
+import re
+
+APP_DIR = "app"
+MANIFEST_PATH = "artifacts/route_manifest.json"
+
+SOURCE_EXTENSIONS = (".tsx", ".ts", ".jsx", ".js")
+
+# Next.js App Router special files: which ones create a URL and which ones wrap it.
+ENDPOINT_FILES = {"page", "route"}
+BOUNDARY_FILES = {"layout", "template", "loading", "error", "not-found", "default", "global-error"}
+
+HTTP_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+_METHOD_RE = re.compile(
+    r"export\s+(?:async\s+)?(?:function\s+|const\s+)(" + "|".join(HTTP_METHODS) + r")\b"
+)
+
+
+def _classify_segment(segment):
+    """Returns (url_part, kind, param) for one folder name, or None when the
+    folder is not routable (private folders, intercepting routes)."""
+    if segment.startswith("_") or segment.startswith("(."):
+        return None
+    if segment.startswith("(") and segment.endswith(")"):
+        return "", "group", None
+    if segment.startswith("@"):
+        return "", "slot", None
+    if segment.startswith("[[...") and segment.endswith("]]"):
+        return segment, "optional_catch_all", segment[5:-2]
+    if segment.startswith("[...") and segment.endswith("]"):
+        return segment, "catch_all", segment[4:-1]
+    if segment.startswith("[") and segment.endswith("]"):
+        return segment, "dynamic", segment[1:-1]
+    return segment, "static", None
+
+
+def _split_special(rel_path):
+    for ext in SOURCE_EXTENSIONS:
+        if rel_path.endswith(ext):
+            stem = rel_path[: -len(ext)].rsplit("/", 1)[-1]
+            return stem
+    return None
+
+
+def build_route_manifest(index, app_dir=APP_DIR):
+    """Resolves every page, route handler and boundary file under `app_dir` into
+    its public URL in a single pass over the index."""
+    routes = []
+    boundaries = []
+    prefix = app_dir + "/"
+
+    for rel_path in index.files_under(app_dir, extensions=SOURCE_EXTENSIONS):
+        stem = _split_special(rel_path)
+        if stem not in ENDPOINT_FILES and stem not in BOUNDARY_FILES:
+            continue
+
+        folders = rel_path[len(prefix):].split("/")[:-1]
+        url_parts, groups, params = [], [], []
+        routable = True
+        catch_all = False
+        for folder in folders:
+            classified = _classify_segment(folder)
+            if classified is None:
+                routable = False
+                break
+            url_part, kind, param = classified
+            if kind in ("group", "slot"):
+                groups.append(folder)
+            if param:
+                params.append(param)
+            if kind in ("catch_all", "optional_catch_all"):
+                catch_all = True
+            if url_part:
+                url_parts.append(url_part)
+        if not routable:
+            continue
+
+        entry = {
+            "route": "/" + "/".join(url_parts),
+            "file": rel_path,
+            "kind": stem,
+            "groups": groups,
+            "params": params,
+            "static": not params,
+        }
+        if catch_all:
+            entry["catch_all"] = True
+
+        if stem == "route":
+            entry["methods"] = sorted(set(_METHOD_RE.findall(index.text(rel_path))))
+        if stem in ENDPOINT_FILES:
+            routes.append(entry)
+        else:
+            boundaries.append(entry)
+
+    routes.sort(key=lambda r: (r["route"], r["kind"]))
+    boundaries.sort(key=lambda r: (r["route"], r["kind"]))
+
+    by_url = {}
+    for entry in routes:
+        by_url.setdefault(entry["route"], []).append(entry["file"])
+    conflicts = {url: files for url, files in by_url.items() if len(files) > 1}
+
+    return {
+        "app_dir": app_dir,
+        "routes": routes,
+        "boundaries": boundaries,
+        "not_found": [b["file"] for b in boundaries if b["kind"] == "not-found"],
+        "conflicts": conflicts,
+    }
+
+
+def route_manifest(ctx):
+    return ctx.memo("route_manifest", lambda c: build_route_manifest(c.index))
+
+
+def find_route(manifest, url):
+    for entry in manifest["routes"]:
+        if entry["route"] == url:
+            return entry
+    return None
@@ -0,0 +1,120 @@
+import os
+import re
+import mmap
+import json
+import base64
+
+from audit_engine import parallel_map, split_batches
+from audit_cache import OUTPUT_PREFIXES
+
+# (name, severity, pattern). All patterns are folded into one alternation so each
+# file is scanned in a single pass regardless of how many patterns we add.
+SECRET_PATTERNS = [
+    ("stripe_live_secret", "CRITICAL", rb"sk_live_[0-9A-Za-z]{16,}"),
+    ("stripe_live_restricted", "CRITICAL", rb"rk_live_[0-9A-Za-z]{16,}"),
+    ("stripe_test_secret", "WARNING", rb"sk_test_[0-9A-Za-z]{16,}"),
+    ("stripe_webhook_secret", "CRITICAL", rb"whsec_[0-9A-Za-z]{16,}"),
+    ("supabase_secret_key", "CRITICAL", rb"sb_secret_[0-9A-Za-z_-]{20,}"),
+    ("jwt", "WARNING", rb"eyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{16,}"),
+    ("resend_api_key", "CRITICAL", rb"re_[0-9A-Za-z]{8,}_[0-9A-Za-z]{16,}"),
+    ("google_api_key", "WARNING", rb"AIza[0-9A-Za-z_-]{35}"),
+    ("private_key", "CRITICAL", rb"-----BEGIN (?:RSA |EC |OPENSSH |)PRIVATE KEY-----"),
+]
+
+# Every pattern starts with a literal byte; the leading lookahead lets the regex
+# engine skip straight to candidate positions instead of trying each branch at
+# every offset (~4x faster on this tree).
+_FIRST_BYTES = b"".join(sorted({re.escape(pattern[:1]) for _, _, pattern in SECRET_PATTERNS}))
+SECRETS_MATCHER = re.compile(
+    b"(?=[" + _FIRST_BYTES + b"])(?:"
+    + b"|".join(b"(?P<%s>%s)" % (name.encode(), pattern) for name, _, pattern in SECRET_PATTERNS)
+    + b")"
+)
+SEVERITY = {name: severity for name, severity, _ in SECRET_PATTERNS}
+
+PLACEHOLDER_RE = re.compile(rb"x{6,}|X{6,}|0{10,}|your_|example|placeholder", re.IGNORECASE)
+
+# .env files are where keys are supposed to live; lockfiles are integrity hashes.
+SKIP_FILES = re.compile(r"(^|/)\.env[^/]*$|(^|/)package-lock\.json$|(^|/)yarn\.lock$|(^|/)pnpm-lock\.yaml$")
+# The audit's own outputs and vendored code
+SKIP_PREFIXES = OUTPUT_PREFIXES + ("public/vendor/",)
+
+# Below this many bytes the process pool costs more than it saves.
+PARALLEL_MIN_BYTES = 4 << 20
+
+
+def _redact(value):
+    value = value.decode("ascii", errors="replace")
+    if len(value) <= 16:
+        return value[:6] + "…"
+    return f"{value[:10]}…{value[-4:]}"
+
+
+def _jwt_role(token):
+    try:
+        payload = token.split(b".")[1]
+        payload += b"=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("role")
+    except (ValueError, IndexError, AttributeError):
+        return None
+
+
+def scan_batch(batch):
+    """Process-pool worker: scans (root, [rel_paths]) and returns findings."""
+    root, rel_paths = batch
+    findings = []
+    for rel_path in rel_paths:
+        try:
+            with open(os.path.join(root, *rel_path.split("/")), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            continue
+        with data:
+            if b"\0" in data[:1024]:
+                continue
+            line, line_pos = 1, 0
+            for match in SECRETS_MATCHER.finditer(data):
+                value = match.group(0)
+                line += data[line_pos:match.start()].count(b"\n")
+                line_pos = match.start()
+                if PLACEHOLDER_RE.search(value):
+                    continue
+                kind = match.lastgroup
+                severity = SEVERITY[kind]
+                if kind == "jwt":
+                    role = _jwt_role(value)
+                    if role is None:
+                        continue
+                    kind = f"supabase_jwt:{role}"
+                    severity = "CRITICAL" if role == "service_role" else "WARNING"
+                findings.append({
+                    "file": rel_path,
+                    "line": line,
+                    "type": kind,
+                    "severity": severity,
+                    "match": _redact(value),
+                })
+    return findings
+
+
+def scannable_files(index):
+    return [
+        e for p, e in index.entries.items()
+        if not SKIP_FILES.search(p) and not p.startswith(SKIP_PREFIXES)
+    ]
+
+
+def scan_secrets(index, max_workers=None):
+    entries = scannable_files(index)
+    total_bytes = sum(e.size for e in entries)
+    workers = max_workers or os.cpu_count() or 1
+    if total_bytes < PARALLEL_MIN_BYTES:
+        workers = 1
+    batches = split_batches([e.path for e in entries], [e.size for e in entries], workers)
+    findings = []
+    for result in parallel_map(scan_batch, [(index.root, b) for b in batches], max_workers=workers):
+        findings.extend(result)
+    findings.sort(key=lambda f: (f["file"], f["line"]))
+    return findings, len(entries), total_bytes
@@ -0,0 +1,284 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Minimal PostgreSQL helpers for the audit checks: statement splitting that is
+# aware of comments, quotes and $$-bodies, plus extraction of the index-like
+# objects (indexes, primary keys, unique constraints) a query planner can use.
+
+# Where the project keeps SQL that has been applied to Supabase (migrations and
+# the hand-run scripts from the SQL editor).
+SQL_SOURCES = ["supabase/migrations/*.sql", "supabase/*.sql", "scripts/sql/*.sql", "artifacts/sql/*.sql"]
+
+
+@dataclass
+class Statement:
+    text: str
+    source: str
+    line: int
+
+
+def split_statements(text, source=""):
+    statements = []
+    i = 0
+    n = len(text)
+    line = 1
+    start_line = 1
+    buf = []
+    has_content = False
+
+    def flush():
+        chunk = "".join(buf).strip()
+        if chunk:
+            statements.append(Statement(chunk, source, start_line))
+
+    while i < n:
+        c = text[i]
+        if c == "\n":
+            line += 1
+        if text.startswith("--", i):
+            j = text.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        if text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            line += text.count("\n", i, j)
+            buf.append(" ")
+            i = j
+            continue
+        if c in ("'", '"'):
+            j = i + 1
+            while j < n:
+                if text[j] == c:
+                    if j + 1 < n and text[j + 1] == c:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            j = min(j + 1, n)
+            line += text.count("\n", i, j)
+            buf.append(text[i:j])
+            i = j
+            continue
+        if c == "$":
+            m = re.match(r"\$[A-Za-z_]*\$", text[i:i + 64])
+            if m:
+                tag = m.group(0)
+                j = text.find(tag, i + len(tag))
+                j = n if j == -1 else j + len(tag)
+                line += text.count("\n", i, j)
+                buf.append(text[i:j])
+                i = j
+                continue
+        if c == ";":
+            flush()
+            buf = []
+            has_content = False
+            i += 1
+            continue
+        if not has_content and not c.isspace():
+            start_line = line
+            has_content = True
+        buf.append(c)
+        i += 1
+    flush()
+    return statements
+
+
+def normalize_identifier(name):
+    """Unquoted identifiers fold to lower case; quoted ones keep their case."""
+    name = name.strip()
+    if "." in name and not name.startswith('"'):
+        name = name.split(".")[-1]
+    elif name.startswith('"') and '"."' in name:
+        name = name.split('"."')[-1]
+        name = '"' + name
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1]
+    return name.lower()
+
+
+def split_top_level(text, sep=","):
+    parts = []
+    depth = 0
+    current = []
+    quote = None
+    for c in text:
+        if quote:
+            current.append(c)
+            if c == quote:
+                quote = None
+            continue
+        if c in ("'", '"'):
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == sep and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(c)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def balanced(text, open_index):
+    """Content of the parenthesis opened at text[open_index] and the index after it."""
+    depth = 0
+    quote = None
+    for j in range(open_index, len(text)):
+        c = text[j]
+        if quote:
+            if c == quote:
+                quote = None
+            continue
+        if c in ("'", '"'):
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return text[open_index + 1:j], j + 1
+    return text[open_index + 1:], len(text)
+
+
+def _column_list(text):
+    columns = []
+    for part in split_top_level(text):
+        if "(" in part:
+            columns.append("expr:" + re.sub(r"\s+", " ", part))
+            continue
+        token = re.match(r'\s*("[^"]+"|[\w.]+)', part)
+        if token:
+            columns.append(normalize_identifier(token.group(1)))
+    return columns
+
+
+@dataclass
+class Index:
+    table: str
+    columns: List[str]
+    kind: str  # index | unique | primary_key | conflict_target
+    name: Optional[str] = None
+    partial: Optional[str] = None
+    source: str = ""
+    line: int = 0
+
+
+_IDENT = r'(?:"[^"]+"|[\w]+)(?:\.(?:"[^"]+"|[\w]+))?'
+_CREATE_INDEX_RE = re.compile(
+    r"CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(" + _IDENT + r")?\s*"
+    r"ON\s+(?:ONLY\s+)?(" + _IDENT + r")\s*(?:USING\s+\w+\s*)?\(",
+    re.IGNORECASE,
+)
+_CREATE_TABLE_RE = re.compile(
+    r"CREATE\s+(?:UNLOGGED\s+|TEMP(?:ORARY)?\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(" + _IDENT + r")\s*\(",
+    re.IGNORECASE,
+)
+_ALTER_TABLE_RE = re.compile(r"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?(" + _IDENT + r")\s+(.*)", re.IGNORECASE | re.DOTALL)
+_DROP_INDEX_RE = re.compile(r"DROP\s+INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?(" + _IDENT + r")", re.IGNORECASE)
+_ON_CONFLICT_RE = re.compile(
+    r"INSERT\s+INTO\s+(" + _IDENT + r")(?:(?!INSERT\s+INTO).)*?ON\s+CONFLICT\s*\(([^)]*)\)",
+    re.IGNORECASE | re.DOTALL,
+)
+_DDL_START_RE = re.compile(r"\b(?:CREATE|ALTER|DROP)\s+(?:UNIQUE\s+)?(?:INDEX|TABLE)\b", re.IGNORECASE)
+_DO_BODY_RE = re.compile(r"^DO\s+(\$[A-Za-z_]*\$)(.*)\1", re.IGNORECASE | re.DOTALL)
+_CONSTRAINT_RE = re.compile(
+    r"(?:CONSTRAINT\s+(" + _IDENT + r")\s+)?(PRIMARY\s+KEY|UNIQUE)\s*(?:NULLS\s+(?:NOT\s+)?DISTINCT\s*)?\(",
+    re.IGNORECASE,
+)
+
+
+def _definitions(body, table, stmt):
+    found = []
+    for part in split_top_level(body):
+        m = _CONSTRAINT_RE.match(part)
+        if m:
+            cols, _ = balanced(part, m.end() - 1)
+            kind = "primary_key" if m.group(2).upper().startswith("PRIMARY") else "unique"
+            found.append(Index(table, _column_list(cols), kind, m.group(1), None, stmt.source, stmt.line))
+            continue
+        col = re.match(r'\s*(?:ADD\s+COLUMN\s+(?:IF\s+NOT\s+EXISTS\s+)?)?("[^"]+"|\w+)\s+(.*)', part, re.IGNORECASE | re.DOTALL)
+        if not col or col.group(1).upper() in ("CONSTRAINT", "CHECK", "FOREIGN", "EXCLUDE", "LIKE"):
+            continue
+        rest = col.group(2).upper()
+        if "PRIMARY KEY" in rest:
+            found.append(Index(table, [normalize_identifier(col.group(1))], "primary_key", None, None, stmt.source, stmt.line))
+        elif re.search(r"\bUNIQUE\b", rest):
+            found.append(Index(table, [normalize_identifier(col.group(1))], "unique", None, None, stmt.source, stmt.line))
+    return found
+
+
+def _unwrap_do_blocks(statements):
+    """DDL inside `DO $$ BEGIN IF ... THEN ALTER TABLE ...; END IF; END $$`
+    blocks, as plain statements."""
+    for stmt in statements:
+        m = _DO_BODY_RE.match(stmt.text)
+        if not m:
+            yield stmt
+            continue
+        offset = stmt.text.count("\n", 0, m.start(2))
+        for inner in split_statements(m.group(2), stmt.source):
+            ddl = _DDL_START_RE.search(inner.text)
+            if ddl:
+                yield Statement(inner.text[ddl.start():], stmt.source, stmt.line + offset + inner.line - 1)
+
+
+def extract_indexes(statements):
+    """Indexes and index-backed constraints, in statement order, with DROP INDEX
+    applied so the result reflects the final state.
+
+    `INSERT ... ON CONFLICT (cols)` also proves a unique index on `cols` exists
+    (PostgreSQL rejects the statement otherwise), which covers tables created
+    from the Supabase dashboard."""
+    indexes = []
+    for stmt in _unwrap_do_blocks(statements):
+        text = stmt.text
+        for m in _ON_CONFLICT_RE.finditer(text):
+            table = normalize_identifier(m.group(1))
+            columns = _column_list(m.group(2))
+            if not any(i.table == table and i.columns == columns for i in indexes):
+                indexes.append(Index(table, columns, "conflict_target", None, None, stmt.source, stmt.line))
+        m = _CREATE_INDEX_RE.search(text)
+        if m and text.lstrip().upper().startswith("CREATE"):
+            cols, after = balanced(text, m.end() - 1)
+            where = re.search(r"\bWHERE\b(.*)$", text[after:], re.IGNORECASE | re.DOTALL)
+            name = normalize_identifier(m.group(2)) if m.group(2) else None
+            if name:
+                indexes = [i for i in indexes if i.name != name]
+            indexes.append(Index(
+                normalize_identifier(m.group(3)), _column_list(cols),
+                "unique" if m.group(1) else "index", name,
+                re.sub(r"\s+", " ", where.group(1)).strip() if where else None,
+                stmt.source, stmt.line,
+            ))
+            continue
+        m = _CREATE_TABLE_RE.match(text.lstrip())
+        if m:
+            body, _ = balanced(text.lstrip(), m.end() - 1)
+            indexes.extend(_definitions(body, normalize_identifier(m.group(1)), stmt))
+            continue
+        m = _ALTER_TABLE_RE.match(text.lstrip())
+        if m:
+            actions = [re.sub(r"^ADD\s+(?!COLUMN)", "", a, flags=re.IGNORECASE) for a in split_top_level(m.group(2))
+                       if a.upper().startswith("ADD")]
+            indexes.extend(_definitions(",".join(actions), normalize_identifier(m.group(1)), stmt))
+            continue
+        m = _DROP_INDEX_RE.match(text.lstrip())
+        if m:
+            name = normalize_identifier(m.group(1))
+            indexes = [i for i in indexes if i.name != name]
+    return indexes
+
+
+def load_statements(index, patterns=SQL_SOURCES):
+    statements = []
+    for pattern in patterns:
+        for rel_path in index.glob(pattern):
+            statements.extend(split_statements(index.text(rel_path), rel_path))
+    return statements
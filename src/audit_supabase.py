@@ -0,0 +1,217 @@
+import os
+import re
+
+import audit_tslex
+from audit_tslex import tokenize, string_value, match_brace
+from audit_cache import file_cache
+
+# Static extraction of supabase-js query chains (`supabase.from('t').select()
+# .eq().order()...`) shared by the query-shape checks (indexes, over-fetching,
+# waterfalls, EXPLAIN harness).
+
+QUERY_SOURCES = ["app/**/*.ts", "app/**/*.tsx", "hooks/**/*.ts", "lib/**/*.ts", "utils/**/*.ts"]
+# Python materializers that write TypeScript files from triple-quoted templates.
+TEMPLATE_SOURCES = ["scripts/*.py", "src/*.py"]
+TEMPLATE_EXCLUDE = "src/audit_"
+
+EQUALITY_OPS = {"eq", "is", "in", "match", "contains", "containedBy"}
+RANGE_OPS = {"gt", "gte", "lt", "lte", "like", "ilike", "overlaps"}
+FILTER_METHODS = EQUALITY_OPS | RANGE_OPS | {"neq", "not", "or", "filter", "textSearch"}
+BOUND_METHODS = {"limit", "range", "single", "maybeSingle"}
+OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+
+_TEMPLATE_RE = re.compile(r"(?<![\w\"'])[rRuUfFbB]{0,2}(\"\"\"|''')(.*?)\1", re.DOTALL)
+_OR_TERM_RE = re.compile(r"^\s*([\w\"]+)\.(not\.)?(\w+)\.")
+
+
+def _args(tokens, open_index):
+    """Top-level arguments of the call opened at tokens[open_index], as token lists."""
+    close = match_brace(tokens, open_index)
+    args = [[]]
+    depth = 0
+    for t in tokens[open_index + 1:close]:
+        if t.value in ("(", "[", "{"):
+            depth += 1
+        elif t.value in (")", "]", "}"):
+            depth -= 1
+        if t.value == "," and depth == 0:
+            args.append([])
+            continue
+        args[-1].append(t)
+    return [a for a in args if a], close
+
+
+def _literal(arg):
+    if len(arg) == 1:
+        return string_value(arg[0])
+    return None
+
+
+def _object_keys(arg):
+    keys = []
+    depth = 0
+    for k, t in enumerate(arg):
+        if t.value in ("(", "[", "{"):
+            depth += 1
+        elif t.value in (")", "]", "}"):
+            depth -= 1
+        elif depth == 1 and k + 1 < len(arg) and arg[k + 1].value == ":" and t.kind in ("ident", "string"):
+            keys.append(string_value(t) if t.kind == "string" else t.value)
+    return keys
+
+
+def _or_columns(expression):
+    """`a.eq.1,and(b.is.null,c.gte.2)` -> ["a", "b", "c"]"""
+    found = []
+    for term in re.split(r"[,()]", expression):
+        term = re.sub(r"^(?:and|or|not)$", "", term.strip())
+        m = _OR_TERM_RE.match(term)
+        if m and m.group(1) not in ("and", "or") and m.group(1).strip('"') not in found:
+            found.append(m.group(1).strip('"'))
+    return found
+
+
+def _apply(query, method, args):
+    first = _literal(args[0]) if args else None
+    if method in OPERATIONS:
+        if query["operation"] is None:
+            query["operation"] = method
+        if method == "select":
+            if query["operation"] == "select":
+                query["select"] = first if args else "*"
+            if len(args) > 1 and "head" in _object_keys(args[1]):
+                query["bounded"] = True
+    elif method == "match" and args:
+        query["filters"].extend(["eq", key] for key in _object_keys(args[0]))
+    elif method == "or" and first is not None:
+        # Disjunctions cannot use a composite index prefix; kept for reporting only.
+        query["filters"].extend(["or", column] for column in _or_columns(first))
+    elif method == "filter" and len(args) >= 2:
+        if first:
+            query["filters"].append([_literal(args[1]) or "filter", first])
+    elif method in FILTER_METHODS and first:
+        query["filters"].append([method, first])
+    elif method == "order" and first:
+        query["orders"].append(first)
+    elif method in BOUND_METHODS:
+        query["bounded"] = True
+
+
+def _chain(tokens, j, query):
+    """Applies `.method(...)` calls starting at tokens[j]; returns the index after the chain."""
+    while j + 2 < len(tokens) and tokens[j].value in (".", "?.") and tokens[j + 1].kind == "ident" \
+            and tokens[j + 2].value == "(":
+        args, close = _args(tokens, j + 2)
+        _apply(query, tokens[j + 1].value, args)
+        j = close + 1
+    return j
+
+
+def _assigned_name(tokens, i):
+    """`let q = supabase.from(...)` -> "q" (None for destructuring or bare awaits)."""
+    k = i - 1
+    while k > 0 and tokens[k].value not in ("=", ";", "{", "}", ",", "(", "=>"):
+        k -= 1
+    if tokens[k].value == "=" and k > 0 and tokens[k - 1].kind == "ident":
+        return tokens[k - 1].value
+    return None
+
+
+def _scope_end(tokens, i):
+    depth = 0
+    for j in range(i, len(tokens)):
+        v = tokens[j].value
+        if v == "{":
+            depth += 1
+        elif v == "}":
+            depth -= 1
+            if depth < 0:
+                return j
+    return len(tokens)
+
+
+def extract_queries(tokens, rel_path, line_offset=0):
+    queries = []
+    for i in range(2, len(tokens) - 2):
+        t = tokens[i]
+        if t.value != "from" or tokens[i - 1].value not in (".", "?.") or tokens[i + 1].value != "(":
+            continue
+        if tokens[i - 2].value in ("storage", "Array", "Buffer"):
+            continue
+        args, close = _args(tokens, i + 1)
+        table = _literal(args[0]) if len(args) == 1 else None
+        if table is None:
+            continue
+        query = {
+            "file": rel_path,
+            "line": t.line + line_offset,
+            "table": table,
+            "operation": None,
+            "select": None,
+            "filters": [],
+            "orders": [],
+            "bounded": False,
+        }
+        _chain(tokens, close + 1, query)
+
+        # `let query = supabase.from(...)` followed by `query = query.eq(...)`
+        name = _assigned_name(tokens, i)
+        if name:
+            end = _scope_end(tokens, close)
+            for k in range(close + 1, end - 3):
+                if tokens[k].value == name and tokens[k + 1].value == "=" and tokens[k + 2].value == name:
+                    _chain(tokens, k + 3, query)
+                elif tokens[k].value == name and tokens[k + 1].value == "=" and tokens[k + 2].kind == "ident" \
+                        and tokens[k + 2].value != name:
+                    break
+        query["operation"] = query["operation"] or "select"
+        if query["operation"] == "select" and query["select"] is None:
+            query["select"] = "*"
+        queries.append(query)
+    return queries
+
+
+def templates(text):
+    """(inner text, line offset) for every triple-quoted literal that looks like TS."""
+    found = []
+    for m in _TEMPLATE_RE.finditer(text):
+        body = m.group(2)
+        if ".from(" in body:
+            found.append((body, text.count("\n", 0, m.start(2))))
+    return found
+
+
+def extract_batch(batch):
+    """Process-pool worker: query chains for each file (TS sources and Python templates)."""
+    root, rel_paths = batch
+    out = {}
+    for rel_path in rel_paths:
+        with open(os.path.join(root, *rel_path.split("/")), "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        if rel_path.endswith(".py"):
+            queries = []
+            for body, offset in templates(text):
+                queries.extend(extract_queries(tokenize(body), rel_path, offset))
+        else:
+            queries = extract_queries(tokenize(text), rel_path)
+        out[rel_path] = queries
+    return out
+
+
+def source_files(index):
+    files = {p for g in QUERY_SOURCES for p in index.glob(g)}
+    files.update(p for g in TEMPLATE_SOURCES for p in index.glob(g) if not p.startswith(TEMPLATE_EXCLUDE))
+    return sorted(files)
+
+
+def _collect(ctx):
+    facts, analysed = file_cache(ctx).map_files(
+        "supabase_queries", extract_batch, source_files(ctx.index), depends=[audit_tslex]
+    )
+    return [q for rel_path in sorted(facts) for q in facts[rel_path]], analysed
+
+
+def supabase_queries(ctx):
+    """All query chains in the project, in file order, plus how many files were re-parsed.
+    Filters are `[op, column]` pairs; `op` is "or" for columns inside `.or(...)`."""
+    return ctx.memo("supabase_queries", _collect)
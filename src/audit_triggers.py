@@ -0,0 +1,248 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from audit_sql import SQL_SOURCES, load_statements, split_statements, normalize_identifier, _IDENT
+from audit_indexes import DEFAULT_KEY, known_indexes
+
+# Every trigger the SQL in the repo leaves in place, with what its function
+# (and the functions it calls) does for each row: aggregates, scans and
+# writes to other tables. Row-level triggers doing that on a hot table turn
+# one booking insert into several recalculations.
+
+TRIGGER_SOURCES = SQL_SOURCES
+# Tables written on every booking / sale.
+HOT_TABLES = {"citas", "ventas_productos"}
+MAX_CALL_DEPTH = 4
+
+_AGGREGATES_RE = re.compile(
+    r"\b(SUM|COUNT|AVG|MIN|MAX|STRING_AGG|ARRAY_AGG|JSONB?_AGG|BOOL_OR|BOOL_AND)\s*\(", re.IGNORECASE)
+_FUNCTION_RE = re.compile(r"CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+(" + _IDENT + r")\s*\(", re.IGNORECASE)
+_BODY_RE = re.compile(r"\bAS\s+(\$[A-Za-z_]*\$)(.*?)\1", re.IGNORECASE | re.DOTALL)
+_TRIGGER_RE = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:CONSTRAINT\s+)?TRIGGER\s+(" + _IDENT + r")\s+"
+    r"(BEFORE|AFTER|INSTEAD\s+OF)\s+(.*?)\s+ON\s+(" + _IDENT + r")\s+(.*?)"
+    r"EXECUTE\s+(?:FUNCTION|PROCEDURE)\s+(" + _IDENT + r")\s*\(",
+    re.IGNORECASE | re.DOTALL,
+)
+_DROP_TRIGGER_RE = re.compile(
+    r"DROP\s+TRIGGER\s+(?:IF\s+EXISTS\s+)?(" + _IDENT + r")\s+ON\s+(" + _IDENT + r")", re.IGNORECASE)
+_WRITE_RE = re.compile(r"\b(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(" + _IDENT + r")", re.IGNORECASE)
+_READ_RE = re.compile(r"\b(?<!DELETE\s)(?<!DISTINCT\s)(FROM|JOIN)\s+(" + _IDENT + r")", re.IGNORECASE)
+_CTE_RE = re.compile(r"(?:\bWITH|,)\s*(\w+)\s+AS\s*\(", re.IGNORECASE)
+# Where the WHERE clause of a FROM stops applying.
+_CLAUSE_RE = re.compile(
+    r"\b(WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT|ON\s+CONFLICT|RETURNING|UNION|INSERT|SELECT)\b|[()]", re.IGNORECASE)
+_EXTRACT_RE = re.compile(r"\b(?:EXTRACT|SUBSTRING|TRIM|OVERLAY|POSITION)\s*\([^()]*\)", re.IGNORECASE)
+_CAST_COLUMN_RE = re.compile(r'(?<![\w.])("[^"]+"|[a-z_]\w*)\s*::\s*\w+\s*(?:=|<|>|BETWEEN|IN\b)', re.IGNORECASE)
+_EQUALITY_RE = re.compile(r'(?<![\w.])("[^"]+"|[a-z_]\w*)\s*=', re.IGNORECASE)
+_CALL_RE = re.compile(r"\b(" + _IDENT + r")\s*\(")
+# Variables, record fields and keywords that can follow FROM/UPDATE/...
+_NOT_TABLES = {"set", "of", "only", "new", "old", "select", "lateral", "unnest", "generate_series"}
+_VARIABLE_PREFIXES = ("p_", "v_", "tg_")
+
+
+@dataclass
+class Effect:
+    kind: str  # aggregate | scan | write | read
+    table: str
+    detail: str
+    where: str
+
+
+@dataclass
+class Trigger:
+    name: str
+    table: str
+    timing: str
+    events: List[str]
+    level: str  # row | statement
+    function: str
+    when: Optional[str] = None
+    source: str = ""
+    line: int = 0
+    effects: List[Effect] = field(default_factory=list)
+    writes_per_row: int = 0
+
+
+def _is_table(name):
+    return name not in _NOT_TABLES and not name.startswith(_VARIABLE_PREFIXES)
+
+
+def _where_clause(text):
+    """WHERE clause following a FROM item (subqueries skipped), or None."""
+    depth, start = 0, None
+    for m in _CLAUSE_RE.finditer(text):
+        token = m.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth < 0:
+                break
+        elif depth == 0:
+            if start is not None:
+                return text[start:m.start()]
+            if m.group(1).upper() != "WHERE":
+                return None
+            start = m.end()
+    return text[start:m.start() if depth < 0 else len(text)] if start is not None else None
+
+
+def _scan_reason(table, where_clause, indexes):
+    """Why reading `table` under `where_clause` cannot use an index, or None."""
+    if where_clause is None:
+        return "sin WHERE: recorre la tabla entera"
+    cast = _CAST_COLUMN_RE.search(where_clause)
+    if cast:
+        return f"{cast.group(0).split('::')[0].strip()}::... en el WHERE impide usar el indice"
+    equality = {normalize_identifier(c) for c in _EQUALITY_RE.findall(where_clause)}
+    equality -= {"new", "old"}
+    leading = {cols[0] for cols in [DEFAULT_KEY] + [i.columns for i in indexes.get(table, []) if i.columns]}
+    if equality and not (equality & leading):
+        return f"ningun indice empieza por {', '.join(sorted(equality))}"
+    return None
+
+
+def body_effects(body, source, line, indexes):
+    """(effects, called names) of one function body, statement by statement."""
+    effects, calls = [], []
+    for stmt in split_statements(body, source):
+        text = _EXTRACT_RE.sub(" ", stmt.text)
+        where = f"{source}:{line + stmt.line - 1}"
+        written = set()
+        for m in _WRITE_RE.finditer(text):
+            table = normalize_identifier(m.group(2))
+            if _is_table(table) and not (m.group(1).upper() == "UPDATE" and text[:m.start()].rstrip().upper().endswith("DO")):
+                written.add(table)
+                effects.append(Effect("write", table, m.group(1).upper().split()[0], where))
+        ctes = {name.lower() for name in _CTE_RE.findall(text)}
+        aggregate = _AGGREGATES_RE.search(text)
+        for m in _READ_RE.finditer(text):
+            table = normalize_identifier(m.group(2))
+            if not _is_table(table) or table in ctes or text[m.end():].lstrip().startswith("("):
+                continue
+            where_clause = _where_clause(text[m.end():])
+            if aggregate:
+                effects.append(Effect("aggregate", table, aggregate.group(1).upper(), where))
+            reason = _scan_reason(table, where_clause, indexes)
+            if reason:
+                effects.append(Effect("scan", table, reason, where))
+            elif not aggregate and table not in written:
+                effects.append(Effect("read", table, "lookup", where))
+        for m in _CALL_RE.finditer(text):
+            calls.append((normalize_identifier(m.group(1)), where))
+    return effects, calls
+
+
+def parse_objects(statements):
+    """({function: (body, source, line)}, [Trigger]) left in place by `statements`.
+
+    Scripts are hand-run in no recorded order, so the last definition of a
+    function wins, and a trigger dropped by a script that does not recreate it
+    is treated as retired."""
+    functions, triggers, retired = {}, {}, set()
+    created_in, dropped_in = {}, {}
+    for stmt in statements:
+        text = stmt.text
+        m = _FUNCTION_RE.match(text)
+        if m:
+            body = _BODY_RE.search(text, m.end())
+            if body:
+                offset = text.count("\n", 0, body.start(2))
+                functions[normalize_identifier(m.group(1))] = (body.group(2), stmt.source, stmt.line + offset)
+            continue
+        m = _TRIGGER_RE.match(text)
+        if m:
+            name, table = normalize_identifier(m.group(1)), normalize_identifier(m.group(4))
+            events = [re.sub(r"\s+", " ", e.strip()).upper().split(" OF ")[0]
+                      for e in re.split(r"\bOR\b", m.group(3), flags=re.IGNORECASE)]
+            rest = m.group(5)
+            when = re.search(r"\bWHEN\s*\((.*)\)", rest, re.IGNORECASE | re.DOTALL)
+            triggers[(name, table)] = Trigger(
+                name, table, re.sub(r"\s+", " ", m.group(2).upper()), events,
+                "row" if re.search(r"\bFOR\s+(?:EACH\s+)?ROW\b", rest, re.IGNORECASE) else "statement",
+                normalize_identifier(m.group(6)), re.sub(r"\s+", " ", when.group(1)).strip() if when else None,
+                stmt.source, stmt.line,
+            )
+            created_in.setdefault((name, table), set()).add(stmt.source)
+            continue
+        m = _DROP_TRIGGER_RE.match(text)
+        if m:
+            dropped_in.setdefault((normalize_identifier(m.group(1)), normalize_identifier(m.group(2))), set()).add(stmt.source)
+    for key, sources in dropped_in.items():
+        if sources - created_in.get(key, set()):
+            retired.add(key)
+    return functions, [t for key, t in triggers.items() if key not in retired]
+
+
+class _Expander:
+    def __init__(self, functions, indexes):
+        self.functions = functions
+        self.indexes = indexes
+        self._direct = {}
+
+    def direct(self, name):
+        if name not in self._direct:
+            body, source, line = self.functions[name]
+            self._direct[name] = body_effects(body, source, line, self.indexes)
+        return self._direct[name]
+
+    def expand(self, name, depth=0, stack=()):
+        """Effects of `name` and everything it calls; each call site counts again."""
+        if name not in self.functions or name in stack or depth > MAX_CALL_DEPTH:
+            return []
+        effects, calls = self.direct(name)
+        found = list(effects)
+        for callee, where in calls:
+            if callee != name and callee in self.functions:
+                found.extend(Effect(e.kind, e.table, f"{e.detail} (via {callee})", e.where)
+                             for e in self.expand(callee, depth + 1, stack + (name,)))
+        return found
+
+
+def trigger_cost(trigger):
+    """HIGH / MEDIUM / LOW for one trigger."""
+    heavy = [e for e in trigger.effects
+             if e.kind in ("aggregate", "scan") or (e.kind == "write" and e.table != trigger.table)]
+    if trigger.level != "row" or not heavy:
+        return "LOW"
+    return "HIGH" if trigger.table in HOT_TABLES else "MEDIUM"
+
+
+def analyze_triggers(ctx):
+    statements = load_statements(ctx.index, TRIGGER_SOURCES)
+    functions, triggers = parse_objects(statements)
+    expander = _Expander(functions, known_indexes(ctx))
+    findings = []
+    by_table = {}
+    for trigger in sorted(triggers, key=lambda t: (t.table, t.name)):
+        trigger.effects = expander.expand(trigger.function)
+        trigger.writes_per_row = sum(1 for e in trigger.effects if e.kind == "write")
+        cost = trigger_cost(trigger)
+        kinds = {}
+        for e in trigger.effects:
+            if e.kind != "read":
+                kinds.setdefault(e.kind, set()).add(e.table)
+        findings.append({
+            "trigger": trigger.name,
+            "table": trigger.table,
+            "timing": trigger.timing,
+            "events": trigger.events,
+            "level": trigger.level,
+            "function": trigger.function if trigger.function in functions else f"{trigger.function} (no definida)",
+            "cost": cost,
+            "writes_per_row": trigger.writes_per_row,
+            "aggregates": sorted(kinds.get("aggregate", ())),
+            "scans": list(dict.fromkeys(f"{e.table}: {e.detail} @ {e.where}" for e in trigger.effects if e.kind == "scan")),
+            "cross_table_writes": sorted(kinds.get("write", set()) - {trigger.table}),
+            "at": f"{trigger.source}:{trigger.line}",
+        })
+        if trigger.level == "row":
+            table = by_table.setdefault(trigger.table, {"row_triggers": 0, "writes_per_row": 0})
+            table["row_triggers"] += 1
+            table["writes_per_row"] += trigger.writes_per_row
+    order = ("HIGH", "MEDIUM", "LOW")
+    findings.sort(key=lambda f: (order.index(f["cost"]), f["table"], f["trigger"]))
+    summary = {"functions": len(functions), "triggers": len(triggers), "per_table": by_table}
+    return findings, summary
@@ -0,0 +1,379 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+# Lightweight TypeScript/TSX lexer for the static audit checks. It is not a parser:
+# it only has to get strings, comments, template literals and brace nesting right
+# so that checks can reason about function bodies and call order.
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str  # ident | string | template | number | punct | regex
+    value: str
+    start: int
+    line: int
+
+
+_IDENT_RE = re.compile(r"(?:[^\W\d]|\$)[\w$]*")
+_NUMBER_RE = re.compile(r"\d[\w.]*")
+_PUNCT = ["...", "===", "!==", "**=", "<<=", ">>=", "&&=", "||=", "??=", "=>", "==", "!=", "<=", ">=",
+          "&&", "||", "??", "?.", "++", "--", "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=", "**"]
+# "<" is deliberately absent: in TSX "</div>" is a closing tag, not a regex.
+_REGEX_PREV = set("(,=:[!&|?{};+-*%~^") | {"return", "typeof", "case", "do", "else", "in", "of", "=>", "&&", "||", "??"}
+
+
+def _skip_string(text, i, quote):
+    i += 1
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote or (c == "\n" and quote != "`"):
+            return i + 1
+        if quote == "`" and c == "$" and text.startswith("${", i):
+            i = _skip_interpolation(text, i + 2)
+            continue
+        i += 1
+    return n
+
+
+def _skip_interpolation(text, i):
+    depth = 1
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c in "'\"`":
+            i = _skip_string(text, i, c)
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return n
+
+
+def tokenize(text) -> List[Token]:
+    tokens = []
+    i = 0
+    n = len(text)
+    line = 1
+    while i < n:
+        c = text[i]
+        if c == "\n":
+            line += 1
+            i += 1
+            continue
+        if c.isspace():
+            i += 1
+            continue
+        if text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        if text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            line += text.count("\n", i, j)
+            i = j
+            continue
+        start = i
+        if c in "'\"`":
+            i = _skip_string(text, i, c)
+            kind = "template" if c == "`" else "string"
+        elif c == "/" and (not tokens or tokens[-1].value in _REGEX_PREV):
+            j = i + 1
+            in_class = False
+            while j < n and text[j] != "\n":
+                if text[j] == "\\":
+                    j += 2
+                    continue
+                if text[j] == "[":
+                    in_class = True
+                elif text[j] == "]":
+                    in_class = False
+                elif text[j] == "/" and not in_class:
+                    break
+                j += 1
+            m = _IDENT_RE.match(text, j + 1)
+            i = m.end() if m else j + 1
+            kind = "regex"
+        elif c.isalpha() or c in "_$":
+            i = _IDENT_RE.match(text, i).end()
+            kind = "ident"
+        elif c.isdigit():
+            i = _NUMBER_RE.match(text, i).end()
+            kind = "number"
+        else:
+            for p in _PUNCT:
+                if text.startswith(p, i):
+                    i += len(p)
+                    break
+            else:
+                i += 1
+            kind = "punct"
+        value = text[start:i]
+        tokens.append(Token(kind, value, start, line))
+        if kind == "template":
+            line += value.count("\n")
+    return tokens
+
+
+def string_value(token):
+    return token.value[1:-1] if token.kind in ("string", "template") else None
+
+
+def directive(tokens):
+    """Returns 'use server' / 'use client' when the file starts with one."""
+    if tokens and tokens[0].kind == "string":
+        value = string_value(tokens[0])
+        if value in ("use server", "use client"):
+            return value
+    return None
+
+
+def match_brace(tokens, i):
+    """Index of the token closing the bracket at tokens[i]."""
+    pairs = {"{": "}", "(": ")", "[": "]"}
+    opening = tokens[i].value
+    closing = pairs[opening]
+    depth = 0
+    for j in range(i, len(tokens)):
+        v = tokens[j].value
+        if v == opening:
+            depth += 1
+        elif v == closing:
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(tokens) - 1
+
+
+def body_start(tokens, i):
+    """From the token after a parameter list, skip an optional return type and
+    return the index of the body's opening brace (or None for arrow expressions)."""
+    angle = 0
+    prev = None
+    while i < len(tokens):
+        v = tokens[i].value
+        if v == "<":
+            angle += 1
+        elif v == ">":
+            angle -= 1
+        elif v == ">>":
+            angle -= 2
+        elif v == "=>":
+            if i + 1 < len(tokens) and tokens[i + 1].value == "{":
+                return i + 1
+            return None
+        elif v == "{":
+            if angle <= 0 and prev not in (":", "|", "&", ",", "<"):
+                return i
+            i = match_brace(tokens, i)
+        elif v in ("(", "["):
+            i = match_brace(tokens, i)
+        elif v == ";":
+            return None
+        prev = v
+        i += 1
+    return None
+
+
+@dataclass
+class FunctionSpan:
+    name: str
+    exported: bool
+    line: int
+    body_start: int
+    body_end: int
+
+
+def functions(tokens) -> List[FunctionSpan]:
+    """Top-level function declarations and `const f = (async) (...) => {}`."""
+    spans = []
+    depth = 0
+    i = 0
+    while i < len(tokens):
+        t = tokens[i]
+        if t.value in ("{", "(", "["):
+            depth += 1
+        elif t.value in ("}", ")", "]"):
+            depth -= 1
+        if depth != 0 or t.kind != "ident":
+            i += 1
+            continue
+
+        exported = t.value == "export"
+        j = i + 1 if exported else i
+        if exported and j < len(tokens) and tokens[j].value == "default":
+            j += 1
+        if j < len(tokens) and tokens[j].value == "async":
+            j += 1
+
+        name = None
+        params = None
+        if j + 1 < len(tokens) and tokens[j].value == "function":
+            k = j + 1
+            if tokens[k].value == "*":
+                k += 1
+            if tokens[k].kind == "ident":
+                name = tokens[k].value
+                k += 1
+            else:
+                name = "default"
+            if k < len(tokens) and tokens[k].value == "<":
+                while k < len(tokens) and tokens[k].value != "(":
+                    k += 1
+            if k < len(tokens) and tokens[k].value == "(":
+                params = k
+        elif j + 3 < len(tokens) and tokens[j].value in ("const", "let") and tokens[j + 1].kind == "ident":
+            k = j + 2
+            if tokens[k].value == ":":
+                while k < len(tokens) and tokens[k].value != "=":
+                    k += 1
+            if k < len(tokens) and tokens[k].value == "=":
+                k += 1
+                if k < len(tokens) and tokens[k].value == "async":
+                    k += 1
+                if k < len(tokens) and tokens[k].value == "(":
+                    name = tokens[j + 1].value
+                    params = k
+
+        if name is None or params is None:
+            i += 1
+            continue
+        close = match_brace(tokens, params)
+        body = body_start(tokens, close + 1)
+        if body is None:
+            i = close + 1
+            continue
+        end = match_brace(tokens, body)
+        spans.append(FunctionSpan(name, exported, tokens[i].line, body, end))
+        i = end + 1
+    return spans
+
+
+def imports(tokens):
+    """Maps locally bound names to the module they were imported from."""
+    bound = {}
+    i = 0
+    while i < len(tokens):
+        if tokens[i].value == "import" and (i == 0 or tokens[i - 1].value != "."):
+            j = i + 1
+            names = []
+            while j < len(tokens) and tokens[j].value != "from" and tokens[j].kind != "string":
+                # `a as b` binds b; `type` only marks type-only imports.
+                aliased = j + 1 < len(tokens) and tokens[j + 1].value == "as"
+                if tokens[j].kind == "ident" and tokens[j].value not in ("type", "as") and not aliased:
+                    names.append(tokens[j].value)
+                j += 1
+            if j < len(tokens) and tokens[j].value == "from":
+                j += 1
+            if j < len(tokens) and tokens[j].kind == "string":
+                for name in names:
+                    bound[name] = string_value(tokens[j])
+            i = j + 1
+            continue
+        i += 1
+    return bound
+
+
+RESOLVE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs")
+PATH_ALIASES = {"@/": ""}  # tsconfig.json: "@/*": ["./*"]
+
+
+def resolve_import(exists, from_file, spec, aliases=PATH_ALIASES):
+    """Resolves an import specifier to a project-relative file, or None for
+    packages. `exists(rel_path)` is usually RepoIndex.exists."""
+    base = None
+    for alias, target in aliases.items():
+        if spec.startswith(alias):
+            base = target + spec[len(alias):]
+            break
+    if base is None:
+        if not spec.startswith("."):
+            return None
+        parts = from_file.split("/")[:-1]
+        for part in spec.split("/"):
+            if part == "..":
+                if parts:
+                    parts.pop()
+            elif part not in (".", ""):
+                parts.append(part)
+        base = "/".join(parts)
+    candidates = [base] + [base + ext for ext in RESOLVE_EXTENSIONS] + [f"{base}/index{ext}" for ext in RESOLVE_EXTENSIONS]
+    for candidate in candidates:
+        if exists(candidate):
+            return candidate
+    return None
+
+
+def import_specifiers(tokens):
+    """Every module a file pulls in: [(spec, kind, imported_names)], where kind is
+    "static", "type" (erased at compile time) or "dynamic" (`import()`, lazy chunk).
+    Names are the exported names (`a` in `a as b`); "*" / "default" when relevant."""
+    found = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        v = tokens[i].value
+        prev = tokens[i - 1].value if i else ""
+        if v == "import" and prev not in (".", "?."):
+            if i + 1 < n and tokens[i + 1].value == "(":
+                if i + 2 < n and tokens[i + 2].kind == "string":
+                    found.append((string_value(tokens[i + 2]), "dynamic", []))
+                i += 2
+                continue
+            j = i + 1
+            kind = "static"
+            if j < n and tokens[j].value == "type" and j + 1 < n and tokens[j + 1].value != "from":
+                kind = "type"
+                j += 1
+            names = []
+            braces = False
+            while j < n and tokens[j].value != "from" and tokens[j].kind != "string":
+                t = tokens[j]
+                if t.value in ("{", "}"):
+                    braces = t.value == "{"
+                elif t.value == "*":
+                    names.append("*")
+                elif t.kind == "ident" and t.value != "as" and tokens[j - 1].value != "as" \
+                        and not (t.value == "type" and tokens[j + 1].kind == "ident"):
+                    if not braces:
+                        names.append("default")
+                    elif tokens[j - 1].value != "type":  # `{ type Foo }` is erased
+                        names.append(t.value)
+                j += 1
+            if j < n and tokens[j].value == "from":
+                j += 1
+            if j < n and tokens[j].kind == "string":
+                found.append((string_value(tokens[j]), kind, names))
+            i = j + 1
+            continue
+        if v == "export" and i + 1 < n and tokens[i + 1].value in ("{", "*", "type"):
+            j = i + 1
+            kind = "type" if tokens[j].value == "type" else "static"
+            names = []
+            while j < n and tokens[j].value not in ("from", ";") and tokens[j].line - tokens[i].line < 50:
+                if tokens[j].value == "}" and (j + 1 >= n or tokens[j + 1].value != "from"):
+                    break
+                if tokens[j].kind == "ident" and tokens[j - 1].value != "as" and tokens[j].value not in ("type", "as"):
+                    names.append(tokens[j].value)
+                elif tokens[j].value == "*":
+                    names.append("*")
+                j += 1
+            if j + 1 < n and tokens[j].value == "from" and tokens[j + 1].kind == "string":
+                found.append((string_value(tokens[j + 1]), kind, names))
+                i = j + 2
+                continue
+        if v == "require" and prev not in (".", "?.") and i + 2 < n and tokens[i + 1].value == "(" \
+                and tokens[i + 2].kind == "string":
+            found.append((string_value(tokens[i + 2]), "static", ["*"]))
+        i += 1
+    return found
+
@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import errno
+import ctypes
+import select
+import struct
+
+from audit_index import RepoIndex, SKIP_DIRS, reads_match
+
+DEBOUNCE_SECONDS = 0.15
+POLL_INTERVAL = 1.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher (Linux) built on libc through ctypes."""
+
+    def __init__(self, index):
+        self.index = index
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wd_to_dir = {}
+        for rel_dir in list(index.dirs):
+            self._add_watch(rel_dir)
+
+    def _add_watch(self, rel_dir):
+        path = self.index.abspath(rel_dir) if rel_dir else self.index.root
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return
+        self.wd_to_dir[wd] = rel_dir
+
+    def _walk_new_dir(self, rel_dir, changed):
+        # Files moved in with a directory produce no events of their own.
+        self._add_watch(rel_dir)
+        for dirpath, dirnames, filenames in os.walk(self.index.abspath(rel_dir)):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            rel = os.path.relpath(dirpath, self.index.root).replace(os.sep, "/")
+            if rel != rel_dir:
+                self._add_watch(rel)
+            changed.update(f"{rel}/{f}" for f in filenames)
+
+    def poll(self, timeout):
+        """Blocks up to `timeout` seconds and returns the changed relative paths."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+            name = buf[offset + _EVENT_HEADER.size: offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                return {"*"}
+            if mask & IN_IGNORED:
+                self.wd_to_dir.pop(wd, None)
+                continue
+            rel_dir = self.wd_to_dir.get(wd)
+            if rel_dir is None or not name:
+                continue
+            name = os.fsdecode(name)
+            if name in SKIP_DIRS:
+                continue
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._walk_new_dir(rel, changed)
+                else:
+                    changed.update(self.index.files_under(rel))
+            else:
+                changed.add(rel)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback: re-walks the tree and diffs size/mtime."""
+
+    def __init__(self, index, interval=POLL_INTERVAL):
+        self.index = index
+        self.interval = interval
+        self.snapshot = dict(index.entries)
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = RepoIndex.build(self.index.root).entries
+        changed = {p for p in set(current) | set(self.snapshot) if current.get(p) != self.snapshot.get(p)}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(index):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(index)
+        except (OSError, AttributeError) as exc:
+            print(f"WARN: inotify no disponible ({exc}); usando polling cada {POLL_INTERVAL}s")
+    return PollingWatcher(index)
+
+
+def affected_checks(checks, changed_paths):
+    if "*" in changed_paths:
+        return list(checks)
+    affected = []
+    for check in checks:
+        if any(reads_match(check.reads, p) for p in changed_paths):
+            affected.append(check)
+    return affected
+
+
+def watch(index, checks, on_change, ignore_prefixes=(), debounce=DEBOUNCE_SECONDS):
+    """Long-lived loop: collects filesystem events, waits until they go quiet for
+    `debounce` seconds, then calls `on_change(changed_paths, affected_checks)`.
+
+    Paths under `ignore_prefixes` (the audit's own outputs) never trigger a run.
+    """
+    watcher = make_watcher(index)
+    print(f"INFO: Modo watch activo sobre {index.root} ({watcher.__class__.__name__}). Ctrl+C para salir.")
+    try:
+        while True:
+            pending = watcher.poll(timeout=3600)
+            while pending:
+                more = watcher.poll(timeout=debounce)
+                if not more:
+                    break
+                pending |= more
+            pending = {p for p in pending if not p.startswith(tuple(ignore_prefixes))}
+            if not pending:
+                continue
+            if "*" in pending:
+                fresh = RepoIndex.build(index.root)
+                pending = set(fresh.entries) | set(index.entries)
+            changed = index.refresh(sorted(pending))
+            affected = affected_checks(checks, changed)
+            if affected:
+                on_change(changed, affected)
+    except KeyboardInterrupt:
+        print("INFO: Modo watch detenido.")
+    finally:
+        watcher.close()
@@ -0,0 +1,363 @@
+import os
+
+import audit_tslex
+from audit_tslex import tokenize, match_brace, functions, body_start
+from audit_cache import file_cache
+
+# Request-waterfall analysis: inside every async function, which awaited
+# Supabase/network calls depend on each other (data flow through local names)
+# and which could run together in one Promise.all.
+
+WATERFALL_SOURCES = ["app/**/*.ts", "app/**/*.tsx", "hooks/**/*.ts", "components/**/*.tsx", "lib/**/*.ts"]
+
+# Round-trip cost used for the savings estimate (Supabase from Vercel, ms).
+ROUND_TRIP_MS = (30, 80)
+
+WRITE_METHODS = {"insert", "update", "upsert", "delete", "rpc"}
+LOOP_KEYWORDS = {"for", "while", "do"}
+
+# Tokens after which an expression continues on the next line.
+_CONTINUES = {".", "?.", "(", "[", "{", ",", "=", "=>", "+", "-", "*", "/", "%", "?", ":", "??", "&&", "||",
+              "===", "!==", "==", "!=", "<", ">", "<=", ">=", "await", "new", "return", "in", "of", "!"}
+# Tokens that continue the previous line's expression.
+_LEADING = {".", "?.", ")", "]", "}", ",", "?", ":", "??", "&&", "||", "+", "-", "*", "/", "=>"}
+
+
+def _expression_end(tokens, i, limit):
+    """Index one past the expression statement starting at tokens[i]."""
+    depth = 0
+    j = i
+    while j < limit:
+        v = tokens[j].value
+        if v in ("(", "[", "{"):
+            depth += 1
+        elif v in (")", "]", "}"):
+            if depth == 0:
+                return j
+            depth -= 1
+        elif depth == 0 and v == ";":
+            return j
+        if depth == 0 and j + 1 < limit and tokens[j + 1].line > tokens[j].line \
+                and v not in _CONTINUES and tokens[j + 1].value not in _LEADING:
+            return j + 1
+        j += 1
+    return limit
+
+
+def _uses(tokens, start, end):
+    names = set()
+    for k in range(start, end):
+        t = tokens[k]
+        if t.kind == "ident" and (k == 0 or tokens[k - 1].value not in (".", "?.")):
+            names.add(t.value)
+    return names
+
+
+def _bound(tokens, start, end):
+    """Names bound by a declaration target: `x`, `{ data: x, error }`, `[a, b]`."""
+    if end - start == 1:
+        return {tokens[start].value} if tokens[start].kind == "ident" else set()
+    names = set()
+    for k in range(start, end):
+        t = tokens[k]
+        if t.kind == "ident" and (k + 1 >= end or tokens[k + 1].value != ":") \
+                and tokens[k - 1].value not in (".", "?."):
+            names.add(t.value)
+    return names
+
+
+def _statement_start(tokens, i, body_start):
+    """Start of the statement containing tokens[i] (an `await` or `=`)."""
+    k = i - 1
+    depth = 0
+    while k > body_start:
+        v = tokens[k].value
+        if depth == 0 and tokens[k].line < tokens[k + 1].line and v not in _CONTINUES \
+                and tokens[k + 1].value not in _LEADING:
+            break
+        if v in (")", "]", "}"):
+            depth += 1
+        elif v in ("(", "[", "{"):
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0 and v == ";":
+            break
+        elif depth == 0 and v in ("const", "let", "var"):
+            return k
+        k -= 1
+    return k + 1
+
+
+def _async_bodies(tokens):
+    """(name, line, body_start, body_end) for every async function with a block body."""
+    named = {s.body_start: s.name for s in functions(tokens)}
+    bodies = []
+    for i, t in enumerate(tokens):
+        if t.value != "async" or t.kind != "ident":
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j].value == "function":
+            j += 1
+            if j < len(tokens) and tokens[j].value == "*":
+                j += 1
+            if j < len(tokens) and tokens[j].kind == "ident":
+                j += 1
+        elif j < len(tokens) and tokens[j].kind == "ident" and j + 1 < len(tokens) and tokens[j + 1].value == "(":
+            j += 1  # method shorthand: async load() {}
+        if j >= len(tokens):
+            continue
+        if tokens[j].value == "(":
+            body = body_start(tokens, match_brace(tokens, j) + 1)
+        elif tokens[j].kind == "ident" and j + 1 < len(tokens) and tokens[j + 1].value == "=>":
+            body = j + 2 if j + 2 < len(tokens) and tokens[j + 2].value == "{" else None
+        else:
+            body = None
+        if body is None:
+            continue
+        name = named.get(body)
+        if name is None:
+            if i >= 2 and tokens[i - 1].value in ("=", ":") and tokens[i - 2].kind == "ident":
+                name = tokens[i - 2].value
+            elif tokens[i + 1].kind == "ident" and tokens[i + 1].value != "function":
+                name = tokens[i + 1].value
+            else:
+                name = "<anonymous>"
+        bodies.append((name, t.line, body, match_brace(tokens, body)))
+    return bodies
+
+
+def _loops(tokens, start, end):
+    """Token ranges of loop bodies inside tokens[start:end]."""
+    ranges = []
+    for k in range(start, end):
+        v = tokens[k].value
+        if v not in LOOP_KEYWORDS or tokens[k].kind != "ident" or (k and tokens[k - 1].value in (".", "?.")):
+            continue
+        j = k + 1
+        if v == "for" and j < end and tokens[j].value == "await":
+            j += 1
+        if v != "do":
+            if j >= end or tokens[j].value != "(":
+                continue
+            j = match_brace(tokens, j) + 1
+        if j < end and tokens[j].value == "{":
+            ranges.append((tokens[k].line, j, match_brace(tokens, j)))
+        elif j < end:
+            ranges.append((tokens[k].line, j, _expression_end(tokens, j, end)))
+    return ranges
+
+
+def _branches(tokens, start, end):
+    """(chain, arm, start, end, conditions) for the arms of every if / else if /
+    else chain. Awaits in different arms of one chain never run together, and an
+    await inside an arm depends on every condition tested to reach it."""
+    arms = []
+    for k in range(start, end):
+        if tokens[k].value != "if" or tokens[k].kind != "ident" or tokens[k - 1].value == "else":
+            continue
+        chain, arm, j = k, 0, k
+        conditions = []
+        while j < end and tokens[j].value == "if" and j + 1 < end and tokens[j + 1].value == "(":
+            conditions.append((j + 2, match_brace(tokens, j + 1)))
+            body = match_brace(tokens, j + 1) + 1
+            close = match_brace(tokens, body) if tokens[body].value == "{" else _expression_end(tokens, body, end)
+            arms.append((chain, arm, body, close, list(conditions)))
+            nxt = close + 1 if tokens[body].value == "{" else close
+            if nxt >= end or tokens[nxt].value != "else":
+                break
+            arm += 1
+            if nxt + 1 < end and tokens[nxt + 1].value == "if":
+                j = nxt + 1
+                continue
+            body = nxt + 1
+            close = match_brace(tokens, body) if tokens[body].value == "{" else _expression_end(tokens, body, end)
+            arms.append((chain, arm, body, close, list(conditions)))
+            break
+    return arms
+
+
+def _exclusive(a, b):
+    arms_a = dict(a["arms"])
+    return any(chain in arms_a and arms_a[chain] != arm for chain, arm in b["arms"])
+
+
+def parallel_groups(nodes):
+    """Nodes on the same dependency level, split so no group mixes exclusive branches."""
+    levels = {}
+    for node in nodes:
+        levels.setdefault(node["level"], []).append(node)
+    groups = []
+    for _, members in sorted(levels.items()):
+        pending = list(members)
+        while pending:
+            group = [pending.pop(0)]
+            for node in list(pending):
+                if not any(_exclusive(node, other) for other in group):
+                    group.append(node)
+                    pending.remove(node)
+            if len(group) > 1:
+                groups.append([n["line"] for n in group])
+    return groups
+
+
+def _network_call(tokens, start, end):
+    """'read' | 'write' | None for the awaited expression tokens[start:end]."""
+    kind = None
+    for k in range(start, end):
+        v = tokens[k].value
+        prev = tokens[k - 1].value if k else ""
+        if prev in (".", "?.") and v == "from" and k + 1 < end and tokens[k + 1].value == "(" \
+                and tokens[k - 2].value not in ("Array", "storage"):
+            kind = kind or "read"
+        elif prev in (".", "?.") and v in WRITE_METHODS and k + 1 < end and tokens[k + 1].value == "(":
+            return "write"
+        elif (prev in (".", "?.") and v in ("auth", "storage")) or (v == "fetch" and prev not in (".", "?.")) \
+                or (v == "stripe" and prev not in (".", "?.")):
+            return "write"
+    return kind
+
+
+def analyze_function(tokens, body_start, body_end, inner):
+    """Network awaits of one async body: their dependency levels and N+1 loops.
+
+    `inner` are the (start, end) token ranges of nested async functions, whose
+    awaits belong to them."""
+    scope = {
+        "loops": _loops(tokens, body_start + 1, body_end),
+        "branches": _branches(tokens, body_start + 1, body_end),
+        "nodes": [],
+        "loop_awaits": [],
+        "sources": {},  # local name -> set of node ids it was derived from
+    }
+    sources = scope["sources"]
+    k = body_start + 1
+    while k < body_end:
+        if any(s <= k <= e for s, e in inner):
+            k = next(e for s, e in inner if s <= k <= e) + 1
+            continue
+        v = tokens[k].value
+        if v == "=" and tokens[k - 1].value not in (".",):
+            # Plain assignment/declaration: propagate provenance of the right-hand side.
+            stmt = _statement_start(tokens, k, body_start)
+            target_start = stmt + 1 if tokens[stmt].value in ("const", "let", "var") else stmt
+            end = _expression_end(tokens, k + 1, body_end)
+            is_await = k + 1 < end and tokens[k + 1].value == "await"
+            derived = set()
+            for name in _uses(tokens, k + 1, end):
+                derived |= sources.get(name, set())
+            node = None
+            if is_await:
+                node = _await_node(tokens, k + 1, end, scope, derived)
+            if node is not None:
+                derived = derived | {node}
+            for name in _bound(tokens, target_start, k):
+                sources[name] = derived
+            k = end if is_await else k + 1
+            continue
+        if v == "await" and tokens[k - 1].value not in ("=",):
+            end = _expression_end(tokens, k, body_end)
+            derived = set()
+            for name in _uses(tokens, k + 1, end):
+                derived |= sources.get(name, set())
+            _await_node(tokens, k, end, scope, derived)
+            k = end
+            continue
+        k += 1
+    return scope["nodes"], scope["loop_awaits"]
+
+
+def _await_node(tokens, k, end, scope, derived):
+    kind = _network_call(tokens, k + 1, end)
+    if kind is None:
+        return None
+    loop = next((line for line, s, e in scope["loops"] if s <= k <= e), None)
+    if loop is not None:
+        scope["loop_awaits"].append({"line": tokens[k].line, "loop_line": loop, "kind": kind})
+        return None
+    nodes = scope["nodes"]
+    node = {
+        "id": len(nodes),
+        "line": tokens[k].line,
+        "kind": kind,
+        "arms": [],
+    }
+    deps = set(derived)
+    for chain, arm, s, e, conditions in scope["branches"]:
+        if s <= k <= e:
+            node["arms"].append([chain, arm])
+            for cond_start, cond_end in conditions:
+                for name in _uses(tokens, cond_start, cond_end):
+                    deps |= scope["sources"].get(name, set())
+    # Writes, auth checks and unknown calls keep their position: everything
+    # before them must finish first and everything after waits for them.
+    for other in nodes:
+        if (other["kind"] == "write" or kind == "write") and not _exclusive(node, other):
+            deps.add(other["id"])
+    node["level"] = 1 + max((nodes[d]["level"] for d in deps), default=0)
+    nodes.append(node)
+    return node["id"]
+
+
+def analyze_batch(batch):
+    """Process-pool worker: per-function waterfall facts for each file."""
+    root, rel_paths = batch
+    out = {}
+    for rel_path in rel_paths:
+        with open(os.path.join(root, *rel_path.split("/")), "r", encoding="utf-8", errors="replace") as f:
+            tokens = tokenize(f.read())
+        bodies = _async_bodies(tokens)
+        found = []
+        for name, line, start, end in bodies:
+            inner = [(s, e) for _, _, s, e in bodies if start < s and e <= end]
+            nodes, loop_awaits = analyze_function(tokens, start, end, inner)
+            groups = parallel_groups(nodes)
+            if not groups and not loop_awaits:
+                continue
+            found.append({
+                "function": name,
+                "line": line,
+                "round_trips": len(nodes),
+                "saved_round_trips": sum(len(g) - 1 for g in groups),
+                "parallel_groups": groups,
+                "loops": loop_awaits,
+            })
+        out[rel_path] = found
+    return out
+
+
+def find_waterfalls(ctx):
+    index = ctx.index
+    files = sorted({p for g in WATERFALL_SOURCES for p in index.glob(g)})
+    facts, analysed = file_cache(ctx).map_files("waterfalls", analyze_batch, files, depends=[audit_tslex])
+    findings = []
+    for rel_path in files:
+        for fn in facts[rel_path]:
+            saved = fn["saved_round_trips"]
+            if saved > 0:
+                findings.append({
+                    "kind": "SEQUENTIAL",
+                    "location": f"{rel_path}:{fn['line']}",
+                    "function": fn["function"],
+                    "round_trips": fn["round_trips"],
+                    "saved_round_trips": saved,
+                    "saved_ms": [saved * ROUND_TRIP_MS[0], saved * ROUND_TRIP_MS[1]],
+                    "parallel_groups": fn["parallel_groups"],
+                })
+            for loop in fn["loops"]:
+                findings.append({
+                    "kind": "N+1",
+                    "location": f"{rel_path}:{loop['line']}",
+                    "function": fn["function"],
+                    "loop_line": loop["loop_line"],
+                    # One round-trip per iteration; a batched .in() query needs one.
+                    "saved_round_trips": "N-1",
+                })
+    summary = {
+        "files": len(files),
+        "sequential": sum(1 for f in findings if f["kind"] == "SEQUENTIAL"),
+        "n_plus_one": sum(1 for f in findings if f["kind"] == "N+1"),
+        "saved_round_trips": sum(f["saved_round_trips"] for f in findings if f["kind"] == "SEQUENTIAL"),
+        "files_reanalysed": analysed,
+    }
+    return findings, summary
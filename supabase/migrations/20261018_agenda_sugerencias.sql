@@ -0,0 +1,52 @@
+-- ==========================================================
+-- AGENDA PARA SUGERENCIAS (RPC para el flujo de WhatsApp en n8n)
+-- Todo lo que "Generate Suggestions" necesita para proponer horas libres
+-- cerca de la pedida, en una sola llamada: horario semanal y cierres de la
+-- barbería, horario y ausencias de cada barbero, y las citas por minuto de
+-- inicio desde p_desde hasta p_desde + p_dias (como ocupacion_slots).
+-- Llamada: POST /rest/v1/rpc/agenda_sugerencias
+--          {"p_barberia_id": "...", "p_desde": "YYYY-MM-DD", "p_dias": 2}
+-- ==========================================================
+
+-- Rango indexado: WHERE barberia_id = X AND Dia BETWEEN Y AND Z
+CREATE INDEX IF NOT EXISTS idx_citas_barberia_dia
+    ON citas(barberia_id, "Dia");
+
+CREATE OR REPLACE FUNCTION agenda_sugerencias(p_barberia_id UUID, p_desde DATE, p_dias INTEGER DEFAULT 0)
+RETURNS JSONB AS $$
+    -- to_jsonb(fila)->'columna' devuelve NULL si la columna no existe: las
+    -- barberías sin horario propio usan los turnos de sus barberos.
+    SELECT jsonb_build_object(
+        'horario', (SELECT to_jsonb(p) -> 'horario_semanal' FROM perfiles p WHERE p.id = p_barberia_id),
+        'cierres', (SELECT to_jsonb(p) -> 'fechas_cierre' FROM perfiles p WHERE p.id = p_barberia_id),
+        'barberos', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                       'horario_semanal', to_jsonb(b) -> 'horario_semanal',
+                       'fechas_cierre', to_jsonb(b) -> 'fechas_cierre'))
+            FROM barberos b
+            WHERE b.barberia_id = p_barberia_id
+        ), '[]'::JSONB),
+        'ocupacion', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('dia', o.dia, 'minuto', o.minuto, 'citas', o.citas)
+                             ORDER BY o.dia, o.minuto)
+            FROM (
+                SELECT i.dia, i.minuto::INTEGER AS minuto, COUNT(*)::INTEGER AS citas
+                FROM (
+                    -- "Hora" se interpreta igual que en ocupacion_slots
+                    SELECT c."Dia"::DATE AS dia,
+                           substring(c."Hora"::TEXT FROM '^\s*([0-9]+)')::NUMERIC * 60
+                         + substring(split_part(c."Hora"::TEXT, ':', 2) FROM '^\s*([0-9]+)')::NUMERIC AS minuto
+                    FROM citas c
+                    WHERE c.barberia_id = p_barberia_id
+                      AND c."Dia" BETWEEN p_desde AND p_desde + LEAST(GREATEST(p_dias, 0), 14)
+                      AND c.cancelada IS NOT TRUE
+                ) i
+                WHERE i.minuto IS NOT NULL AND i.minuto < 2880
+                GROUP BY i.dia, i.minuto
+            ) o
+        ), '[]'::JSONB)
+    );
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE ALL ON FUNCTION agenda_sugerencias(UUID, DATE, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION agenda_sugerencias(UUID, DATE, INTEGER) TO service_role;
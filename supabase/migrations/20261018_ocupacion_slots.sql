@@ -0,0 +1,33 @@
+-- ==========================================================
+-- OCUPACIÓN POR HORA DE INICIO (RPC para el flujo de WhatsApp en n8n)
+-- Sustituye el "Get many rows" que traía todas las citas del día a n8n:
+-- devuelve una fila por minuto de inicio con el número de citas, y los
+-- nodos "Check Capacity Master" / "Generate Suggestions" calculan la
+-- capacidad a partir de ahí.
+-- Llamada: POST /rest/v1/rpc/ocupacion_slots {"p_barberia_id": "...", "p_dia": "YYYY-MM-DD"}
+-- ==========================================================
+
+-- Rango indexado: WHERE barberia_id = X AND Dia = Y
+CREATE INDEX IF NOT EXISTS idx_citas_barberia_dia
+    ON citas(barberia_id, "Dia");
+
+CREATE OR REPLACE FUNCTION ocupacion_slots(p_barberia_id UUID, p_dia DATE)
+RETURNS TABLE (minuto INTEGER, citas INTEGER) AS $$
+    -- "Hora" se interpreta igual que en el nodo: horas y minutos iniciales
+    -- ('10:30' o '10:30:00'); las horas ilegibles o de más de 48h se ignoran.
+    SELECT i.minuto::INTEGER, COUNT(*)::INTEGER
+    FROM (
+        SELECT substring(c."Hora"::TEXT FROM '^\s*([0-9]+)')::NUMERIC * 60
+             + substring(split_part(c."Hora"::TEXT, ':', 2) FROM '^\s*([0-9]+)')::NUMERIC AS minuto
+        FROM citas c
+        WHERE c.barberia_id = p_barberia_id
+          AND c."Dia" = p_dia
+          AND c.cancelada IS NOT TRUE
+    ) i
+    WHERE i.minuto IS NOT NULL AND i.minuto < 2880
+    GROUP BY i.minuto
+    ORDER BY i.minuto;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE ALL ON FUNCTION ocupacion_slots(UUID, DATE) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION ocupacion_slots(UUID, DATE) TO service_role;